@@ -0,0 +1,362 @@
+"""
+Suite de pruebas de carga para catálogos, notas y notificaciones
+
+Cada escenario corre en un proceso nuevo con REPOSITORY_BACKEND=memory y
+stand-ins locales de S3/SNS/SES/CloudWatch (ver stand_ins.py), y maneja la
+app de dos formas:
+- lambda: el `handler` de Lambda (Mangum para las APIs) con eventos de API
+  Gateway/SNS, una invocación a la vez como en un contenedor Lambda
+- asgi: la app FastAPI vía ASGI con N requests concurrentes
+
+Reporta p50/p95/p99, throughput y RSS pico, y guarda el resultado en
+benchmarks/results/ etiquetado con el commit para comparar corridas con
+benchmarks/comparar.py.
+
+Uso:
+    python benchmarks/carga.py                            # todos los escenarios
+    python benchmarks/carga.py --escenarios notas:large-notes --requests 100
+    python benchmarks/carga.py --modo asgi --concurrencia 32 --latencia-dynamo-ms 5
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import statistics
+import subprocess
+from datetime import datetime
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(BENCHMARKS)
+RESULTADOS = os.path.join(BENCHMARKS, "results")
+
+# ==================== ESCENARIOS ====================
+
+def _cliente(i: int) -> dict:
+    return {
+        "id": f"cli-{i}", "razon_social": f"Empresa {i} SA de CV", "nombre_comercial": f"Empresa {i}",
+        "rfc": f"EMP{i:010d}", "correo_electronico": f"cliente{i}@example.com", "telefono": "5551234567",
+        "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00",
+    }
+
+def _domicilio(i: int) -> dict:
+    return {
+        "id": f"dom-{i}", "cliente_id": f"cli-{i}", "domicilio": f"Calle {i}", "colonia": "Centro",
+        "municipio": "Guadalajara", "estado": "Jalisco", "tipo_direccion": "FACTURACION",
+        "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00",
+    }
+
+def _producto(i: int) -> dict:
+    return {
+        "id": f"prod-{i}", "nombre": f"Producto {i}", "unidad_medida": "PZA",
+        "precio_base": round(10 + (i % 500) * 1.37, 2),
+        "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00",
+    }
+
+def _sembrar_catalogos(repos, clientes: int, productos: int):
+    repos.clientes.cargar([_cliente(i) for i in range(clientes)])
+    repos.domicilios.cargar([_domicilio(i) for i in range(clientes)])
+    repos.productos.cargar([_producto(i) for i in range(productos)])
+
+def _nota(rng, lineas: int, clientes: int = 100, productos: int = 500) -> dict:
+    i = rng.randrange(clientes)
+    return {
+        "cliente_id": f"cli-{i}",
+        "direccion_facturacion_id": f"dom-{i}",
+        "direccion_envio_id": f"dom-{i}",
+        "contenido": [
+            {"producto_id": f"prod-{rng.randrange(productos)}", "cantidad": rng.randint(1, 20),
+             "precio_unitario": round(rng.uniform(5, 500), 2)}
+            for _ in range(lineas)
+        ],
+    }
+
+class Escenario:
+    """Escenario de carga: prepara datos y genera requests"""
+    servicio = None
+    descripcion = ""
+
+    def preparar(self, app, rng):
+        pass
+
+    def siguiente(self, rng):
+        """Regresa (método, ruta, body) o, para notificaciones, un evento"""
+        raise NotImplementedError
+
+class CatalogosCreateHeavy(Escenario):
+    servicio = "catalogos"
+    descripcion = "70% alta de productos, 20% alta de clientes, 10% lecturas"
+
+    def preparar(self, app, rng):
+        _sembrar_catalogos(app.get_repositorios(), 100, 500)
+        self.contador = 0
+
+    def siguiente(self, rng):
+        self.contador += 1
+        r = rng.random()
+        if r < 0.7:
+            return "POST", "/productos", {"nombre": f"Nuevo {self.contador}", "unidad_medida": "PZA",
+                                          "precio_base": round(rng.uniform(1, 1000), 2)}
+        if r < 0.9:
+            return "POST", "/clientes", {
+                "razon_social": f"Alta {self.contador} SA", "nombre_comercial": f"Alta {self.contador}",
+                "rfc": f"ALT{self.contador:010d}", "correo_electronico": f"alta{self.contador}@example.com",
+                "telefono": "5551234567",
+            }
+        return "GET", f"/productos/prod-{rng.randrange(500)}", None
+
+class CatalogosReadHeavy(Escenario):
+    servicio = "catalogos"
+    descripcion = "85% producto por id, 10% cliente por id, 5% listado de 1000 productos"
+
+    def preparar(self, app, rng):
+        _sembrar_catalogos(app.get_repositorios(), 200, 1000)
+
+    def siguiente(self, rng):
+        r = rng.random()
+        if r < 0.85:
+            return "GET", f"/productos/prod-{rng.randrange(1000)}", None
+        if r < 0.95:
+            return "GET", f"/clientes/cli-{rng.randrange(200)}", None
+        return "GET", "/productos", None
+
+class NotasCreateHeavy(Escenario):
+    servicio = "notas"
+    descripcion = "alta de notas de 1 a 5 líneas (PDF, S3 y SNS incluidos)"
+
+    def preparar(self, app, rng):
+        _sembrar_catalogos(app.get_repositorios(), 100, 500)
+
+    def siguiente(self, rng):
+        return "POST", "/notas", _nota(rng, rng.randint(1, 5))
+
+class NotasLargeNotes(Escenario):
+    servicio = "notas"
+    descripcion = "alta de notas de 200 líneas"
+
+    def preparar(self, app, rng):
+        _sembrar_catalogos(app.get_repositorios(), 100, 500)
+
+    def siguiente(self, rng):
+        return "POST", "/notas", _nota(rng, 200)
+
+class NotasReadHeavy(Escenario):
+    servicio = "notas"
+    descripcion = "90% nota por id (con cliente, domicilios y contenido), 10% listado"
+
+    def preparar(self, app, rng):
+        from fastapi.testclient import TestClient
+        _sembrar_catalogos(app.get_repositorios(), 100, 500)
+        client = TestClient(app.app)
+        self.notas = [client.post("/notas", json=_nota(rng, rng.randint(1, 5))).json()["id"] for _ in range(200)]
+
+    def siguiente(self, rng):
+        if rng.random() < 0.9:
+            return "GET", f"/notas/{rng.choice(self.notas)}", None
+        return "GET", "/notas", None
+
+class NotificacionesBurst(Escenario):
+    servicio = "notificaciones"
+    descripcion = "ráfagas de 25 mensajes SNS por invocación"
+
+    def siguiente(self, rng):
+        from eventos import evento_sns
+        return evento_sns([
+            {
+                "type": "NOTA_VENTA_GENERADA", "cliente_email": f"cliente{i}@example.com",
+                "cliente_nombre": f"Empresa {i}", "folio": f"NV-{rng.randrange(10**8):08d}",
+                "rfc": f"EMP{i:010d}", "total": round(rng.uniform(10, 10000), 2),
+                "download_url": "https://example.com/notas/x/pdf",
+            }
+            for i in range(25)
+        ])
+
+ESCENARIOS = {
+    "catalogos:create-heavy": CatalogosCreateHeavy,
+    "catalogos:read-heavy": CatalogosReadHeavy,
+    "notas:create-heavy": NotasCreateHeavy,
+    "notas:read-heavy": NotasReadHeavy,
+    "notas:large-notes": NotasLargeNotes,
+    "notificaciones:burst": NotificacionesBurst,
+}
+
+# ==================== EJECUCIÓN (proceso hijo) ====================
+
+def _percentil(ordenados: list, p: float) -> float:
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+def _resumen(latencias: list, duracion: float, errores: int) -> dict:
+    ordenadas = sorted(latencias)
+    return {
+        "requests": len(latencias),
+        "errores": errores,
+        "p50_ms": round(_percentil(ordenadas, 0.50), 3),
+        "p95_ms": round(_percentil(ordenadas, 0.95), 3),
+        "p99_ms": round(_percentil(ordenadas, 0.99), 3),
+        "media_ms": round(statistics.fmean(ordenadas), 3) if ordenadas else 0.0,
+        "throughput_rps": round(len(latencias) / duracion, 2) if duracion else 0.0,
+        "rss_pico_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def _modo_lambda(app, escenario, rng, requests: int, calentamiento: int) -> dict:
+    from eventos import evento_api_gateway
+
+    def invocar():
+        peticion = escenario.siguiente(rng)
+        if escenario.servicio == "notificaciones":
+            respuesta = app.handler(peticion, None)
+        else:
+            metodo, ruta, body = peticion
+            respuesta = app.handler(evento_api_gateway(metodo, ruta, body), None)
+        return respuesta["statusCode"]
+
+    for _ in range(calentamiento):
+        invocar()
+    latencias, errores = [], 0
+    inicio = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        if invocar() >= 500:
+            errores += 1
+        latencias.append((time.perf_counter() - t0) * 1000)
+    return _resumen(latencias, time.perf_counter() - inicio, errores)
+
+def _modo_asgi(app, escenario, rng, requests: int, calentamiento: int, concurrencia: int) -> dict:
+    import httpx
+
+    async def correr():
+        transporte = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+            async def una():
+                metodo, ruta, body = escenario.siguiente(rng)
+                t0 = time.perf_counter()
+                respuesta = await client.request(metodo, ruta, json=body)
+                return (time.perf_counter() - t0) * 1000, respuesta.status_code
+
+            for _ in range(calentamiento):
+                await una()
+
+            semaforo = asyncio.Semaphore(concurrencia)
+            async def limitada():
+                async with semaforo:
+                    return await una()
+
+            inicio = time.perf_counter()
+            resultados = await asyncio.gather(*(limitada() for _ in range(requests)))
+            duracion = time.perf_counter() - inicio
+        latencias = [r[0] for r in resultados]
+        errores = sum(1 for r in resultados if r[1] >= 500)
+        return _resumen(latencias, duracion, errores)
+
+    return asyncio.run(correr())
+
+def ejecutar_interno(args) -> dict:
+    """Corre un escenario dentro del proceso actual (cwd = módulo)"""
+    sys.path.insert(0, BENCHMARKS)
+    sys.path.insert(0, os.path.join(os.getcwd(), "src"))
+    import app
+    import aws_clients
+    import stand_ins
+
+    stand_ins.registrar(aws_clients, args.latencia_aws_ms)
+    escenario = ESCENARIOS[args.escenarios[0]]()
+    rng = random.Random(args.semilla)
+    escenario.preparar(app, rng)
+
+    if args.modo == "asgi" and escenario.servicio != "notificaciones":
+        return _modo_asgi(app, escenario, rng, args.requests, args.calentamiento, args.concurrencia)
+    return _modo_lambda(app, escenario, rng, args.requests, args.calentamiento)
+
+# ==================== ORQUESTACIÓN ====================
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+def correr_escenario(nombre: str, args) -> dict:
+    servicio = nombre.split(":")[0]
+    modo = "lambda" if servicio == "notificaciones" else args.modo
+    env = dict(os.environ)
+    env.update({
+        "REPOSITORY_BACKEND": "memory",
+        "MEMORY_LATENCY_MS": str(args.latencia_dynamo_ms),
+        "SNS_TOPIC_ARN": "arn:aws:sns:us-east-1:000000000000:benchmark",
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "AWS_REGION": "us-east-1",
+        "ENVIRONMENT": "benchmark",
+    })
+    comando = [
+        sys.executable, os.path.abspath(__file__), "--interno",
+        "--escenarios", nombre, "--modo", modo,
+        "--requests", str(args.requests), "--calentamiento", str(args.calentamiento),
+        "--concurrencia", str(args.concurrencia), "--semilla", str(args.semilla),
+        "--latencia-aws-ms", str(args.latencia_aws_ms),
+    ]
+    resultado = subprocess.run(comando, cwd=os.path.join(RAIZ, f"modulo-{servicio}"), env=env,
+                               capture_output=True, text=True)
+    if resultado.returncode != 0:
+        raise RuntimeError(f"{nombre} falló:\n{resultado.stderr}")
+    resumen = json.loads(resultado.stdout.strip().splitlines()[-1])
+    return {"escenario": nombre, "modo": modo, **resumen}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escenarios", nargs="+", default=list(ESCENARIOS), choices=list(ESCENARIOS))
+    parser.add_argument("--modo", choices=["lambda", "asgi"], default="lambda")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--calentamiento", type=int, default=10)
+    parser.add_argument("--concurrencia", type=int, default=16, help="Solo en modo asgi")
+    parser.add_argument("--latencia-dynamo-ms", type=float, default=0.0)
+    parser.add_argument("--latencia-aws-ms", type=float, default=0.0)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--output", help="Ruta del JSON de resultados (default: benchmarks/results/)")
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(ejecutar_interno(args)))
+        return
+
+    corrida = {
+        "commit": _commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "config": {
+            "modo": args.modo, "requests": args.requests, "concurrencia": args.concurrencia,
+            "latencia_dynamo_ms": args.latencia_dynamo_ms, "latencia_aws_ms": args.latencia_aws_ms,
+            "semilla": args.semilla,
+        },
+        "resultados": [],
+    }
+    print(f"{'escenario':<24} {'modo':<7} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>9} {'rss MB':>7} {'err':>4}")
+    for nombre in args.escenarios:
+        r = correr_escenario(nombre, args)
+        corrida["resultados"].append(r)
+        print(f"{nombre:<24} {r['modo']:<7} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['throughput_rps']:>9.1f} {r['rss_pico_mb']:>7.1f} {r['errores']:>4}")
+
+    salida = args.output
+    if not salida:
+        os.makedirs(RESULTADOS, exist_ok=True)
+        marca = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        salida = os.path.join(RESULTADOS, f"carga-{marca}-{corrida['commit']}.json")
+    with open(salida, "w") as f:
+        json.dump(corrida, f, indent=2)
+        f.write("\n")
+    print(f"Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark de arranque en frío del módulo de notas
+
+Cada muestra se toma en un proceso nuevo (igual que un contenedor Lambda
+recién creado) y mide:
+- import_ms: tiempo de `import app`
+- init_ms: tiempo de crear los clientes AWS (DynamoDB, S3, SNS, CloudWatch)
+- first_request_ms: primer request a /health a través del handler de Lambda
+
+Uso:
+    python benchmarks/cold_start.py --runs 7
+    python benchmarks/cold_start.py --baseline benchmarks/baselines/cold_start_notas.json
+
+Con --baseline el proceso termina con código 1 si alguna mediana supera la
+del baseline por más de --tolerancia (30% por defecto).
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+MODULO_NOTAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modulo-notas')
+
+# Código que corre dentro de cada proceso medido
+SONDA = r"""
+import os, sys, json, time
+sys.path.insert(0, 'src')
+
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.get_dynamodb(); app.get_s3_client(); app.get_sns_client(); app.get_cloudwatch()
+t2 = time.perf_counter()
+
+evento = {
+    "resource": "/health", "path": "/health", "httpMethod": "GET",
+    "headers": {"Host": "localhost"}, "multiValueHeaders": {},
+    "queryStringParameters": None, "multiValueQueryStringParameters": None,
+    "pathParameters": None, "stageVariables": None,
+    "requestContext": {"resourcePath": "/health", "httpMethod": "GET", "path": "/health",
+                       "stage": "local", "identity": {"sourceIp": "127.0.0.1"}},
+    "body": None, "isBase64Encoded": False,
+}
+t3 = time.perf_counter()
+respuesta = app.handler(evento, None)
+t4 = time.perf_counter()
+assert respuesta["statusCode"] == 200, respuesta
+
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "init_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t4 - t3) * 1000,
+    "reportlab_cargado": any(m.startswith("reportlab") for m in sys.modules),
+}))
+"""
+
+METRICAS = ("import_ms", "init_ms", "first_request_ms")
+
+
+def medir_una_vez() -> dict:
+    """Ejecuta la sonda en un proceso nuevo y devuelve sus tiempos"""
+    env = dict(os.environ)
+    # Credenciales ficticias: crear clientes no requiere red
+    env.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    env.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    env.setdefault("AWS_REGION", "us-east-1")
+    resultado = subprocess.run(
+        [sys.executable, "-c", SONDA],
+        cwd=MODULO_NOTAS, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def ejecutar(runs: int) -> dict:
+    muestras = [medir_una_vez() for _ in range(runs)]
+    return {
+        "benchmark": "cold_start_notas",
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "mediana": {m: round(statistics.median(s[m] for s in muestras), 2) for m in METRICAS},
+        "reportlab_cargado": any(s["reportlab_cargado"] for s in muestras),
+    }
+
+
+def comparar(resultado: dict, baseline: dict, tolerancia: float) -> list:
+    """Devuelve la lista de regresiones respecto al baseline"""
+    regresiones = []
+    for metrica in METRICAS:
+        base = baseline["mediana"][metrica]
+        actual = resultado["mediana"][metrica]
+        if actual > base * (1 + tolerancia):
+            regresiones.append(f"{metrica}: {actual:.1f}ms > {base:.1f}ms (+{tolerancia:.0%})")
+    if resultado["reportlab_cargado"]:
+        regresiones.append("reportlab se carga en el arranque")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--baseline", help="JSON de referencia contra el cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.30)
+    parser.add_argument("--output", help="Ruta donde guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    resultado = ejecutar(args.runs)
+    print(json.dumps(resultado, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultado, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regresiones = comparar(resultado, baseline, args.tolerancia)
+        if regresiones:
+            print("REGRESIONES DE ARRANQUE EN FRÍO:")
+            for r in regresiones:
+                print(f"  - {r}")
+            sys.exit(1)
+        print("Sin regresiones respecto al baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compara dos corridas de benchmarks/carga.py
+
+Uso:
+    python benchmarks/comparar.py benchmarks/results/base.json benchmarks/results/nueva.json
+    python benchmarks/comparar.py base.json nueva.json --umbral 0.15
+
+Con --umbral termina con código 1 si el p95 de algún escenario empeora más
+que el porcentaje indicado o si el throughput baja en la misma proporción.
+"""
+import sys
+import json
+import argparse
+
+METRICAS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "rss_pico_mb")
+
+
+def _por_escenario(corrida: dict) -> dict:
+    return {(r["escenario"], r["modo"]): r for r in corrida["resultados"]}
+
+
+def _cambio(antes: float, despues: float) -> float:
+    return (despues - antes) / antes if antes else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("nueva")
+    parser.add_argument("--umbral", type=float, help="Regresión máxima permitida (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.nueva) as f:
+        nueva = json.load(f)
+
+    print(f"base:  {base['commit']} ({base['timestamp']})")
+    print(f"nueva: {nueva['commit']} ({nueva['timestamp']})\n")
+
+    regresiones = []
+    anteriores = _por_escenario(base)
+    for clave, actual in _por_escenario(nueva).items():
+        anterior = anteriores.get(clave)
+        if anterior is None:
+            continue
+        print(f"{clave[0]} [{clave[1]}]")
+        for metrica in METRICAS:
+            cambio = _cambio(anterior[metrica], actual[metrica])
+            print(f"  {metrica:<15} {anterior[metrica]:>10.2f} -> {actual[metrica]:>10.2f}  ({cambio:+.1%})")
+        if args.umbral is not None:
+            if _cambio(anterior["p95_ms"], actual["p95_ms"]) > args.umbral:
+                regresiones.append(f"{clave[0]}: p95 {anterior['p95_ms']:.2f} -> {actual['p95_ms']:.2f} ms")
+            if _cambio(anterior["throughput_rps"], actual["throughput_rps"]) < -args.umbral:
+                regresiones.append(f"{clave[0]}: throughput {anterior['throughput_rps']:.1f} -> "
+                                   f"{actual['throughput_rps']:.1f} req/s")
+
+    if regresiones:
+        print("\nREGRESIONES:")
+        for r in regresiones:
+            print(f"  - {r}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark de concurrencia: throughput de un solo proceso ASGI vs requests en vuelo
+
+Corre los escenarios de carga.py en modo asgi con niveles crecientes de
+concurrencia y latencia simulada de DynamoDB/AWS. Si los endpoints bloquean el
+event loop el throughput se queda plano al subir la concurrencia; con los
+endpoints en el pool de hilos debe crecer hasta THREADPOOL_SIZE.
+
+Uso:
+    python benchmarks/concurrencia.py
+    python benchmarks/concurrencia.py --niveles 1 8 32 64 --latencia-dynamo-ms 10
+    THREADPOOL_SIZE=16 python benchmarks/concurrencia.py --escenarios notas:read-heavy
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import carga
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escenarios", nargs="+", default=["catalogos:read-heavy", "notas:read-heavy"],
+                        choices=[e for e in carga.ESCENARIOS if not e.startswith("notificaciones")])
+    parser.add_argument("--niveles", nargs="+", type=int, default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--calentamiento", type=int, default=10)
+    parser.add_argument("--latencia-dynamo-ms", type=float, default=5.0)
+    parser.add_argument("--latencia-aws-ms", type=float, default=5.0)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--output", help="Ruta del JSON de resultados (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    corrida = {
+        "commit": carga._commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "threadpool_size": os.getenv("THREADPOOL_SIZE", "default"),
+        "config": {
+            "requests": args.requests, "latencia_dynamo_ms": args.latencia_dynamo_ms,
+            "latencia_aws_ms": args.latencia_aws_ms, "niveles": args.niveles,
+        },
+        "resultados": [],
+    }
+    print(f"{'escenario':<24} {'conc':>5} {'p50':>8} {'p95':>8} {'req/s':>9} {'x conc=1':>9}")
+    for nombre in args.escenarios:
+        base = None
+        for nivel in args.niveles:
+            opciones = argparse.Namespace(
+                modo="asgi", requests=args.requests, calentamiento=args.calentamiento,
+                concurrencia=nivel, semilla=args.semilla,
+                latencia_dynamo_ms=args.latencia_dynamo_ms, latencia_aws_ms=args.latencia_aws_ms,
+            )
+            r = carga.correr_escenario(nombre, opciones)
+            r["concurrencia"] = nivel
+            base = base or r["throughput_rps"]
+            r["aceleracion"] = round(r["throughput_rps"] / base, 2) if base else 0.0
+            corrida["resultados"].append(r)
+            print(f"{nombre:<24} {nivel:>5} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                  f"{r['throughput_rps']:>9.1f} {r['aceleracion']:>8.2f}x")
+
+    salida = args.output
+    if not salida:
+        os.makedirs(carga.RESULTADOS, exist_ok=True)
+        marca = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        salida = os.path.join(carga.RESULTADOS, f"concurrencia-{marca}-{corrida['commit']}.json")
+    with open(salida, "w") as f:
+        json.dump(corrida, f, indent=2)
+        f.write("\n")
+    print(f"Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
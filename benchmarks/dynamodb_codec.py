@@ -0,0 +1,120 @@
+"""
+Benchmark de deserialización de scans: API resource vs cliente de bajo nivel
+
+Genera páginas de scan en el formato de bajo nivel de DynamoDB (lo que
+regresa botocore para ambos caminos) y mide el trabajo que cada camino hace
+después:
+- resource: TypeDeserializer por atributo (lo que hace Table) más
+  convert_decimals (lo que hace la API con cada item)
+- client: Codec.deserializar del esquema correspondiente
+
+El parseo HTTP/JSON de botocore es igual en ambos caminos y no se incluye.
+
+Uso:
+    python benchmarks/dynamodb_codec.py
+    python benchmarks/dynamodb_codec.py --items 1000 10000 --repeticiones 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modulo-notas', 'src'))
+
+from dynamodb_codec import Codec, ESQUEMAS
+
+
+def generar_item(forma: str, i: int) -> dict:
+    """Item representativo de cada forma, ya con Decimals como en DynamoDB"""
+    if forma == "producto":
+        return {
+            "id": f"prod-{i:08d}", "nombre": f"Producto de prueba {i}", "unidad_medida": "PZA",
+            "precio_base": Decimal(f"{i % 997}.{i % 100:02d}"),
+            "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00",
+        }
+    if forma == "contenido":
+        return {
+            "id": f"cont-{i:08d}", "nota_id": f"nota-{i // 10:08d}", "producto_id": f"prod-{i % 500:08d}",
+            "producto_nombre": f"Producto de prueba {i % 500}", "cantidad": Decimal(i % 20 + 1),
+            "precio_unitario": Decimal("19.90"), "importe": Decimal("19.90") * (i % 20 + 1),
+        }
+    if forma == "cliente":
+        return {
+            "id": f"cli-{i:08d}", "razon_social": f"Empresa {i} SA de CV", "nombre_comercial": f"Empresa {i}",
+            "rfc": f"EMP{i:010d}", "correo_electronico": f"cliente{i}@example.com", "telefono": "5551234567",
+            "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00",
+        }
+    raise ValueError(forma)
+
+
+def pagina_bajo_nivel(forma: str, n: int) -> list:
+    serializer = TypeSerializer()
+    return [serializer.serialize(generar_item(forma, i))["M"] for i in range(n)]
+
+
+def _decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+
+def camino_resource(items: list) -> list:
+    deserializer = TypeDeserializer()
+    resultado = []
+    for raw in items:
+        item = {k: deserializer.deserialize(v) for k, v in raw.items()}
+        resultado.append(json.loads(json.dumps(item, default=_decimal_default)))
+    return resultado
+
+
+def camino_client(items: list, codec: Codec) -> list:
+    deserializar = codec.deserializar
+    return [deserializar(raw) for raw in items]
+
+
+def medir(fn, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--formas", nargs="+", default=["producto", "contenido", "cliente"])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--output", help="Ruta donde guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    print(f"{'forma':<10} {'items':>7} {'resource ms':>12} {'client ms':>10} {'speedup':>8}")
+    for forma in args.formas:
+        codec = Codec(ESQUEMAS[forma])
+        for n in args.items:
+            items = pagina_bajo_nivel(forma, n)
+            # Ambos caminos deben producir el mismo resultado
+            assert camino_resource(items[:50]) == camino_client(items[:50], codec)
+            t_resource = medir(lambda: camino_resource(items), args.repeticiones)
+            t_client = medir(lambda: camino_client(items, codec), args.repeticiones)
+            resultados.append({
+                "forma": forma, "items": n,
+                "resource_ms": round(t_resource, 2), "client_ms": round(t_client, 2),
+                "speedup": round(t_resource / t_client, 2),
+            })
+            print(f"{forma:<10} {n:>7} {t_resource:>12.2f} {t_client:>10.2f} {t_resource / t_client:>7.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "dynamodb_codec", "resultados": resultados}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Constructores de eventos de Lambda para los benchmarks
+"""
+import json
+import uuid
+from typing import Optional
+
+
+def evento_api_gateway(metodo: str, ruta: str, body=None, query: Optional[dict] = None,
+                       headers: Optional[dict] = None) -> dict:
+    """Evento de API Gateway (REST, payload 1.0) como el que recibe Mangum"""
+    headers = {"Host": "localhost", "Content-Type": "application/json", **(headers or {})}
+    return {
+        "resource": "/{proxy+}",
+        "path": ruta,
+        "httpMethod": metodo,
+        "headers": headers,
+        "multiValueHeaders": {k: [v] for k, v in headers.items()},
+        "queryStringParameters": query,
+        "multiValueQueryStringParameters": {k: [v] for k, v in query.items()} if query else None,
+        "pathParameters": None,
+        "stageVariables": None,
+        "requestContext": {
+            "resourcePath": "/{proxy+}",
+            "httpMethod": metodo,
+            "path": ruta,
+            "stage": "local",
+            "requestId": str(uuid.uuid4()),
+            "identity": {"sourceIp": "127.0.0.1"},
+        },
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+def evento_sns(mensajes: list) -> dict:
+    """Evento de SNS con un registro por mensaje"""
+    return {
+        "Records": [
+            {
+                "EventSource": "aws:sns",
+                "Sns": {"MessageId": str(uuid.uuid4()), "Message": json.dumps(mensaje)},
+            }
+            for mensaje in mensajes
+        ]
+    }
@@ -0,0 +1,111 @@
+"""
+Benchmark del cálculo de importes de notas grandes
+
+Compara, para notas de N líneas, el trabajo que hace crear_nota_venta con los
+montos:
+- anterior: importe y total en float, Decimal(str(...)) por línea para
+  DynamoDB y convert_decimals (json) de la nota y de cada línea para la
+  respuesta
+- centavos: importes.calcular en enteros, Decimal exacto para DynamoDB y
+  floats tomados de los centavos para la respuesta
+
+Uso:
+    python benchmarks/importes.py
+    python benchmarks/importes.py --lineas 100 10000 50000 --repeticiones 7
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modulo-notas', 'src'))
+
+import importes
+
+
+def generar_lineas(n: int, semilla: int = 42) -> list:
+    rng = random.Random(semilla)
+    return [(rng.randint(1, 50), round(rng.uniform(0.5, 5000), 2), 0) for _ in range(n)]
+
+
+def _decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+
+def camino_anterior(lineas: list) -> dict:
+    contenido = []
+    total = 0
+    for cantidad, precio, _ in lineas:
+        importe = cantidad * precio
+        total += importe
+        contenido.append({"cantidad": cantidad, "precio_unitario": precio, "importe": importe})
+    for item in contenido:
+        item["precio_unitario"] = Decimal(str(item["precio_unitario"]))
+        item["importe"] = Decimal(str(item["importe"]))
+    nota = {"total": Decimal(str(total))}
+    respuesta = json.loads(json.dumps(nota, default=_decimal_default))
+    respuesta["contenido"] = [json.loads(json.dumps(c, default=_decimal_default)) for c in contenido]
+    return respuesta
+
+
+def camino_centavos(lineas: list) -> dict:
+    calculo = importes.calcular(lineas)
+    a_decimal, a_float = importes.a_decimal, importes.a_float
+    contenido = [
+        {"cantidad": l.cantidad, "precio_unitario": a_decimal(l.precio_unitario), "importe": a_decimal(l.importe)}
+        for l in calculo.lineas
+    ]
+    respuesta = {"total": a_float(calculo.total)}
+    respuesta["contenido"] = [
+        {**item, "precio_unitario": a_float(l.precio_unitario), "importe": a_float(l.importe)}
+        for item, l in zip(contenido, calculo.lineas)
+    ]
+    return respuesta
+
+
+def medir(fn, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lineas", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--output", help="Ruta donde guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    print(f"{'lineas':>7} {'anterior ms':>12} {'centavos ms':>12} {'speedup':>8} {'error total':>12}")
+    for n in args.lineas:
+        lineas = generar_lineas(n)
+        anterior = camino_anterior(lineas)
+        exacto = camino_centavos(lineas)
+        # Diferencia del total en float contra el total exacto en centavos
+        error = abs(Decimal(str(anterior["total"])) - importes.a_decimal(importes.calcular(lineas).total))
+        t_anterior = medir(lambda: camino_anterior(lineas), args.repeticiones)
+        t_centavos = medir(lambda: camino_centavos(lineas), args.repeticiones)
+        resultados.append({
+            "lineas": n, "anterior_ms": round(t_anterior, 2), "centavos_ms": round(t_centavos, 2),
+            "speedup": round(t_anterior / t_centavos, 2), "error_total": str(error),
+        })
+        print(f"{n:>7} {t_anterior:>12.2f} {t_centavos:>12.2f} {t_anterior / t_centavos:>7.1f}x {str(error):>12}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "importes", "resultados": resultados}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
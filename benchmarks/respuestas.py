@@ -0,0 +1,102 @@
+"""
+Benchmark de serialización de listados: response_model vs respuestas.py
+
+Mide el CPU de convertir una lista de productos (dicts como los regresa el
+repositorio, con precio_base en Decimal) en el cuerpo JSON de la respuesta:
+- fastapi: lo que hace FastAPI con response_model=List[Producto]
+  (serialize_response: validación + jsonable_encoder) más JSONResponse
+- typeadapter: TypeAdapter(List[Producto]) precompilado, validate_python +
+  dump_json (RESPUESTAS_VALIDAR=true)
+- proyeccion: Serializador.lista_json, sin pydantic (el camino por defecto)
+
+Uso:
+    python benchmarks/respuestas.py
+    python benchmarks/respuestas.py --items 1000 10000 --repeticiones 5
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from decimal import Decimal
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modulo-catalogos', 'src'))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+import respuestas
+from app import Producto
+
+
+def generar_productos(n: int) -> list:
+    return [{
+        "id": f"prod-{i:08d}", "nombre": f"Producto de prueba {i}", "unidad_medida": "PZA",
+        "precio_base": Decimal(f"{i % 997 + 1}.{i % 100:02d}"),
+        "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00",
+    } for i in range(n)]
+
+
+def camino_fastapi(items: list, campo) -> bytes:
+    contenido = asyncio.run(serialize_response(field=campo, response_content=items, is_coroutine=True))
+    return JSONResponse(contenido).body
+
+
+def camino_typeadapter(items: list, serializador: respuestas.Serializador) -> bytes:
+    return serializador._lista.dump_json(serializador._lista.validate_python(items))
+
+
+def camino_proyeccion(items: list, serializador: respuestas.Serializador) -> bytes:
+    return serializador.lista_json(items)
+
+
+def medir(fn, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.process_time()
+        fn()
+        tiempos.append((time.process_time() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--output", help="Ruta donde guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    campo = create_response_field(name="Response_listar_productos", type_=List[Producto], mode="serialization")
+    serializador = respuestas.Serializador(Producto)
+
+    resultados = []
+    print(f"{'items':>7} {'fastapi ms':>11} {'typeadapter ms':>15} {'proyeccion ms':>14} {'speedup':>8}")
+    for n in args.items:
+        items = generar_productos(n)
+        # Los tres caminos deben producir el mismo JSON
+        muestra = items[:50]
+        esperado = json.loads(camino_fastapi(muestra, campo))
+        assert json.loads(camino_typeadapter(muestra, serializador)) == esperado
+        assert json.loads(camino_proyeccion(muestra, serializador)) == esperado
+
+        t_fastapi = medir(lambda: camino_fastapi(items, campo), args.repeticiones)
+        t_adapter = medir(lambda: camino_typeadapter(items, serializador), args.repeticiones)
+        t_proyeccion = medir(lambda: camino_proyeccion(items, serializador), args.repeticiones)
+        resultados.append({
+            "items": n, "fastapi_ms": round(t_fastapi, 2), "typeadapter_ms": round(t_adapter, 2),
+            "proyeccion_ms": round(t_proyeccion, 2), "speedup": round(t_fastapi / t_proyeccion, 2),
+        })
+        print(f"{n:>7} {t_fastapi:>11.2f} {t_adapter:>15.2f} {t_proyeccion:>14.2f} {t_fastapi / t_proyeccion:>7.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "respuestas", "resultados": resultados}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
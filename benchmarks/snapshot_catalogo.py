@@ -0,0 +1,118 @@
+"""
+Benchmark de memoria del catálogo de productos en el contenedor
+
+Compara, para N productos, lo que ocupa tener el catálogo completo en memoria:
+- dicts (resource): lista de dicts como los regresa boto3.resource, con
+  precio_base en Decimal
+- dicts (codec): lista de dicts del acceso de bajo nivel, precio en float
+- snapshot: snapshot_catalogo abierto con mmap; se reporta el heap de Python
+  y el tamaño del archivo (páginas que el sistema carga bajo demanda)
+
+También mide abrir el snapshot y buscar un producto por id.
+
+Uso:
+    python benchmarks/snapshot_catalogo.py
+    python benchmarks/snapshot_catalogo.py --productos 10000 100000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modulo-catalogos', 'src'))
+
+import snapshot_catalogo
+
+UNIDADES = ["PZA", "CAJA", "KG", "LT", "M", "Bulto"]
+
+
+def generar_productos(n: int, semilla: int = 42) -> list:
+    rng = random.Random(semilla)
+    fechas = [f"2026-0{m}-{d:02d}T10:00:00.000000" for m in range(1, 10) for d in range(1, 29)]
+    productos = []
+    for i in range(n):
+        fecha = rng.choice(fechas)
+        productos.append({
+            "id": f"{rng.getrandbits(128):032x}",
+            "nombre": f"Producto {rng.choice(['Tornillo', 'Tuerca', 'Cemento', 'Cable', 'Pintura'])} {i}",
+            "unidad_medida": rng.choice(UNIDADES),
+            "precio_base": Decimal(f"{rng.uniform(0.5, 5000):.2f}"),
+            "created_at": fecha,
+            "updated_at": fecha,
+        })
+    return productos
+
+
+def memoria(construir) -> tuple:
+    """(bytes de heap de Python que retiene el resultado, resultado)"""
+    tracemalloc.start()
+    resultado = construir()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return actual, resultado
+
+
+def copia_resource(productos: list) -> list:
+    # Copia profunda "desde cero" (cadenas nuevas, como al deserializar)
+    return [
+        {k: (Decimal(str(v)) if isinstance(v, Decimal) else "".join(v)) for k, v in p.items()}
+        for p in productos
+    ]
+
+
+def copia_codec(productos: list) -> list:
+    return [
+        {k: (float(v) if isinstance(v, Decimal) else "".join(v)) for k, v in p.items()}
+        for p in productos
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, nargs="+", default=[10000])
+    parser.add_argument("--output", help="Ruta donde guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    print(f"{'productos':>9} {'resource KB':>12} {'codec KB':>9} {'snap heap KB':>13} {'snap archivo KB':>16}"
+          f" {'abrir ms':>9} {'obtener us':>11}")
+    for n in args.productos:
+        productos = generar_productos(n)
+        m_resource, _ = memoria(lambda: copia_resource(productos))
+        m_codec, _ = memoria(lambda: copia_codec(productos))
+
+        ruta = os.path.join(tempfile.mkdtemp(), "productos.snap")
+        snapshot_catalogo.guardar(ruta, snapshot_catalogo.serializar(productos, version=1))
+        inicio = time.perf_counter()
+        m_snapshot, snapshot = memoria(lambda: snapshot_catalogo.SnapshotProductos.abrir(ruta))
+        t_abrir = (time.perf_counter() - inicio) * 1000
+
+        ids = [p["id"] for p in random.Random(1).sample(productos, min(n, 1000))]
+        inicio = time.perf_counter()
+        for producto_id in ids:
+            snapshot.obtener(producto_id)
+        t_obtener = (time.perf_counter() - inicio) / len(ids) * 1e6
+
+        archivo = os.path.getsize(ruta)
+        resultados.append({
+            "productos": n, "resource_kb": m_resource // 1024, "codec_kb": m_codec // 1024,
+            "snapshot_heap_kb": m_snapshot // 1024, "snapshot_archivo_kb": archivo // 1024,
+            "abrir_ms": round(t_abrir, 3), "obtener_us": round(t_obtener, 1),
+        })
+        print(f"{n:>9} {m_resource // 1024:>12} {m_codec // 1024:>9} {m_snapshot // 1024:>13} {archivo // 1024:>16}"
+              f" {t_abrir:>9.3f} {t_obtener:>11.1f}")
+        snapshot.cerrar()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "snapshot_catalogo", "resultados": resultados}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Stand-ins locales de S3, SNS, SES y CloudWatch para las pruebas de carga
+
+Implementan solo las operaciones que usan los módulos, guardan lo recibido en
+memoria y opcionalmente agregan una latencia fija por llamada. DynamoDB no
+necesita stand-in: se usa REPOSITORY_BACKEND=memory.
+"""
+import time
+import uuid
+import threading
+
+
+class _ClientError(Exception):
+    pass
+
+
+class _Excepciones:
+    NoSuchKey = type("NoSuchKey", (_ClientError,), {})
+    MessageRejected = type("MessageRejected", (_ClientError,), {})
+    MailFromDomainNotVerifiedException = type("MailFromDomainNotVerifiedException", (_ClientError,), {})
+
+
+class _StandIn:
+    exceptions = _Excepciones
+
+    def __init__(self, latencia_ms: float = 0.0):
+        self.latencia = latencia_ms / 1000.0
+        self.llamadas = 0
+        self._lock = threading.Lock()
+
+    def _llamada(self):
+        with self._lock:
+            self.llamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+
+class _Cuerpo:
+    def __init__(self, datos: bytes):
+        self._datos = datos
+
+    def read(self, n: int = -1) -> bytes:
+        return self._datos
+
+
+class S3StandIn(_StandIn):
+    def __init__(self, latencia_ms: float = 0.0):
+        super().__init__(latencia_ms)
+        self.objetos = {}
+
+    def put_object(self, Bucket, Key, Body=b"", Metadata=None, **kwargs):
+        self._llamada()
+        self.objetos[(Bucket, Key)] = (bytes(Body), dict(Metadata or {}))
+        return {"ETag": uuid.uuid4().hex}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._llamada()
+        if (Bucket, Key) not in self.objetos:
+            raise self.exceptions.NoSuchKey(Key)
+        datos, metadata = self.objetos[(Bucket, Key)]
+        return {"Body": _Cuerpo(datos), "Metadata": dict(metadata), "ContentLength": len(datos)}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._llamada()
+        if (Bucket, Key) not in self.objetos:
+            raise self.exceptions.NoSuchKey(Key)
+        datos, metadata = self.objetos[(Bucket, Key)]
+        return {"Metadata": dict(metadata), "ContentLength": len(datos)}
+
+    def copy_object(self, Bucket, Key, CopySource, Metadata=None, **kwargs):
+        self._llamada()
+        datos, metadata = self.objetos[(CopySource["Bucket"], CopySource["Key"])]
+        self.objetos[(Bucket, Key)] = (datos, dict(Metadata if Metadata is not None else metadata))
+        return {}
+
+
+class SNSStandIn(_StandIn):
+    def __init__(self, latencia_ms: float = 0.0):
+        super().__init__(latencia_ms)
+        self.mensajes = []
+
+    def publish(self, TopicArn, Message, **kwargs):
+        self._llamada()
+        self.mensajes.append(Message)
+        return {"MessageId": str(uuid.uuid4())}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries, **kwargs):
+        self._llamada()
+        exitosos = []
+        for entrada in PublishBatchRequestEntries:
+            self.mensajes.append(entrada["Message"])
+            exitosos.append({"Id": entrada["Id"], "MessageId": str(uuid.uuid4())})
+        return {"Successful": exitosos, "Failed": []}
+
+
+class SESStandIn(_StandIn):
+    def __init__(self, latencia_ms: float = 0.0):
+        super().__init__(latencia_ms)
+        self.enviados = 0
+
+    def send_email(self, **kwargs):
+        self._llamada()
+        self.enviados += 1
+        return {"MessageId": str(uuid.uuid4())}
+
+
+class CloudWatchStandIn(_StandIn):
+    def put_metric_data(self, Namespace, MetricData, **kwargs):
+        self._llamada()
+        return {}
+
+
+def registrar(aws_clients, latencia_ms: float = 0.0) -> dict:
+    """Registra los stand-ins en la fábrica de clientes del módulo cargado"""
+    clientes = {
+        "s3": S3StandIn(latencia_ms),
+        "sns": SNSStandIn(latencia_ms),
+        "ses": SESStandIn(latencia_ms),
+        "cloudwatch": CloudWatchStandIn(latencia_ms),
+    }
+    for servicio, cliente in clientes.items():
+        aws_clients.registrar_cliente(servicio, cliente)
+    return clientes
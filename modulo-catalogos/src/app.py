@@ -6,16 +6,29 @@ import os
 import json
 import time
 import uuid
-import boto3
 from decimal import Decimal
 from datetime import datetime
-from functools import wraps
-from fastapi import FastAPI, HTTPException, Request
+from functools import wraps, partial
+from contextlib import asynccontextmanager
+import anyio
+from anyio.lowlevel import RunVar
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
 from mangum import Mangum
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from enum import Enum
+import aws_clients
+import busqueda
+import compresion
+import dynamodb_codec
+import eliminacion
+import etags
+import idempotencia
+import repositorios
+import respuestas
+import snapshot_catalogo
+import tracing
 
 # Configuración de ambiente
 ENVIRONMENT = os.getenv("ENVIRONMENT", "local")
@@ -23,17 +36,91 @@ AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 TABLE_CLIENTES = os.getenv("TABLE_CLIENTES", "clientes")
 TABLE_DOMICILIOS = os.getenv("TABLE_DOMICILIOS", "domicilios")
 TABLE_PRODUCTOS = os.getenv("TABLE_PRODUCTOS", "productos")
-
-# Inicializar clientes AWS
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-cloudwatch = boto3.client('cloudwatch', region_name=AWS_REGION)
+TABLE_IDEMPOTENCIA = os.getenv("TABLE_IDEMPOTENCIA", "idempotencia")
+TABLE_TRABAJOS = os.getenv("TABLE_TRABAJOS", "trabajos")
+TABLE_VERSIONES = os.getenv("TABLE_VERSIONES", "versiones-catalogo")
+
+# Índice de domicilios por cliente (ver infrastructure/template.yaml)
+INDEX_DOMICILIOS_CLIENTE = os.getenv("INDEX_DOMICILIOS_CLIENTE", "cliente-index")
+
+# "client" usa el cliente de bajo nivel con (de)serialización por esquema;
+# "resource" conserva boto3.resource('dynamodb').Table
+DYNAMODB_ACCESS_MODE = os.getenv("DYNAMODB_ACCESS_MODE", "client")
+
+# "dynamodb" o "memory" (pruebas de carga locales sin AWS)
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "dynamodb")
+MEMORY_LATENCY_MS = float(os.getenv("MEMORY_LATENCY_MS", "0"))
+
+# Máximo de ids por solicitud en los endpoints :batchGet
+BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", "500"))
+
+# Hilos para los endpoints (boto3 es bloqueante); alineado con
+# AWS_MAX_POOL_CONNECTIONS para no encolar requests con conexiones libres
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "50"))
+
+# Precalentar clientes y repositorios al iniciar el worker (solo server.py;
+# en Lambda Mangum corre con lifespan="off" y todo se crea en el primer uso)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# Nombre de la función en Lambda (lo define el runtime; vacío en server.py).
+# Con él, DELETE /clientes/{id}?asincrono=true se invoca a sí misma en modo
+# Event para que la cascada no dependa del request original
+LAMBDA_FUNCTION_NAME = os.getenv("AWS_LAMBDA_FUNCTION_NAME", "")
+# Margen antes del timeout para pausar la cascada y seguir en otra invocación
+ELIMINACION_MARGEN_MS = int(os.getenv("ELIMINACION_MARGEN_MS", "5000"))
+
+ESQUEMAS_POR_TABLA = {
+    TABLE_CLIENTES: "cliente",
+    TABLE_DOMICILIOS: "domicilio",
+    TABLE_PRODUCTOS: "producto",
+    TABLE_IDEMPOTENCIA: "idempotencia",
+    TABLE_TRABAJOS: "trabajo",
+    TABLE_VERSIONES: "version",
+}
+
+# Clientes AWS: se crean en el primer uso desde la fábrica compartida
+def get_dynamodb():
+    return aws_clients.get_resource('dynamodb')
+
+def get_dynamodb_client():
+    return aws_clients.get_client('dynamodb')
+
+def get_cloudwatch():
+    return aws_clients.get_client('cloudwatch')
+
+def get_s3_client():
+    return aws_clients.get_client('s3')
+
+def get_lambda():
+    return aws_clients.get_client('lambda')
+
+def precalentar():
+    """Crea clientes AWS, tablas y repositorios antes del primer request"""
+    get_cloudwatch()
+    get_repositorios()
+    if REPOSITORY_BACKEND == "dynamodb":
+        for table_name in ESQUEMAS_POR_TABLA:
+            get_table(table_name)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Precalienta cada worker de server.py antes de aceptar requests"""
+    if WARMUP_ON_STARTUP:
+        await anyio.to_thread.run_sync(precalentar)
+    yield
 
 app = FastAPI(
     title="API Catálogos",
     description="CRUD de Clientes, Domicilios y Productos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+tracing.configurar("catalogos", "NotasVenta/Catalogos")
+app.add_middleware(tracing.ServerTimingMiddleware)
+# Última en agregarse = la más externa: comprime la respuesta ya completa
+app.add_middleware(compresion.CompresionMiddleware)
+
 # ==================== MÉTRICAS ====================
 
 def put_metric(metric_name: str, value: float, unit: str = "Count", dimensions: dict = None):
@@ -47,7 +134,7 @@ def put_metric(metric_name: str, value: float, unit: str = "Count", dimensions:
             for key, val in dimensions.items():
                 metric_dimensions.append({"Name": key, "Value": str(val)})
         
-        cloudwatch.put_metric_data(
+        get_cloudwatch().put_metric_data(
             Namespace="NotasVenta/Catalogos",
             MetricData=[{
                 "MetricName": metric_name,
@@ -60,18 +147,35 @@ def put_metric(metric_name: str, value: float, unit: str = "Count", dimensions:
     except Exception as e:
         print(f"Error enviando métrica: {e}")
 
+_limitador = RunVar("limitador_endpoints")
+
+def get_limitador() -> anyio.CapacityLimiter:
+    """Limitador de hilos para endpoints, uno por event loop"""
+    try:
+        return _limitador.get()
+    except LookupError:
+        limitador = anyio.CapacityLimiter(THREADPOOL_SIZE)
+        _limitador.set(limitador)
+        return limitador
+
 def track_request_metrics(func):
-    """Decorador para trackear métricas de requests HTTP"""
+    """Decorador para trackear métricas de requests HTTP
+
+    El endpoint y el envío de métricas corren en el pool de hilos, así el
+    event loop sigue atendiendo otros requests mientras boto3 espera red.
+    """
     @wraps(func)
-    async def wrapper(*args, **kwargs):
+    def medido(*args, **kwargs):
         start_time = time.time()
         try:
-            response = await func(*args, **kwargs)
+            response = func(*args, **kwargs)
             status_code = getattr(response, 'status_code', 200)
             
             # Métricas por rango de código HTTP
             if 200 <= status_code < 300:
                 put_metric("HTTPRequests2xx", 1, dimensions={"Endpoint": func.__name__})
+            elif 300 <= status_code < 400:
+                put_metric("HTTPRequests3xx", 1, dimensions={"Endpoint": func.__name__})
             elif 400 <= status_code < 500:
                 put_metric("HTTPRequests4xx", 1, dimensions={"Endpoint": func.__name__})
             elif 500 <= status_code < 600:
@@ -93,6 +197,10 @@ def track_request_metrics(func):
             execution_time = (time.time() - start_time) * 1000  # en milisegundos
             put_metric("ExecutionTime", execution_time, "Milliseconds", {"Endpoint": func.__name__})
     
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await anyio.to_thread.run_sync(partial(medido, *args, **kwargs), limiter=get_limitador())
+    
     return wrapper
 
 # ==================== MODELOS ====================
@@ -155,11 +263,66 @@ class Producto(ProductoCreate):
     created_at: str
     updated_at: str
 
+class ProductoEncontrado(Producto):
+    relevancia: float
+
+class LoteIds(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=BATCH_GET_MAX_IDS)
+
+class ClientesLote(BaseModel):
+    items: Dict[str, Cliente]
+    no_encontrados: List[str]
+
+class DomiciliosLote(BaseModel):
+    items: Dict[str, Domicilio]
+    no_encontrados: List[str]
+
+class ProductosLote(BaseModel):
+    items: Dict[str, Producto]
+    no_encontrados: List[str]
+
+# Serialización de las lecturas sin revalidar (ver respuestas.py)
+_json_cliente = respuestas.Serializador(Cliente)
+_json_domicilio = respuestas.Serializador(Domicilio)
+_json_producto = respuestas.Serializador(Producto)
+_json_producto_encontrado = respuestas.Serializador(ProductoEncontrado)
+
 # ==================== HELPERS ====================
 
+_tablas = {}
+
 def get_table(table_name: str):
     """Obtiene una referencia a la tabla de DynamoDB"""
-    return dynamodb.Table(table_name)
+    if DYNAMODB_ACCESS_MODE == "resource":
+        return get_dynamodb().Table(table_name)
+    tabla = _tablas.get(table_name)
+    if tabla is None:
+        esquema = dynamodb_codec.ESQUEMAS.get(ESQUEMAS_POR_TABLA.get(table_name))
+        tabla = dynamodb_codec.TablaDynamo(get_dynamodb_client(), table_name, esquema)
+        _tablas[table_name] = tabla
+    return tabla
+
+_repositorios = None
+
+def get_repositorios() -> repositorios.Repositorios:
+    """Obtiene los repositorios del backend configurado"""
+    global _repositorios
+    if _repositorios is None:
+        _repositorios = repositorios.crear_repositorios(
+            REPOSITORY_BACKEND,
+            {
+                "clientes": TABLE_CLIENTES,
+                "domicilios": TABLE_DOMICILIOS,
+                "productos": TABLE_PRODUCTOS,
+                "idempotencia": TABLE_IDEMPOTENCIA,
+                "trabajos": TABLE_TRABAJOS,
+                "versiones": TABLE_VERSIONES,
+            },
+            # get_table se resuelve en cada llamada para poder sustituirla
+            get_table=lambda table_name: get_table(table_name),
+            latencia_ms=MEMORY_LATENCY_MS
+        )
+    return _repositorios
 
 def decimal_default(obj):
     """Helper para serializar Decimal a float"""
@@ -173,20 +336,79 @@ def convert_decimals(item: dict) -> dict:
         return None
     return json.loads(json.dumps(item, default=decimal_default))
 
+def get_repo_idempotencia():
+    return get_repositorios().idempotencia
+
+def marcar_cambio(*entidades: str) -> Optional[int]:
+    """Incrementa la versión de catálogo de las entidades modificadas;
+    regresa la nueva versión de la última (None si falló)"""
+    repo = get_repositorios().versiones
+    version = None
+    for entidad in entidades:
+        try:
+            version = etags.incrementar_version(repo, entidad)
+        except Exception as e:
+            version = None
+            # El cambio ya se guardó; hasta la siguiente escritura el listado
+            # puede responder 304 con contenido viejo
+            print(f"Error incrementando versión de {entidad}: {e}")
+            put_metric("VersionCatalogoFallida", 1, dimensions={"Entidad": entidad})
+    return version
+
+def obtener_por_ids(repo, ids: List[str], serializador: respuestas.Serializador) -> Response:
+    """Items por id (BatchGetItem) en el orden pedido, más los ids que no existen"""
+    unicos = list(dict.fromkeys(ids))
+    encontrados = repo.obtener_lote(unicos)
+    return respuestas.respuesta_json({
+        "items": {i: serializador.proyectar(encontrados[i]) for i in unicos if i in encontrados},
+        "no_encontrados": [i for i in unicos if i not in encontrados],
+    })
+
+_listados = etags.CacheListados()
+
+_catalogo_compacto = snapshot_catalogo.CatalogoCompacto(get_s3=get_s3_client)
+
+def productos_compactos(version: int) -> snapshot_catalogo.SnapshotProductos:
+    """Snapshot de productos de la versión de catálogo indicada"""
+    return _catalogo_compacto.vigente(version, partial(get_repositorios().productos.listar, consistente=True))
+
+def listado_condicional(entidad: str, if_none_match: Optional[str], cargar,
+                        serializador: respuestas.Serializador) -> Response:
+    """Listado completo de una entidad con ETag por versión
+
+    La versión se lee antes del scan: si una escritura ocurre en medio, el
+    cuerpo guardado es más nuevo que su versión y no al revés. Por eso
+    cargar() debe ser un scan consistente: uno eventual podría no ver una
+    escritura que la versión ya cuenta y quedaría en caché con el ETag nuevo.
+    """
+    version = etags.version(get_repositorios().versiones, entidad)
+    etag = etags.calcular(entidad, version)
+    if etags.coincide(if_none_match, etag):
+        return etags.no_modificado(etag)
+    cuerpo = _listados.obtener(entidad, version)
+    if cuerpo is None:
+        cuerpo = serializador.lista_json(cargar())
+        _listados.guardar(entidad, version, cuerpo)
+    return Response(content=cuerpo, media_type="application/json", headers=etags.encabezados(etag))
+
+def item_condicional(item: dict, if_none_match: Optional[str], serializador: respuestas.Serializador) -> Response:
+    """304 si el cliente ya tiene el item; si no, el item con su ETag"""
+    etag = etags.etag_item(item)
+    if etags.coincide(if_none_match, etag):
+        return etags.no_modificado(etag)
+    return serializador.uno(item, headers=etags.encabezados(etag))
+
 # ==================== ENDPOINTS DE CLIENTES ====================
 
 @app.post("/clientes", response_model=Cliente, status_code=201)
 @track_request_metrics
-async def crear_cliente(cliente: ClienteCreate):
+@idempotencia.idempotente("clientes", get_repo_idempotencia, Cliente)
+def crear_cliente(cliente: ClienteCreate):
     """Crear un nuevo cliente"""
-    table = get_table(TABLE_CLIENTES)
+    repo = get_repositorios().clientes
     
     # Verificar RFC único
-    response = table.scan(
-        FilterExpression="rfc = :rfc",
-        ExpressionAttributeValues={":rfc": cliente.rfc}
-    )
-    if response.get("Items"):
+    if repo.buscar("rfc", cliente.rfc):
         raise HTTPException(status_code=400, detail="RFC ya registrado")
     
     now = datetime.utcnow().isoformat()
@@ -201,98 +423,147 @@ async def crear_cliente(cliente: ClienteCreate):
         "updated_at": now
     }
     
-    table.put_item(Item=item)
+    repo.guardar(item)
+    marcar_cambio("clientes")
     put_metric("ClientesCreados", 1)
     return item
 
 @app.get("/clientes", response_model=List[Cliente])
 @track_request_metrics
-async def listar_clientes():
+def listar_clientes(if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
     """Listar todos los clientes"""
-    table = get_table(TABLE_CLIENTES)
-    response = table.scan()
-    return [convert_decimals(item) for item in response.get("Items", [])]
+    return listado_condicional(
+        "clientes", if_none_match, partial(get_repositorios().clientes.listar, consistente=True), _json_cliente
+    )
+
+@app.post("/clientes:batchGet", response_model=ClientesLote)
+@track_request_metrics
+def obtener_clientes_lote(lote: LoteIds):
+    """Obtener varios clientes por ID"""
+    return obtener_por_ids(get_repositorios().clientes, lote.ids, _json_cliente)
 
 @app.get("/clientes/{cliente_id}", response_model=Cliente)
 @track_request_metrics
-async def obtener_cliente(cliente_id: str):
+def obtener_cliente(cliente_id: str, if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
     """Obtener un cliente por ID"""
-    table = get_table(TABLE_CLIENTES)
-    response = table.get_item(Key={"id": cliente_id})
-    item = response.get("Item")
+    item = get_repositorios().clientes.obtener(cliente_id)
     if not item:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
-    return convert_decimals(item)
+    return item_condicional(item, if_none_match, _json_cliente)
 
 @app.put("/clientes/{cliente_id}", response_model=Cliente)
 @track_request_metrics
-async def actualizar_cliente(cliente_id: str, cliente: ClienteUpdate):
+def actualizar_cliente(cliente_id: str, cliente: ClienteUpdate):
     """Actualizar un cliente existente"""
-    table = get_table(TABLE_CLIENTES)
+    repo = get_repositorios().clientes
     
     # Verificar que existe
-    existing = table.get_item(Key={"id": cliente_id})
-    if not existing.get("Item"):
+    if not repo.obtener(cliente_id):
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     
-    # Construir expresión de actualización
-    update_expression = "SET updated_at = :updated_at"
-    expression_values = {":updated_at": datetime.utcnow().isoformat()}
-    
+    cambios = {"updated_at": datetime.utcnow().isoformat()}
     update_data = cliente.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         if value is not None:
-            update_expression += f", {key} = :{key}"
-            expression_values[f":{key}"] = value
-    
-    response = table.update_item(
-        Key={"id": cliente_id},
-        UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_values,
-        ReturnValues="ALL_NEW"
-    )
+            cambios[key] = value
     
-    return convert_decimals(response["Attributes"])
+    actualizado = repo.actualizar(cliente_id, cambios)
+    marcar_cambio("clientes")
+    return convert_decimals(actualizado)
 
 @app.delete("/clientes/{cliente_id}", status_code=204)
 @track_request_metrics
-async def eliminar_cliente(cliente_id: str):
-    """Eliminar un cliente"""
-    table = get_table(TABLE_CLIENTES)
+def eliminar_cliente(cliente_id: str, background_tasks: BackgroundTasks, asincrono: bool = False):
+    """Eliminar un cliente y sus domicilios
+
+    Con asincrono=true regresa 202 y la cascada sigue en segundo plano; el
+    avance se consulta en GET /clientes/{cliente_id}/eliminacion. Repetir el
+    DELETE reanuda una eliminación interrumpida.
+
+    En Lambda, Mangum no responde hasta terminar las BackgroundTasks, así que
+    ahí la cascada corre en una invocación asíncrona de la misma función
+    (ver handler); en server.py corre como BackgroundTask del worker.
+    """
+    repos = get_repositorios()
     
     # Verificar que existe
-    existing = table.get_item(Key={"id": cliente_id})
-    if not existing.get("Item"):
+    if not repos.clientes.obtener(cliente_id):
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     
-    # Eliminar domicilios asociados
-    table_domicilios = get_table(TABLE_DOMICILIOS)
-    domicilios = table_domicilios.scan(
-        FilterExpression="cliente_id = :cliente_id",
-        ExpressionAttributeValues={":cliente_id": cliente_id}
-    )
-    for domicilio in domicilios.get("Items", []):
-        table_domicilios.delete_item(Key={"id": domicilio["id"]})
+    trabajo = eliminacion.iniciar(repos, cliente_id)
+    marcar_cambio("clientes")
+    if asincrono:
+        if LAMBDA_FUNCTION_NAME:
+            invocar_eliminacion(cliente_id)
+        else:
+            background_tasks.add_task(ejecutar_eliminacion, cliente_id)
+        return JSONResponse(
+            status_code=202,
+            content=convert_decimals(trabajo),
+            headers={"Location": f"/clientes/{cliente_id}/eliminacion"}
+        )
     
-    table.delete_item(Key={"id": cliente_id})
+    eliminar_en_cascada(cliente_id)
     put_metric("ClientesEliminados", 1)
     return None
 
+def eliminar_en_cascada(cliente_id: str, continuar=None) -> dict:
+    try:
+        return eliminacion.ejecutar(get_repositorios(), cliente_id, INDEX_DOMICILIOS_CLIENTE, continuar)
+    finally:
+        # También si falla: pudo borrar parte de los domicilios
+        marcar_cambio("clientes", "domicilios")
+
+def invocar_eliminacion(cliente_id: str):
+    """Encola la cascada como invocación asíncrona (Event) de esta función"""
+    get_lambda().invoke(
+        FunctionName=LAMBDA_FUNCTION_NAME,
+        InvocationType="Event",
+        Payload=json.dumps({"eliminar_cliente": cliente_id}).encode()
+    )
+
+def ejecutar_eliminacion(cliente_id: str, continuar=None):
+    """Cascada en segundo plano; el error queda registrado en el trabajo
+
+    Si continuar() pide pausar, el resto sigue en una invocación nueva.
+    """
+    try:
+        trabajo = eliminar_en_cascada(cliente_id, continuar)
+    except Exception as e:
+        print(f"Error eliminando cliente {cliente_id}: {e}")
+        put_metric("EliminacionesFallidas", 1)
+        return
+    if trabajo["estado"] == eliminacion.COMPLETADO:
+        put_metric("ClientesEliminados", 1)
+    else:
+        invocar_eliminacion(cliente_id)
+
+@app.get("/clientes/{cliente_id}/eliminacion")
+@track_request_metrics
+def obtener_eliminacion_cliente(cliente_id: str):
+    """Avance de la eliminación en cascada de un cliente"""
+    trabajo = get_repositorios().trabajos.obtener(eliminacion.clave_trabajo(cliente_id))
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Eliminación no encontrada")
+    return convert_decimals(trabajo)
+
 # ==================== ENDPOINTS DE DOMICILIOS ====================
 
 @app.post("/domicilios", response_model=Domicilio, status_code=201)
 @track_request_metrics
-async def crear_domicilio(domicilio: DomicilioCreate):
+@idempotencia.idempotente("domicilios", get_repo_idempotencia, Domicilio)
+def crear_domicilio(domicilio: DomicilioCreate):
     """Crear un nuevo domicilio para un cliente"""
-    # Verificar que el cliente existe
-    table_clientes = get_table(TABLE_CLIENTES)
-    cliente = table_clientes.get_item(Key={"id": domicilio.cliente_id})
-    if not cliente.get("Item"):
+    repos = get_repositorios()
+    
+    # Verificar que el cliente existe y no se está eliminando
+    cliente = repos.clientes.obtener(domicilio.cliente_id)
+    if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    if cliente.get("estado") == eliminacion.ELIMINANDO:
+        raise HTTPException(status_code=409, detail="Cliente en proceso de eliminación")
     
-    table = get_table(TABLE_DOMICILIOS)
     now = datetime.utcnow().isoformat()
-    
     item = {
         "id": str(uuid.uuid4()),
         "cliente_id": domicilio.cliente_id,
@@ -305,73 +576,69 @@ async def crear_domicilio(domicilio: DomicilioCreate):
         "updated_at": now
     }
     
-    table.put_item(Item=item)
+    repos.domicilios.guardar(item)
+    marcar_cambio("domicilios")
     put_metric("DomiciliosCreados", 1)
     return item
 
 @app.get("/domicilios/cliente/{cliente_id}", response_model=List[Domicilio])
 @track_request_metrics
-async def listar_domicilios_cliente(cliente_id: str):
+def listar_domicilios_cliente(cliente_id: str, if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
     """Listar todos los domicilios de un cliente"""
-    table = get_table(TABLE_DOMICILIOS)
-    response = table.scan(
-        FilterExpression="cliente_id = :cliente_id",
-        ExpressionAttributeValues={":cliente_id": cliente_id}
-    )
-    return [convert_decimals(item) for item in response.get("Items", [])]
+    repos = get_repositorios()
+    etag = etags.calcular("domicilios", etags.version(repos.versiones, "domicilios"), cliente_id)
+    if etags.coincide(if_none_match, etag):
+        return etags.no_modificado(etag)
+    items, _ = repos.domicilios.consultar(INDEX_DOMICILIOS_CLIENTE, "cliente_id", cliente_id)
+    return _json_domicilio.lista(items, headers=etags.encabezados(etag))
+
+@app.post("/domicilios:batchGet", response_model=DomiciliosLote)
+@track_request_metrics
+def obtener_domicilios_lote(lote: LoteIds):
+    """Obtener varios domicilios por ID"""
+    return obtener_por_ids(get_repositorios().domicilios, lote.ids, _json_domicilio)
 
 @app.get("/domicilios/{domicilio_id}", response_model=Domicilio)
 @track_request_metrics
-async def obtener_domicilio(domicilio_id: str):
+def obtener_domicilio(domicilio_id: str, if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
     """Obtener un domicilio por ID"""
-    table = get_table(TABLE_DOMICILIOS)
-    response = table.get_item(Key={"id": domicilio_id})
-    item = response.get("Item")
+    item = get_repositorios().domicilios.obtener(domicilio_id)
     if not item:
         raise HTTPException(status_code=404, detail="Domicilio no encontrado")
-    return convert_decimals(item)
+    return item_condicional(item, if_none_match, _json_domicilio)
 
 @app.put("/domicilios/{domicilio_id}", response_model=Domicilio)
 @track_request_metrics
-async def actualizar_domicilio(domicilio_id: str, domicilio: DomicilioUpdate):
+def actualizar_domicilio(domicilio_id: str, domicilio: DomicilioUpdate):
     """Actualizar un domicilio existente"""
-    table = get_table(TABLE_DOMICILIOS)
+    repo = get_repositorios().domicilios
     
-    existing = table.get_item(Key={"id": domicilio_id})
-    if not existing.get("Item"):
+    if not repo.obtener(domicilio_id):
         raise HTTPException(status_code=404, detail="Domicilio no encontrado")
     
-    update_expression = "SET updated_at = :updated_at"
-    expression_values = {":updated_at": datetime.utcnow().isoformat()}
-    
+    cambios = {"updated_at": datetime.utcnow().isoformat()}
     update_data = domicilio.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         if value is not None:
             if key == "tipo_direccion":
                 value = value.value
-            update_expression += f", {key} = :{key}"
-            expression_values[f":{key}"] = value
-    
-    response = table.update_item(
-        Key={"id": domicilio_id},
-        UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_values,
-        ReturnValues="ALL_NEW"
-    )
+            cambios[key] = value
     
-    return convert_decimals(response["Attributes"])
+    actualizado = repo.actualizar(domicilio_id, cambios)
+    marcar_cambio("domicilios")
+    return convert_decimals(actualizado)
 
 @app.delete("/domicilios/{domicilio_id}", status_code=204)
 @track_request_metrics
-async def eliminar_domicilio(domicilio_id: str):
+def eliminar_domicilio(domicilio_id: str):
     """Eliminar un domicilio"""
-    table = get_table(TABLE_DOMICILIOS)
+    repo = get_repositorios().domicilios
     
-    existing = table.get_item(Key={"id": domicilio_id})
-    if not existing.get("Item"):
+    if not repo.obtener(domicilio_id):
         raise HTTPException(status_code=404, detail="Domicilio no encontrado")
     
-    table.delete_item(Key={"id": domicilio_id})
+    repo.eliminar(domicilio_id)
+    marcar_cambio("domicilios")
     put_metric("DomiciliosEliminados", 1)
     return None
 
@@ -379,9 +646,9 @@ async def eliminar_domicilio(domicilio_id: str):
 
 @app.post("/productos", response_model=Producto, status_code=201)
 @track_request_metrics
-async def crear_producto(producto: ProductoCreate):
+@idempotencia.idempotente("productos", get_repo_idempotencia, Producto)
+def crear_producto(producto: ProductoCreate):
     """Crear un nuevo producto"""
-    table = get_table(TABLE_PRODUCTOS)
     now = datetime.utcnow().isoformat()
     
     item = {
@@ -393,75 +660,90 @@ async def crear_producto(producto: ProductoCreate):
         "updated_at": now
     }
     
-    table.put_item(Item=item)
+    get_repositorios().productos.guardar(item)
+    busqueda.indice.aplicar(item["id"], item, marcar_cambio("productos"))
     put_metric("ProductosCreados", 1)
     return convert_decimals(item)
 
 @app.get("/productos", response_model=List[Producto])
 @track_request_metrics
-async def listar_productos():
+def listar_productos(if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
     """Listar todos los productos"""
-    table = get_table(TABLE_PRODUCTOS)
-    response = table.scan()
-    return [convert_decimals(item) for item in response.get("Items", [])]
+    return listado_condicional(
+        "productos", if_none_match, partial(get_repositorios().productos.listar, consistente=True), _json_producto
+    )
+
+@app.get("/productos/buscar", response_model=List[ProductoEncontrado])
+@track_request_metrics
+def buscar_productos(q: str = Query(..., min_length=1, max_length=100), limite: int = Query(20, ge=1, le=100)):
+    """Buscar productos por nombre o unidad de medida (prefijo o aproximado)
+
+    Declarada antes de /productos/{producto_id} para que "buscar" no se tome
+    como un id.
+    """
+    repos = get_repositorios()
+    busqueda.indice.vigente(
+        lambda: etags.version(repos.versiones, "productos"),
+        lambda version: list(productos_compactos(version).productos())
+    )
+    return _json_producto_encontrado.lista([
+        {**item, "relevancia": relevancia} for item, relevancia in busqueda.indice.buscar(q, limite)
+    ])
+
+@app.post("/productos:batchGet", response_model=ProductosLote)
+@track_request_metrics
+def obtener_productos_lote(lote: LoteIds):
+    """Obtener varios productos por ID"""
+    return obtener_por_ids(get_repositorios().productos, lote.ids, _json_producto)
 
 @app.get("/productos/{producto_id}", response_model=Producto)
 @track_request_metrics
-async def obtener_producto(producto_id: str):
+def obtener_producto(producto_id: str, if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
     """Obtener un producto por ID"""
-    table = get_table(TABLE_PRODUCTOS)
-    response = table.get_item(Key={"id": producto_id})
-    item = response.get("Item")
+    item = get_repositorios().productos.obtener(producto_id)
     if not item:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return convert_decimals(item)
+    return item_condicional(item, if_none_match, _json_producto)
 
 @app.put("/productos/{producto_id}", response_model=Producto)
 @track_request_metrics
-async def actualizar_producto(producto_id: str, producto: ProductoUpdate):
+def actualizar_producto(producto_id: str, producto: ProductoUpdate):
     """Actualizar un producto existente"""
-    table = get_table(TABLE_PRODUCTOS)
+    repo = get_repositorios().productos
     
-    existing = table.get_item(Key={"id": producto_id})
-    if not existing.get("Item"):
+    if not repo.obtener(producto_id):
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
-    update_expression = "SET updated_at = :updated_at"
-    expression_values = {":updated_at": datetime.utcnow().isoformat()}
-    
+    cambios = {"updated_at": datetime.utcnow().isoformat()}
     update_data = producto.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         if value is not None:
             if key == "precio_base":
                 value = Decimal(str(value))
-            update_expression += f", {key} = :{key}"
-            expression_values[f":{key}"] = value
+            cambios[key] = value
     
-    response = table.update_item(
-        Key={"id": producto_id},
-        UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_values,
-        ReturnValues="ALL_NEW"
-    )
-    
-    return convert_decimals(response["Attributes"])
+    actualizado = repo.actualizar(producto_id, cambios)
+    busqueda.indice.aplicar(producto_id, actualizado, marcar_cambio("productos"))
+    return convert_decimals(actualizado)
 
 @app.delete("/productos/{producto_id}", status_code=204)
 @track_request_metrics
-async def eliminar_producto(producto_id: str):
+def eliminar_producto(producto_id: str):
     """Eliminar un producto"""
-    table = get_table(TABLE_PRODUCTOS)
+    repo = get_repositorios().productos
     
-    existing = table.get_item(Key={"id": producto_id})
-    if not existing.get("Item"):
+    if not repo.obtener(producto_id):
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
-    table.delete_item(Key={"id": producto_id})
+    repo.eliminar(producto_id)
+    busqueda.indice.aplicar(producto_id, None, marcar_cambio("productos"))
     put_metric("ProductosEliminados", 1)
     return None
 
 # ==================== HEALTH CHECK ====================
 
+# async def: no hace I/O, así que no pasa por el threadpool (que en frío se
+# crea con el primer request)
 @app.get("/health")
 async def health_check():
     """Endpoint de salud"""
@@ -469,8 +751,19 @@ async def health_check():
         "status": "healthy",
         "service": "catalogos",
         "environment": ENVIRONMENT,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat(),
+        "aws_pool": aws_clients.pool_stats()
     }
 
 # Handler para Lambda
-handler = Mangum(app, lifespan="off")
+handler_api = Mangum(app, lifespan="off")
+
+def handler(event, context):
+    """Eventos de API Gateway y cascadas de eliminación (invocar_eliminacion)"""
+    if "eliminar_cliente" in event:
+        ejecutar_eliminacion(
+            event["eliminar_cliente"],
+            lambda: context.get_remaining_time_in_millis() > ELIMINACION_MARGEN_MS
+        )
+        return None
+    return handler_api(event, context)
@@ -0,0 +1,131 @@
+"""
+Fábrica compartida de clientes AWS
+Una sola sesión boto3 por proceso con pool de conexiones, reintentos y
+timeouts configurables por ambiente. Cada cliente queda instrumentado para
+registrar sus llamadas en la traza del request (ver tracing.py).
+
+Este archivo es idéntico en modulo-catalogos, modulo-notas y
+modulo-notificaciones: cada módulo se empaqueta por separado desde su src/
+(lo verifica modulo-notas/tests/test_compartidos.py).
+"""
+import os
+import threading
+import boto3
+from botocore.config import Config
+import tracing
+
+# Configuración de ambiente
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "adaptive")
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "5"))
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "3"))
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", "20"))
+AWS_TCP_KEEPALIVE = os.getenv("AWS_TCP_KEEPALIVE", "true").lower() == "true"
+
+# Crear clientes desde una misma sesión no es thread-safe
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_resources = {}
+
+def build_config() -> Config:
+    """Configuración de botocore compartida por todos los clientes"""
+    return Config(
+        region_name=AWS_REGION,
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        retries={"mode": AWS_RETRY_MODE, "max_attempts": AWS_MAX_ATTEMPTS},
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        tcp_keepalive=AWS_TCP_KEEPALIVE
+    )
+
+def get_session():
+    """Obtiene la sesión boto3 del proceso"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = boto3.session.Session(region_name=AWS_REGION)
+    return _session
+
+def get_client(service: str):
+    """Obtiene (y memoriza) el cliente de bajo nivel de un servicio"""
+    client = _clients.get(service)
+    if client is None:
+        session = get_session()
+        with _lock:
+            client = _clients.get(service)
+            if client is None:
+                client = session.client(service, config=build_config())
+                tracing.instrumentar_cliente(client)
+                _clients[service] = client
+    return client
+
+def get_resource(service: str):
+    """Obtiene (y memoriza) el resource de un servicio (p. ej. dynamodb)"""
+    resource = _resources.get(service)
+    if resource is None:
+        session = get_session()
+        with _lock:
+            resource = _resources.get(service)
+            if resource is None:
+                resource = session.resource(service, config=build_config())
+                tracing.instrumentar_cliente(resource.meta.client)
+                _resources[service] = resource
+    return resource
+
+def registrar_cliente(service: str, client):
+    """Sustituye el cliente de un servicio (stand-ins locales para pruebas de carga)"""
+    with _lock:
+        _clients[service] = client
+
+def reset():
+    """Descarta la sesión y los clientes memorizados"""
+    global _session
+    with _lock:
+        _session = None
+        _clients.clear()
+        _resources.clear()
+
+# ==================== MÉTRICAS DEL POOL ====================
+
+def _estadisticas_cliente(client) -> dict:
+    """Lee el estado de los pools de urllib3 de un cliente botocore"""
+    stats = {"pools": 0, "max_conexiones": 0, "en_uso": 0, "conexiones_creadas": 0, "requests": 0}
+    try:
+        manager = client._endpoint.http_session._manager
+    except AttributeError:
+        return stats
+    for key in list(manager.pools.keys()):
+        pool = manager.pools.get(key)
+        if pool is None or pool.pool is None:
+            continue
+        stats["pools"] += 1
+        stats["max_conexiones"] += pool.pool.maxsize
+        stats["en_uso"] += pool.pool.maxsize - pool.pool.qsize()
+        stats["conexiones_creadas"] += pool.num_connections
+        stats["requests"] += pool.num_requests
+    return stats
+
+def pool_stats() -> dict:
+    """Utilización del pool de conexiones por servicio"""
+    clients = dict(_clients)
+    for service, resource in list(_resources.items()):
+        clients.setdefault(service, resource.meta.client)
+    resultado = {}
+    for service, client in clients.items():
+        stats = _estadisticas_cliente(client)
+        if stats["max_conexiones"]:
+            stats["utilizacion"] = round(stats["en_uso"] / stats["max_conexiones"], 4)
+        else:
+            stats["utilizacion"] = 0.0
+        resultado[service] = stats
+    return resultado
+
+def put_pool_metrics(put_metric):
+    """Publica la utilización del pool usando el put_metric del módulo"""
+    for service, stats in pool_stats().items():
+        dimensions = {"AWSService": service}
+        put_metric("AWSPoolConexionesEnUso", stats["en_uso"], dimensions=dimensions)
+        put_metric("AWSPoolUtilizacion", stats["utilizacion"] * 100, "Percent", dimensions)
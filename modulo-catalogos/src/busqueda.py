@@ -0,0 +1,229 @@
+"""
+Búsqueda de productos en memoria
+
+Índice invertido sobre `nombre` y `unidad_medida` que vive en el contenedor:
+- Prefijos de cada palabra: "torn" encuentra "Tornillo"
+- Trigramas de cada palabra para coincidencias aproximadas: "tornilo" o
+  "tronillo" también encuentran "Tornillo"
+
+El texto se compara sin acentos ni mayúsculas. Cada palabra de la consulta
+tiene que coincidir con alguna palabra del producto; la relevancia es el
+promedio por palabra de 1.0 (exacta), 0.9 (prefijo) u 0.8 x la similitud de
+trigramas (aproximada), con la mitad de peso si la coincidencia es en la
+unidad de medida. Las aproximadas solo se calculan cuando las exactas y por
+prefijo no llenan el límite.
+
+El índice se construye desde el snapshot de productos (ver
+snapshot_catalogo.py) la primera vez y después se
+mantiene con las altas, cambios y bajas de este contenedor. Para ver las
+escrituras de otros contenedores se compara con la versión de catálogo de
+productos (ver etags.py) a lo más cada BUSQUEDA_REVISION_SEGUNDOS; si no
+coincide se reconstruye.
+"""
+import os
+import re
+import time
+import heapq
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Configuración de ambiente
+BUSQUEDA_REVISION_SEGUNDOS = float(os.getenv("BUSQUEDA_REVISION_SEGUNDOS", "5"))
+# Similitud mínima de trigramas para una coincidencia aproximada
+BUSQUEDA_SIMILITUD_MINIMA = float(os.getenv("BUSQUEDA_SIMILITUD_MINIMA", "0.45"))
+
+CAMPOS = {"nombre": 1.0, "unidad_medida": 0.5}
+
+_PALABRA = re.compile(r"\w+")
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin acentos"""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def palabras(texto: str) -> List[str]:
+    return _PALABRA.findall(normalizar(texto or ""))
+
+def trigramas(palabra: str) -> Set[str]:
+    marcada = f"^{palabra}$"
+    return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+
+def similitud(a: Set[str], b: Set[str]) -> float:
+    """Coeficiente de Dice entre dos conjuntos de trigramas"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+class IndiceProductos:
+    """Índice invertido de productos por prefijo y trigrama"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revision = threading.Lock()
+        self.version: Optional[int] = None
+        self.revisado_en = 0.0
+        self._items: Dict[str, dict] = {}
+        # id -> llave de desempate (nombre normalizado, id)
+        self._orden: Dict[str, Tuple[str, str]] = {}
+        # id -> [(palabra, peso del campo, trigramas)]
+        self._palabras: Dict[str, List[Tuple[str, float, Set[str]]]] = {}
+        # prefijo -> {id: puntos}; los puntos ya incluyen exacta/prefijo y peso
+        self._prefijos: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._trigramas: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _indexar(self, item: dict):
+        item_id = item["id"]
+        lista = []
+        for campo, peso in CAMPOS.items():
+            for palabra in palabras(item.get(campo)):
+                sus_trigramas = trigramas(palabra)
+                lista.append((palabra, peso, sus_trigramas))
+                for i in range(1, len(palabra) + 1):
+                    puntos = (1.0 if i == len(palabra) else 0.9) * peso
+                    postings = self._prefijos[palabra[:i]]
+                    if puntos > postings.get(item_id, 0.0):
+                        postings[item_id] = puntos
+                for trigrama in sus_trigramas:
+                    self._trigramas[trigrama].add(item_id)
+        self._items[item_id] = item
+        self._orden[item_id] = (normalizar(item.get("nombre") or ""), item_id)
+        self._palabras[item_id] = lista
+
+    def _desindexar(self, item_id: str):
+        if self._items.pop(item_id, None) is None:
+            return
+        del self._orden[item_id]
+        for palabra, _, sus_trigramas in self._palabras.pop(item_id):
+            for i in range(1, len(palabra) + 1):
+                postings = self._prefijos.get(palabra[:i])
+                if postings is not None:
+                    postings.pop(item_id, None)
+                    if not postings:
+                        del self._prefijos[palabra[:i]]
+            for trigrama in sus_trigramas:
+                ids = self._trigramas.get(trigrama)
+                if ids is not None:
+                    ids.discard(item_id)
+                    if not ids:
+                        del self._trigramas[trigrama]
+
+    def reconstruir(self, items: List[dict], version: Optional[int]):
+        """Reemplaza el contenido completo del índice"""
+        nuevo = IndiceProductos()
+        for item in items:
+            nuevo._indexar(item)
+        with self._lock:
+            self._items, self._orden, self._palabras = nuevo._items, nuevo._orden, nuevo._palabras
+            self._prefijos, self._trigramas = nuevo._prefijos, nuevo._trigramas
+            self.version = version
+            self.revisado_en = time.monotonic()
+
+    def aplicar(self, item_id: str, item: Optional[dict], version: Optional[int]):
+        """
+        Alta o cambio (item) o baja (item=None) hecha por este contenedor
+
+        La versión del índice solo avanza si esta escritura es la siguiente a
+        la que ya refleja; si hubo escrituras de otros contenedores en medio,
+        la siguiente revisión lo reconstruye.
+        """
+        with self._lock:
+            if self.version is None:
+                return
+            self._desindexar(item_id)
+            if item is not None:
+                self._indexar(item)
+            if version is not None and version == self.version + 1:
+                self.version = version
+
+    def vigente(self, version_actual: Callable[[], int], cargar: Callable[[int], List[dict]]):
+        """Construye o reconstruye el índice si su versión quedó atrás"""
+        if self.version is not None and time.monotonic() - self.revisado_en < BUSQUEDA_REVISION_SEGUNDOS:
+            return
+        # Un solo hilo revisa; los demás esperan y encuentran el índice al día
+        with self._revision:
+            if self.version is not None and time.monotonic() - self.revisado_en < BUSQUEDA_REVISION_SEGUNDOS:
+                return
+            version = version_actual()
+            if version == self.version:
+                self.revisado_en = time.monotonic()
+                return
+            # La versión se lee antes del scan, igual que los listados con ETag
+            self.reconstruir(cargar(version), version)
+
+    def _aproximados(self, sus_trigramas: Set[str], entre: Optional[Set[str]] = None) -> Dict[str, float]:
+        """Puntos por similitud de trigramas con alguna palabra del producto
+        (solo para los ids de `entre` si se indica)"""
+        if entre is not None:
+            posibles = entre
+        else:
+            # Dice >= m exige compartir al menos m*|q|/(2-m) trigramas
+            minimo = BUSQUEDA_SIMILITUD_MINIMA * len(sus_trigramas) / (2 - BUSQUEDA_SIMILITUD_MINIMA)
+            compartidos = Counter()
+            for trigrama in sus_trigramas:
+                compartidos.update(self._trigramas.get(trigrama, ()))
+            posibles = [item_id for item_id, n in compartidos.items() if n >= minimo]
+        puntos = {}
+        for item_id in posibles:
+            mejor = 0.0
+            for _, peso, trigramas_propios in self._palabras[item_id]:
+                parecido = similitud(sus_trigramas, trigramas_propios)
+                if parecido >= BUSQUEDA_SIMILITUD_MINIMA:
+                    mejor = max(mejor, parecido * 0.8 * peso)
+            if mejor:
+                puntos[item_id] = mejor
+        return puntos
+
+    def _con_aproximados(self, consulta: List[str], por_palabra: List[Dict[str, float]]) -> List[Dict[str, float]]:
+        """Agrega las coincidencias aproximadas a los puntos por palabra
+
+        Las palabras se procesan de la más selectiva a la menos (las que no
+        tienen ningún prefijo al final); cada una solo evalúa los productos
+        que siguen vivos, así una palabra frecuente no recorre todo el índice.
+        """
+        orden = sorted(range(len(consulta)), key=lambda k: (not por_palabra[k], len(por_palabra[k])))
+        combinados = [None] * len(consulta)
+        vivos = None
+        for k in orden:
+            combinado = self._aproximados(trigramas(consulta[k]), vivos)
+            for item_id, puntos in por_palabra[k].items():
+                if puntos > combinado.get(item_id, 0.0) and (vivos is None or item_id in vivos):
+                    combinado[item_id] = puntos
+            vivos = set(combinado)
+            if not vivos:
+                return []
+            combinados[k] = combinado
+        return combinados
+
+    def buscar(self, texto: str, limite: int = 20) -> List[Tuple[dict, float]]:
+        """Productos que coinciden con todas las palabras, del más relevante al menos"""
+        consulta = palabras(texto)
+        if not consulta:
+            return []
+        with self._lock:
+            # Primero exactas y prefijos (precalculados); las aproximadas solo
+            # si no alcanzan para el límite
+            por_palabra = [self._prefijos.get(palabra, {}) for palabra in consulta]
+            candidatos = set.intersection(*(set(puntos) for puntos in por_palabra))
+            if len(candidatos) < limite:
+                por_palabra = self._con_aproximados(consulta, por_palabra)
+                if not por_palabra:
+                    return []
+                candidatos = set.intersection(*(set(puntos) for puntos in por_palabra))
+            if len(por_palabra) == 1:
+                relevancias = {item_id: por_palabra[0][item_id] for item_id in candidatos}
+            else:
+                relevancias = {
+                    item_id: sum(puntos[item_id] for puntos in por_palabra) / len(consulta)
+                    for item_id in candidatos
+                }
+            orden = self._orden
+            mejores = heapq.nsmallest(limite, relevancias, key=lambda i: (-relevancias[i], orden[i]))
+            return [(self._items[i], round(relevancias[i], 4)) for i in mejores]
+
+# Índice del contenedor caliente
+indice = IndiceProductos()
@@ -0,0 +1,119 @@
+"""
+Compresión de respuestas HTTP (brotli o gzip)
+
+Middleware ASGI que comprime las respuestas JSON/texto a partir de
+COMPRESION_MIN_BYTES según el Accept-Encoding del cliente: brotli si el
+paquete está instalado y el cliente lo acepta, si no gzip. Las respuestas del
+catálogo son JSON completos (sin streaming), así que el cuerpo se junta antes
+de comprimir.
+
+El ETag fuerte de una respuesta comprimida lleva el sufijo de la codificación
+("abc" -> "abc-gzip") porque los bytes son distintos; etags.coincide lo quita
+al comparar If-None-Match.
+
+Toda respuesta que podría comprimirse lleva Vary: Accept-Encoding, aunque
+esta vez salga sin comprimir (cuerpo chico, cliente sin gzip, 304): si no, un
+caché compartido podría entregar la variante guardada a un cliente que
+necesita la otra.
+"""
+import os
+import gzip
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete solo se usa gzip
+    brotli = None
+
+# Configuración de ambiente
+COMPRESION_ENABLED = os.getenv("COMPRESION_ENABLED", "true").lower() == "true"
+COMPRESION_MIN_BYTES = int(os.getenv("COMPRESION_MIN_BYTES", "1024"))
+COMPRESION_NIVEL_GZIP = int(os.getenv("COMPRESION_NIVEL_GZIP", "6"))
+COMPRESION_NIVEL_BROTLI = int(os.getenv("COMPRESION_NIVEL_BROTLI", "5"))
+
+TIPOS_COMPRIMIBLES = ("application/json", "text/")
+
+def negociar(accept_encoding: str) -> str:
+    """Codificación a usar ("br", "gzip" o "") según el Accept-Encoding"""
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptadas[nombre.strip()] = calidad
+    if brotli is not None and aceptadas.get("br", 0) > 0:
+        return "br"
+    if aceptadas.get("gzip", 0) > 0:
+        return "gzip"
+    return ""
+
+def comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    if codificacion == "br":
+        return brotli.compress(cuerpo, quality=COMPRESION_NIVEL_BROTLI)
+    # mtime=0: misma entrada, mismos bytes
+    return gzip.compress(cuerpo, compresslevel=COMPRESION_NIVEL_GZIP, mtime=0)
+
+def con_vary(headers: MutableHeaders):
+    """Vary: Accept-Encoding si el tipo es comprimible (o no hay cuerpo, p. ej. 304)"""
+    tipo = headers.get("content-type")
+    if tipo is None or tipo.startswith(TIPOS_COMPRIMIBLES):
+        headers.add_vary_header("Accept-Encoding")
+
+class CompresionMiddleware:
+    """Comprime respuestas grandes según Accept-Encoding"""
+
+    def __init__(self, app, minimo: int = None):
+        self.app = app
+        self.minimo = COMPRESION_MIN_BYTES if minimo is None else minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        codificacion = negociar(Headers(scope=scope).get("accept-encoding", ""))
+        if not codificacion:
+            async def send_con_vary(message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(raw=list(message["headers"]))
+                    con_vary(headers)
+                    message = {**message, "headers": headers.raw}
+                await send(message)
+
+            await self.app(scope, receive, send_con_vary)
+            return
+
+        inicio = None
+        partes = []
+
+        async def send_comprimido(message):
+            nonlocal inicio
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            partes.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            cuerpo = b"".join(partes)
+            headers = MutableHeaders(raw=list(inicio["headers"]))
+            tipo = headers.get("content-type", "")
+            if (len(cuerpo) >= self.minimo and "content-encoding" not in headers
+                    and tipo.startswith(TIPOS_COMPRIMIBLES)):
+                cuerpo = comprimir(cuerpo, codificacion)
+                headers["content-encoding"] = codificacion
+                headers["content-length"] = str(len(cuerpo))
+                etag = headers.get("etag")
+                if etag and etag.endswith('"'):
+                    headers["etag"] = f'{etag[:-1]}-{codificacion}"'
+            con_vary(headers)
+            await send({**inicio, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": cuerpo})
+
+        await self.app(scope, receive, send_comprimido)
@@ -0,0 +1,90 @@
+"""
+Eliminación en cascada de clientes
+
+Borrar un cliente borra también sus domicilios. En lugar de un scan completo
+de domicilios y un DeleteItem por cada uno, los domicilios se leen por el
+índice cliente_id en páginas y se borran en BatchWriteItem de 25.
+
+El avance vive en la tabla de trabajos (id eliminar-cliente#<cliente_id>):
+- iniciar: marca el cliente como ELIMINANDO y registra el trabajo EN_CURSO
+- ejecutar: borra domicilios por páginas sumando `procesados` y al final
+  borra el cliente; el trabajo queda COMPLETADO (o FALLIDO con el error)
+
+Cada paso se puede repetir: si el trabajo se interrumpe, volver a ejecutarlo
+continúa con los domicilios que quedan. ejecutar acepta además una función
+`continuar` que se consulta después de cada página: si regresa False la
+cascada se pausa con el trabajo EN_CURSO para seguir en otra invocación.
+"""
+import os
+import time
+from datetime import datetime
+
+# Configuración de ambiente
+ELIMINACION_PAGINA = int(os.getenv("ELIMINACION_PAGINA", "100"))
+TRABAJO_TTL_SEGUNDOS = int(os.getenv("TRABAJO_TTL_SEGUNDOS", str(7 * 24 * 3600)))
+
+# Estado del cliente mientras se borra
+ELIMINANDO = "ELIMINANDO"
+
+# Estados del trabajo
+EN_CURSO = "EN_CURSO"
+COMPLETADO = "COMPLETADO"
+FALLIDO = "FALLIDO"
+
+def clave_trabajo(cliente_id: str) -> str:
+    return f"eliminar-cliente#{cliente_id}"
+
+def iniciar(repos, cliente_id: str) -> dict:
+    """Marca el cliente y registra (o reanuda) su trabajo de eliminación"""
+    ahora = datetime.utcnow().isoformat()
+    repos.clientes.actualizar(cliente_id, {"estado": ELIMINANDO, "updated_at": ahora})
+
+    clave = clave_trabajo(cliente_id)
+    previo = repos.trabajos.obtener(clave)
+    if previo and previo["estado"] != COMPLETADO:
+        # Reanudación: se conserva el conteo de lo ya borrado
+        return repos.trabajos.actualizar(clave, {"estado": EN_CURSO, "actualizado_at": ahora})
+
+    trabajo = {
+        "id": clave,
+        "tipo": "eliminar-cliente",
+        "estado": EN_CURSO,
+        "procesados": 0,
+        "iniciado_at": ahora,
+        "actualizado_at": ahora,
+        "expira_en": int(time.time()) + TRABAJO_TTL_SEGUNDOS,
+    }
+    repos.trabajos.guardar(trabajo)
+    return trabajo
+
+def ejecutar(repos, cliente_id: str, indice: str, continuar=None) -> dict:
+    """Borra los domicilios del cliente por páginas y después el cliente
+
+    Regresa el trabajo; queda EN_CURSO si continuar() pidió pausar.
+    """
+    clave = clave_trabajo(cliente_id)
+    try:
+        cursor = None
+        while True:
+            domicilios, cursor = repos.domicilios.consultar(
+                indice, "cliente_id", cliente_id, limite=ELIMINACION_PAGINA, cursor=cursor
+            )
+            if domicilios:
+                eliminados = repos.domicilios.eliminar_lote([d["id"] for d in domicilios])
+                repos.trabajos.incrementar(
+                    clave, {"procesados": eliminados}, {"actualizado_at": datetime.utcnow().isoformat()}
+                )
+            if not cursor:
+                break
+            # Se revisa después de cada página para que toda invocación avance
+            if continuar is not None and not continuar():
+                return repos.trabajos.obtener(clave)
+        repos.clientes.eliminar(cliente_id)
+    except Exception as e:
+        repos.trabajos.actualizar(clave, {
+            "estado": FALLIDO, "error": str(e), "actualizado_at": datetime.utcnow().isoformat()
+        })
+        raise
+    return repos.trabajos.actualizar(clave, {
+        "estado": COMPLETADO, "actualizado_at": datetime.utcnow().isoformat()
+    })
@@ -0,0 +1,94 @@
+"""
+ETags y GETs condicionales del catálogo
+
+- Un item (cliente, domicilio, producto) tiene un ETag fuerte derivado de su
+  id y su updated_at, que cambia en cada escritura
+- Los listados usan la versión de su entidad en la tabla de versiones
+  (id VERSION#<entidad>): cada alta, cambio o baja la incrementa, así que un
+  listado se puede validar con un GetItem en lugar de un scan
+
+Si el If-None-Match del cliente coincide se responde 304 sin cuerpo. Además,
+el cuerpo serializado de cada listado se guarda en memoria por versión: el
+contenedor caliente solo vuelve a hacer el scan cuando la versión cambia.
+"""
+import os
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from fastapi import Response
+
+# Configuración de ambiente
+# no-cache: el cliente puede guardar la respuesta pero la revalida siempre
+CACHE_CONTROL_CATALOGO = os.getenv("CACHE_CONTROL_CATALOGO", "no-cache")
+
+# Sufijos que agrega compresion.CompresionMiddleware al ETag
+SUFIJOS_CODIFICACION = ("-gzip", "-br")
+
+def calcular(*partes) -> str:
+    """ETag fuerte a partir de las partes que identifican la representación"""
+    contenido = ":".join(str(parte) for parte in partes)
+    return '"' + hashlib.sha256(contenido.encode()).hexdigest()[:32] + '"'
+
+def etag_item(item: dict) -> str:
+    return calcular(item["id"], item.get("updated_at", ""))
+
+def _normalizar(etag: str) -> str:
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for sufijo in SUFIJOS_CODIFICACION:
+        if etag.endswith(sufijo + '"'):
+            return etag[:-len(sufijo) - 1] + '"'
+    return etag
+
+def coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """True si algún ETag del If-None-Match corresponde a `etag`"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_normalizar(candidato) == etag for candidato in if_none_match.split(","))
+
+def encabezados(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL_CATALOGO}
+
+def no_modificado(etag: str) -> Response:
+    return Response(status_code=304, headers=encabezados(etag))
+
+# ==================== VERSIONES DE CATÁLOGO ====================
+
+def clave_version(entidad: str) -> str:
+    return f"VERSION#{entidad}"
+
+def version(repo, entidad: str) -> int:
+    item = repo.obtener(clave_version(entidad))
+    return int(item["version"]) if item else 0
+
+def incrementar_version(repo, entidad: str) -> int:
+    nuevos = repo.incrementar(
+        clave_version(entidad), {"version": 1}, {"actualizado_at": datetime.utcnow().isoformat()}
+    )
+    return int(nuevos["version"])
+
+class CacheListados:
+    """Último cuerpo serializado de cada listado junto con su versión"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listados: Dict[str, Tuple[int, bytes]] = {}
+
+    def obtener(self, clave: str, version_actual: int) -> Optional[bytes]:
+        with self._lock:
+            guardado = self._listados.get(clave)
+        if guardado and guardado[0] == version_actual:
+            return guardado[1]
+        return None
+
+    def guardar(self, clave: str, version_actual: int, cuerpo: bytes):
+        with self._lock:
+            self._listados[clave] = (version_actual, cuerpo)
+
+    def limpiar(self):
+        with self._lock:
+            self._listados.clear()
@@ -0,0 +1,206 @@
+"""
+Soporte de Idempotency-Key para los endpoints de creación
+
+Un cliente que reintenta un POST (por ejemplo tras un timeout) manda la misma
+llave en el header Idempotency-Key. La primera solicitud registra la llave en
+la tabla de idempotencia como EN_CURSO con una condición de "no existe", hace
+el trabajo y guarda el status y el cuerpo de la respuesta:
+
+- Reintento con la solicitud ya completada: se regresa la respuesta guardada
+  (header Idempotent-Replayed) sin volver a ejecutar el endpoint
+- Reintento mientras la primera sigue en curso: 409 con Retry-After
+- Misma llave con otro payload: 422
+
+Si el endpoint falla se borra el registro para que el reintento lo vuelva a
+intentar. Los registros expiran con el TTL de DynamoDB sobre expira_en; un
+EN_CURSO abandonado (contenedor terminado a mitad) se puede retomar cuando
+vence su plazo. Mientras el endpoint corre, un hilo renueva ese plazo: con
+server.py un request (p. ej. /notas/bulk) puede durar más que
+IDEMPOTENCIA_EN_CURSO_SEGUNDOS y un reintento no debe retomarlo mientras siga
+vivo.
+
+Si el endpoint terminó pero su respuesta no se pudo guardar (o pasa de
+IDEMPOTENCIA_MAX_BYTES), la llave se marca COMPLETADO sin cuerpo: el trabajo
+ya se hizo y un reintento recibe un 409 fijo en lugar de volver a
+ejecutarlo.
+
+Este archivo es idéntico en modulo-catalogos y modulo-notas (lo verifica
+modulo-notas/tests/test_compartidos.py).
+"""
+import os
+import json
+import time
+import hashlib
+import inspect
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from functools import wraps, partial
+from typing import Callable, Optional
+from fastapi import Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Configuración de ambiente
+IDEMPOTENCIA_TTL_SEGUNDOS = int(os.getenv("IDEMPOTENCIA_TTL_SEGUNDOS", "86400"))
+# Plazo de un EN_CURSO sin renovar: lo que tarda en retomarse la llave de
+# un contenedor que murió a mitad
+IDEMPOTENCIA_EN_CURSO_SEGUNDOS = int(os.getenv("IDEMPOTENCIA_EN_CURSO_SEGUNDOS", "120"))
+# Cada cuánto se renueva el plazo mientras el endpoint sigue corriendo
+IDEMPOTENCIA_RENOVAR_SEGUNDOS = float(
+    os.getenv("IDEMPOTENCIA_RENOVAR_SEGUNDOS", str(IDEMPOTENCIA_EN_CURSO_SEGUNDOS / 3))
+)
+
+# Respuesta más grande que se guarda (DynamoDB admite items de hasta 400 KB)
+IDEMPOTENCIA_MAX_BYTES = int(os.getenv("IDEMPOTENCIA_MAX_BYTES", "350000"))
+
+EN_CURSO = "EN_CURSO"
+COMPLETADO = "COMPLETADO"
+
+def huella(argumentos: dict) -> str:
+    """SHA-256 del payload de la solicitud en JSON canónico"""
+    contenido = json.dumps(jsonable_encoder(argumentos), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+def respuesta_previa(previo: dict, huella_solicitud: str) -> JSONResponse:
+    """Respuesta para una llave ya registrada"""
+    if previo["huella"] != huella_solicitud:
+        raise HTTPException(status_code=422, detail="Idempotency-Key usada con un payload distinto")
+    if previo["estado"] == COMPLETADO and "respuesta" not in previo:
+        raise HTTPException(
+            status_code=409,
+            detail="La solicitud con esta Idempotency-Key ya se completó; su respuesta no está disponible"
+        )
+    if previo["estado"] != COMPLETADO:
+        raise HTTPException(
+            status_code=409,
+            detail="Hay una solicitud en curso con la misma Idempotency-Key",
+            headers={"Retry-After": "1"}
+        )
+    return JSONResponse(
+        status_code=previo["status"],
+        content=json.loads(previo["respuesta"]),
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+def ejecutar(repo, clave: str, huella_solicitud: str, fn: Callable,
+             status_code: int = 201, modelo=None):
+    """Ejecuta fn una sola vez por clave y guarda su respuesta"""
+    ahora = int(time.time())
+    registro = {
+        "id": clave,
+        "estado": EN_CURSO,
+        "huella": huella_solicitud,
+        "creado_at": datetime.utcnow().isoformat(),
+        "expira_en": ahora + IDEMPOTENCIA_EN_CURSO_SEGUNDOS,
+    }
+    if not repo.crear(registro, vencido=("expira_en", ahora)):
+        previo = repo.obtener(clave)
+        if previo is None:
+            # Expiró y se borró entre la condición y la lectura
+            raise HTTPException(status_code=409, detail="Reintenta la solicitud", headers={"Retry-After": "1"})
+        return respuesta_previa(previo, huella_solicitud)
+
+    try:
+        with plazo_renovado(repo, registro):
+            resultado = fn()
+    except Exception:
+        repo.eliminar(clave)
+        raise
+
+    # Se guarda el cuerpo ya filtrado por el response_model del endpoint
+    cuerpo = modelo.model_validate(resultado).model_dump(mode="json") if modelo else jsonable_encoder(resultado)
+    respuesta = json.dumps(cuerpo)
+    if len(respuesta.encode()) > IDEMPOTENCIA_MAX_BYTES:
+        print(f"Respuesta idempotente {clave} de {len(respuesta.encode())} bytes; se guarda sin cuerpo")
+        completar_sin_cuerpo(repo, registro)
+        return resultado
+    try:
+        repo.guardar({
+            **registro,
+            "estado": COMPLETADO,
+            "status": status_code,
+            "respuesta": respuesta,
+            "expira_en": int(time.time()) + IDEMPOTENCIA_TTL_SEGUNDOS,
+        })
+    except Exception as e:
+        print(f"Error guardando respuesta idempotente {clave}: {e}")
+        completar_sin_cuerpo(repo, registro)
+    return resultado
+
+@contextmanager
+def plazo_renovado(repo, registro: dict):
+    """
+    Renueva el plazo del EN_CURSO cada IDEMPOTENCIA_RENOVAR_SEGUNDOS
+
+    La condición sobre estado y creado_at evita extender un registro que ya
+    se completó o que retomó otra solicitud. Si el proceso muere, la
+    renovación se detiene con él y el plazo vence solo.
+    """
+    detener = threading.Event()
+
+    def renovar():
+        while not detener.wait(IDEMPOTENCIA_RENOVAR_SEGUNDOS):
+            try:
+                repo.actualizar(
+                    registro["id"],
+                    {"expira_en": int(time.time()) + IDEMPOTENCIA_EN_CURSO_SEGUNDOS},
+                    si={"estado": EN_CURSO, "creado_at": registro["creado_at"]},
+                )
+            except Exception as e:
+                print(f"Error renovando llave idempotente {registro['id']}: {e}")
+
+    hilo = threading.Thread(target=renovar, name="idempotencia-plazo", daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        detener.set()
+        hilo.join()
+
+def completar_sin_cuerpo(repo, registro: dict, intentos: int = 3):
+    """
+    Marca la llave COMPLETADO sin respuesta guardada
+
+    El trabajo ya se hizo: la llave no debe volver a EN_CURSO vencido, que
+    permitiría repetirlo. La condición evita pisar un registro ajeno.
+    """
+    for intento in range(intentos):
+        try:
+            repo.actualizar(
+                registro["id"],
+                {"estado": COMPLETADO, "expira_en": int(time.time()) + IDEMPOTENCIA_TTL_SEGUNDOS},
+                si={"estado": EN_CURSO, "creado_at": registro["creado_at"]},
+            )
+            return
+        except Exception as e:
+            print(f"Error cerrando llave idempotente {registro['id']}: {e}")
+            time.sleep(0.05 * 2 ** intento)
+
+def idempotente(alcance: str, get_repo: Callable, modelo=None, status_code: int = 201):
+    """
+    Decorador para endpoints de creación con header Idempotency-Key opcional
+
+    Agrega el parámetro del header a la firma que ve FastAPI; sin el header el
+    endpoint corre como siempre. Las llaves se separan por `alcance`. `modelo`
+    filtra el cuerpo que se guarda y se repite en los reintentos.
+    """
+    def decorador(func):
+        firma = inspect.signature(func)
+        parametro = inspect.Parameter(
+            "idempotency_key", inspect.Parameter.KEYWORD_ONLY, annotation=Optional[str],
+            default=Header(None, alias="Idempotency-Key", min_length=1, max_length=255)
+        )
+
+        @wraps(func)
+        def envoltura(*args, idempotency_key: Optional[str] = None, **kwargs):
+            if not idempotency_key:
+                return func(*args, **kwargs)
+            return ejecutar(
+                get_repo(), f"{alcance}#{idempotency_key}", huella(kwargs),
+                partial(func, *args, **kwargs), status_code, modelo
+            )
+
+        envoltura.__signature__ = firma.replace(parameters=[*firma.parameters.values(), parametro])
+        return envoltura
+    return decorador
@@ -0,0 +1,461 @@
+"""
+Repositorios de datos para clientes, domicilios, productos, notas y contenido
+
+Los endpoints trabajan contra esta interfaz en lugar de llamar a DynamoDB
+directamente. Hay dos implementaciones:
+- RepositorioDynamo: usa las tablas de DynamoDB (get_table de la app)
+- RepositorioMemoria: diccionario en memoria con latencia artificial
+  configurable, para pruebas de carga locales sin AWS
+
+Este archivo es idéntico en modulo-catalogos y modulo-notas (lo verifica
+modulo-notas/tests/test_compartidos.py).
+"""
+import copy
+import time
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from botocore.exceptions import ClientError
+
+ENTIDADES = ("clientes", "domicilios", "productos", "notas", "contenido", "agregados", "folios", "idempotencia", "trabajos", "versiones")
+
+# Máximo de llaves por BatchGetItem
+MAX_LECTURA_LOTE = 100
+# Bloques de BatchGetItem en vuelo a la vez por obtener_lote
+HILOS_LECTURA_LOTE = 8
+
+class RepositorioDynamo:
+    """Repositorio respaldado por una tabla de DynamoDB"""
+
+    def __init__(self, table_name: str, get_table: Callable):
+        self.table_name = table_name
+        self._get_table = get_table
+
+    @property
+    def table(self):
+        return self._get_table(self.table_name)
+
+    def obtener(self, item_id: str) -> Optional[dict]:
+        response = self.table.get_item(Key={"id": item_id})
+        return response.get("Item")
+
+    def obtener_lote(self, ids: List[str], hilos: int = HILOS_LECTURA_LOTE,
+                     campos: Optional[tuple] = None) -> Dict[str, dict]:
+        """
+        Items por id con BatchGetItem; los ids que no existen no aparecen
+
+        Los ids se deduplican y se piden en bloques de 100, varios bloques en
+        paralelo; las UnprocessedKeys se reintentan con espera exponencial.
+        Con `campos` solo se leen esos atributos (y el id).
+        """
+        unicos = list(dict.fromkeys(ids))
+        bloques = [unicos[i:i + MAX_LECTURA_LOTE] for i in range(0, len(unicos), MAX_LECTURA_LOTE)]
+        proyeccion = self._proyeccion(("id",) + tuple(c for c in campos if c != "id") if campos else None)
+        if len(bloques) > 1 and hilos > 1:
+            with ThreadPoolExecutor(max_workers=min(hilos, len(bloques)), thread_name_prefix="batch-get") as executor:
+                # Cada bloque con su copia del contexto para conservar la traza
+                futuros = [
+                    executor.submit(contextvars.copy_context().run, self._obtener_bloque, bloque, proyeccion)
+                    for bloque in bloques
+                ]
+                resultados = [futuro.result() for futuro in futuros]
+        else:
+            resultados = [self._obtener_bloque(bloque, proyeccion) for bloque in bloques]
+        return {item["id"]: item for items in resultados for item in items}
+
+    def _obtener_bloque(self, ids: List[str], proyeccion: dict = None, max_reintentos: int = 10) -> List[dict]:
+        llaves = [{"id": item_id} for item_id in ids]
+        encontrados = []
+        intentos = 0
+        while llaves:
+            items, llaves = self._batch_get(llaves, proyeccion or {})
+            encontrados.extend(items)
+            if llaves:
+                intentos = intentos + 1 if not items else 0
+                if intentos > max_reintentos:
+                    raise RuntimeError(f"BatchGetItem sin avance en {self.table_name}")
+                time.sleep(min(0.05 * 2 ** max(intentos, 1), 2.0))
+        return encontrados
+
+    def _batch_get(self, llaves: List[dict], proyeccion: dict) -> Tuple[List[dict], List[dict]]:
+        """Un BatchGetItem; regresa (items, llaves sin procesar)"""
+        table = self.table
+        if hasattr(table, "batch_get_item"):
+            response = table.batch_get_item(Keys=llaves, **proyeccion)
+            return response["Items"], response["UnprocessedKeys"]
+        # boto3 Table no tiene BatchGetItem; el cliente del recurso sí y
+        # acepta y regresa valores de Python
+        response = table.meta.client.batch_get_item(
+            RequestItems={self.table_name: {"Keys": llaves, **proyeccion}}
+        )
+        items = response.get("Responses", {}).get(self.table_name, [])
+        return items, response.get("UnprocessedKeys", {}).get(self.table_name, {}).get("Keys", [])
+
+    def guardar(self, item: dict) -> dict:
+        self.table.put_item(Item=item)
+        return item
+
+    def guardar_lote(self, items: List[dict]) -> int:
+        """Guarda varios items en BatchWriteItem de 25 (reintenta los no procesados)"""
+        with self.table.batch_writer() as lote:
+            for item in items:
+                lote.put_item(Item=item)
+        return len(items)
+
+    def crear(self, item: dict, vencido: tuple = None) -> bool:
+        """
+        Guarda el item solo si no existe; regresa si se guardó
+
+        vencido: (atributo, valor) para reemplazar también un item cuyo
+        atributo sea menor que valor (p. ej. un plazo ya expirado)
+        """
+        kwargs = {"ConditionExpression": "attribute_not_exists(id)"}
+        if vencido:
+            atributo, valor = vencido
+            kwargs["ConditionExpression"] += " OR #v < :v"
+            kwargs["ExpressionAttributeNames"] = {"#v": atributo}
+            kwargs["ExpressionAttributeValues"] = {":v": valor}
+        try:
+            self.table.put_item(Item=item, **kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def actualizar(self, item_id: str, cambios: dict, si: dict = None) -> Optional[dict]:
+        """
+        Aplica SET sobre los atributos indicados y regresa el item nuevo
+
+        si: atributos que el item debe tener con esos valores; si no se
+        cumple no se modifica nada y se regresa None
+        """
+        nombres = {}
+        valores = {}
+        asignaciones = []
+        for i, (campo, valor) in enumerate(cambios.items()):
+            nombres[f"#c{i}"] = campo
+            valores[f":v{i}"] = valor
+            asignaciones.append(f"#c{i} = :v{i}")
+        kwargs = {}
+        if si:
+            condiciones = []
+            for i, (campo, valor) in enumerate(si.items()):
+                nombres[f"#s{i}"] = campo
+                valores[f":s{i}"] = valor
+                condiciones.append(f"#s{i} = :s{i}")
+            kwargs["ConditionExpression"] = " AND ".join(condiciones)
+        try:
+            response = self.table.update_item(
+                Key={"id": item_id},
+                UpdateExpression="SET " + ", ".join(asignaciones),
+                ExpressionAttributeNames=nombres,
+                ExpressionAttributeValues=valores,
+                ReturnValues="ALL_NEW",
+                **kwargs
+            )
+        except ClientError as e:
+            if si and e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return None
+            raise
+        return response["Attributes"]
+
+    def incrementar(self, item_id: str, contadores: dict, campos: dict = None) -> dict:
+        """ADD atómico sobre contadores numéricos (crea el item si no existe);
+        regresa los valores nuevos de los atributos modificados"""
+        nombres = {}
+        valores = {}
+        sumas = []
+        for i, (campo, valor) in enumerate(contadores.items()):
+            nombres[f"#a{i}"] = campo
+            valores[f":a{i}"] = valor
+            sumas.append(f"#a{i} :a{i}")
+        expresion = "ADD " + ", ".join(sumas)
+        if campos:
+            asignaciones = []
+            for i, (campo, valor) in enumerate(campos.items()):
+                nombres[f"#s{i}"] = campo
+                valores[f":s{i}"] = valor
+                asignaciones.append(f"#s{i} = :s{i}")
+            expresion += " SET " + ", ".join(asignaciones)
+        response = self.table.update_item(
+            Key={"id": item_id},
+            UpdateExpression=expresion,
+            ExpressionAttributeNames=nombres,
+            ExpressionAttributeValues=valores,
+            ReturnValues="UPDATED_NEW"
+        )
+        return response.get("Attributes", {})
+
+    def eliminar(self, item_id: str):
+        self.table.delete_item(Key={"id": item_id})
+
+    def eliminar_lote(self, ids: List[str]) -> int:
+        """Borra varios items en BatchWriteItem de 25 (reintenta los no procesados)"""
+        with self.table.batch_writer() as lote:
+            for item_id in ids:
+                lote.delete_item(Key={"id": item_id})
+        return len(ids)
+
+    def _scan(self, **kwargs) -> List[dict]:
+        table = self.table
+        items = []
+        while True:
+            response = table.scan(**kwargs)
+            items.extend(response.get("Items", []))
+            if not response.get("LastEvaluatedKey"):
+                return items
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    @staticmethod
+    def _proyeccion(campos: Optional[tuple]) -> dict:
+        if not campos:
+            return {}
+        nombres = {f"#p{i}": campo for i, campo in enumerate(campos)}
+        return {"ProjectionExpression": ", ".join(nombres), "ExpressionAttributeNames": nombres}
+
+    def listar(self, campos: Optional[tuple] = None, consistente: bool = False) -> List[dict]:
+        """
+        Todos los items; con `campos` solo se leen esos atributos
+
+        consistente: scan con ConsistentRead, para cuerpos que se guardan bajo
+        una versión ya leída (un scan eventual podría no ver una escritura
+        que esa versión ya cuenta)
+        """
+        kwargs = self._proyeccion(campos)
+        if consistente:
+            kwargs["ConsistentRead"] = True
+        return self._scan(**kwargs)
+
+    def recorrer(self, campos: Optional[tuple] = None, segmento: int = 0,
+                 segmentos: int = 1) -> Iterator[List[dict]]:
+        """Páginas de un segmento del scan paralelo (Segment/TotalSegments),
+        sin juntar la tabla en memoria"""
+        kwargs = self._proyeccion(campos)
+        if segmentos > 1:
+            kwargs.update(Segment=segmento, TotalSegments=segmentos)
+        table = self.table
+        while True:
+            response = table.scan(**kwargs)
+            yield response.get("Items", [])
+            if not response.get("LastEvaluatedKey"):
+                return
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def buscar(self, campo: str, valor) -> List[dict]:
+        """Items cuyo atributo `campo` es igual a `valor`"""
+        return self._scan(
+            FilterExpression="#campo = :valor",
+            ExpressionAttributeNames={"#campo": campo},
+            ExpressionAttributeValues={":valor": valor}
+        )
+
+    def consultar(self, indice: str, campo: str, valor, rango: tuple = None,
+                  limite: int = None, cursor: dict = None) -> Tuple[List[dict], Optional[dict]]:
+        """
+        Query sobre un índice secundario por igualdad en `campo`
+
+        rango: (atributo, desde, hasta) sobre la llave de ordenamiento; desde o
+        hasta pueden ser None. Sin `limite` se siguen todas las páginas. Regresa
+        los items en orden ascendente y el cursor de la siguiente página.
+        """
+        nombres = {"#k": campo}
+        valores = {":k": valor}
+        condicion = "#k = :k"
+        if rango:
+            atributo, desde, hasta = rango
+            nombres["#r"] = atributo
+            if desde is not None and hasta is not None:
+                condicion += " AND #r BETWEEN :desde AND :hasta"
+                valores.update({":desde": desde, ":hasta": hasta})
+            elif desde is not None:
+                condicion += " AND #r >= :desde"
+                valores[":desde"] = desde
+            elif hasta is not None:
+                condicion += " AND #r <= :hasta"
+                valores[":hasta"] = hasta
+        kwargs = {
+            "IndexName": indice,
+            "KeyConditionExpression": condicion,
+            "ExpressionAttributeNames": nombres,
+            "ExpressionAttributeValues": valores,
+        }
+        if cursor:
+            kwargs["ExclusiveStartKey"] = cursor
+
+        table = self.table
+        items = []
+        while True:
+            if limite:
+                kwargs["Limit"] = limite - len(items)
+            response = table.query(**kwargs)
+            items.extend(response.get("Items", []))
+            siguiente = response.get("LastEvaluatedKey")
+            if not siguiente or (limite and len(items) >= limite):
+                return items, siguiente
+            kwargs["ExclusiveStartKey"] = siguiente
+
+class RepositorioMemoria:
+    """Repositorio en memoria con latencia artificial por operación"""
+
+    def __init__(self, latencia_ms: float = 0.0):
+        self.latencia = latencia_ms / 1000.0
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def _esperar(self):
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def cargar(self, items: List[dict]):
+        """Carga items sin latencia (para preparar pruebas y benchmarks)"""
+        with self._lock:
+            for item in items:
+                self._items[item["id"]] = copy.deepcopy(item)
+
+    def obtener(self, item_id: str) -> Optional[dict]:
+        self._esperar()
+        with self._lock:
+            item = self._items.get(item_id)
+            return copy.deepcopy(item) if item is not None else None
+
+    def obtener_lote(self, ids: List[str], hilos: int = HILOS_LECTURA_LOTE,
+                     campos: Optional[tuple] = None) -> Dict[str, dict]:
+        unicos = list(dict.fromkeys(ids))
+        # Una espera por cada bloque de 100, como BatchGetItem
+        for _ in range(0, len(unicos), MAX_LECTURA_LOTE):
+            self._esperar()
+        with self._lock:
+            items = {i: copy.deepcopy(self._items[i]) for i in unicos if i in self._items}
+        if campos:
+            campos = ("id",) + tuple(campos)
+            items = {i: {k: v for k, v in item.items() if k in campos} for i, item in items.items()}
+        return items
+
+    def guardar(self, item: dict) -> dict:
+        self._esperar()
+        with self._lock:
+            self._items[item["id"]] = copy.deepcopy(item)
+        return item
+
+    def guardar_lote(self, items: List[dict]) -> int:
+        # Una espera por cada lote de 25, como BatchWriteItem
+        for _ in range(0, len(items), 25):
+            self._esperar()
+        with self._lock:
+            for item in items:
+                self._items[item["id"]] = copy.deepcopy(item)
+        return len(items)
+
+    def crear(self, item: dict, vencido: tuple = None) -> bool:
+        self._esperar()
+        with self._lock:
+            actual = self._items.get(item["id"])
+            if actual is not None:
+                atributo, valor = vencido if vencido else (None, None)
+                if not (atributo and actual.get(atributo, valor) < valor):
+                    return False
+            self._items[item["id"]] = copy.deepcopy(item)
+            return True
+
+    def actualizar(self, item_id: str, cambios: dict, si: dict = None) -> Optional[dict]:
+        self._esperar()
+        with self._lock:
+            if si and any(self._items.get(item_id, {}).get(k) != v for k, v in si.items()):
+                return None
+            item = self._items.setdefault(item_id, {"id": item_id})
+            item.update(copy.deepcopy(cambios))
+            return copy.deepcopy(item)
+
+    def incrementar(self, item_id: str, contadores: dict, campos: dict = None) -> dict:
+        self._esperar()
+        with self._lock:
+            item = self._items.setdefault(item_id, {"id": item_id})
+            for campo, valor in contadores.items():
+                item[campo] = item.get(campo, 0) + valor
+            item.update(copy.deepcopy(campos or {}))
+            return {campo: item[campo] for campo in list(contadores) + list(campos or {})}
+
+    def eliminar(self, item_id: str):
+        self._esperar()
+        with self._lock:
+            self._items.pop(item_id, None)
+
+    def eliminar_lote(self, ids: List[str]) -> int:
+        # Una espera por cada lote de 25, como BatchWriteItem
+        for _ in range(0, len(ids), 25):
+            self._esperar()
+        with self._lock:
+            for item_id in ids:
+                self._items.pop(item_id, None)
+        return len(ids)
+
+    def listar(self, campos: Optional[tuple] = None, consistente: bool = False) -> List[dict]:
+        self._esperar()
+        with self._lock:
+            if campos:
+                return [{c: copy.deepcopy(item[c]) for c in campos if c in item} for item in self._items.values()]
+            return [copy.deepcopy(item) for item in self._items.values()]
+
+    def recorrer(self, campos: Optional[tuple] = None, segmento: int = 0,
+                 segmentos: int = 1, pagina: int = 1000) -> Iterator[List[dict]]:
+        items = self.listar(campos)[segmento::segmentos]
+        for inicio in range(0, len(items), pagina):
+            yield items[inicio:inicio + pagina]
+
+    def buscar(self, campo: str, valor) -> List[dict]:
+        self._esperar()
+        with self._lock:
+            return [copy.deepcopy(item) for item in self._items.values() if item.get(campo) == valor]
+
+    def consultar(self, indice: str, campo: str, valor, rango: tuple = None,
+                  limite: int = None, cursor: dict = None) -> Tuple[List[dict], Optional[dict]]:
+        """Mismo contrato que RepositorioDynamo.consultar (el índice se ignora)"""
+        self._esperar()
+        atributo, desde, hasta = rango if rango else (None, None, None)
+        with self._lock:
+            items = [item for item in self._items.values() if item.get(campo) == valor]
+        if atributo:
+            items = [
+                item for item in items
+                if atributo in item
+                and (desde is None or item[atributo] >= desde)
+                and (hasta is None or item[atributo] <= hasta)
+            ]
+        items.sort(key=lambda item: (item.get(atributo, "") if atributo else "", item["id"]))
+        if cursor:
+            posicion = (cursor.get(atributo, "") if atributo else "", cursor["id"])
+            items = [
+                item for item in items
+                if (item.get(atributo, "") if atributo else "", item["id"]) > posicion
+            ]
+        siguiente = None
+        if limite and len(items) > limite:
+            items = items[:limite]
+            ultimo = items[-1]
+            siguiente = {"id": ultimo["id"], campo: valor}
+            if atributo:
+                siguiente[atributo] = ultimo[atributo]
+        return [copy.deepcopy(item) for item in items], siguiente
+
+class Repositorios:
+    """Conjunto de repositorios de la aplicación"""
+
+    def __init__(self, **repos):
+        for entidad in ENTIDADES:
+            setattr(self, entidad, repos.get(entidad))
+
+def crear_repositorios(backend: str, tablas: dict, get_table: Callable = None,
+                       latencia_ms: float = 0.0) -> Repositorios:
+    """
+    Construye los repositorios del backend indicado
+
+    backend: "dynamodb" o "memory"
+    tablas: nombre de tabla por entidad (solo para dynamodb)
+    """
+    if backend == "memory":
+        return Repositorios(**{e: RepositorioMemoria(latencia_ms) for e in tablas})
+    if backend == "dynamodb":
+        return Repositorios(**{e: RepositorioDynamo(t, get_table) for e, t in tablas.items()})
+    raise ValueError(f"REPOSITORY_BACKEND no soportado: {backend}")
@@ -0,0 +1,71 @@
+"""
+Servidor de producción para contenedores de larga duración
+
+Levanta la app FastAPI con uvicorn y varios procesos worker (uno por core por
+default) en lugar del handler de Lambda. Cada worker importa la app por su
+cuenta y la precalienta en el lifespan, así que los clientes AWS, tablas y
+repositorios memorizados son propios de cada proceso.
+
+Uso:
+    python server.py
+    WEB_CONCURRENCY=4 SERVER_KEEP_ALIVE=75 python server.py
+
+Este archivo es idéntico en modulo-catalogos y modulo-notas (lo verifica
+modulo-notas/tests/test_compartidos.py).
+"""
+import os
+import uvicorn
+
+# Configuración de ambiente
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8080"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))  # 0 = un worker por core
+# Mayor que el idle timeout del balanceador (60 s en ALB) para que sea el
+# balanceador quien cierre las conexiones inactivas
+SERVER_KEEP_ALIVE = int(os.getenv("SERVER_KEEP_ALIVE", "75"))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))  # 0 = sin reciclar workers
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+
+def workers() -> int:
+    return WEB_CONCURRENCY or os.cpu_count() or 1
+
+def max_requests(n_workers: int) -> int:
+    """
+    SERVER_MAX_REQUESTS aplicable; None si no se recicla
+
+    El supervisor multiproceso de uvicorn no levanta de nuevo un worker que
+    termina: con varios workers el límite los retiraría a todos hasta dejar
+    el servidor sin atender. Solo se usa con un worker, cuando el proceso
+    que termina es el contenedor y el orquestador lo reinicia.
+    """
+    if not SERVER_MAX_REQUESTS:
+        return None
+    if n_workers > 1:
+        print(f"SERVER_MAX_REQUESTS={SERVER_MAX_REQUESTS} se ignora con {n_workers} workers")
+        return None
+    return SERVER_MAX_REQUESTS
+
+def opciones() -> dict:
+    """Argumentos de uvicorn.run a partir del ambiente"""
+    n_workers = workers()
+    return {
+        "host": HOST,
+        "port": PORT,
+        "workers": n_workers,
+        "timeout_keep_alive": SERVER_KEEP_ALIVE,
+        "timeout_graceful_shutdown": SERVER_GRACEFUL_TIMEOUT,
+        "limit_max_requests": max_requests(n_workers),
+        "backlog": SERVER_BACKLOG,
+        "log_level": LOG_LEVEL,
+        "proxy_headers": True,
+        "forwarded_allow_ips": "*",
+        "lifespan": "on",
+    }
+
+if __name__ == "__main__":
+    # Con workers > 1 uvicorn necesita la app como string para importarla en
+    # cada proceso; SIGTERM espera hasta SERVER_GRACEFUL_TIMEOUT a los requests
+    # en curso antes de cerrar
+    uvicorn.run("app:app", **opciones())
@@ -0,0 +1,236 @@
+"""
+Snapshot compacto del catálogo de productos
+
+Para las lecturas que necesitan el catálogo completo (la búsqueda y las
+consultas de precio) tener en memoria una lista de dicts de DynamoDB con
+Decimal cuesta varios KB por producto. El snapshot guarda los productos en
+un archivo columnar que se abre con mmap:
+
+    encabezado   magic, formato, versión de catálogo, número de productos
+    cadenas      tabla de cadenas única (offsets u32 + UTF-8); "PZA" o una
+                 fecha repetida se guardan una sola vez
+    columnas     id, nombre, unidad_medida, created_at, updated_at como
+                 índices u32 a la tabla de cadenas; precio en centavos i64
+
+Las filas van ordenadas por id, así obtener(id) es una búsqueda binaria sobre
+el archivo mapeado. Solo las páginas que se tocan entran a memoria y las
+cadenas se decodifican al leerlas.
+
+El snapshot lleva la versión de catálogo de productos (ver etags.py). Se
+guarda en SNAPSHOT_RUTA (en Lambda /tmp sobrevive mientras el contenedor
+siga caliente) y, si SNAPSHOT_BUCKET está configurado, también en S3: un
+contenedor frío descarga el snapshot de la versión vigente en lugar de
+hacer el scan.
+"""
+import os
+import mmap
+import struct
+import threading
+from bisect import bisect_left
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Configuración de ambiente
+SNAPSHOT_RUTA = os.getenv("SNAPSHOT_RUTA", "/tmp/productos.snap")
+SNAPSHOT_BUCKET = os.getenv("SNAPSHOT_BUCKET", "")
+SNAPSHOT_PREFIJO = os.getenv("SNAPSHOT_PREFIJO", "snapshots/productos")
+
+MAGIC = b"PRODSNAP"
+FORMATO = 1
+ENCABEZADO = struct.Struct("<8sHxxxxxxQQ")
+
+COLUMNAS_TEXTO = ("id", "nombre", "unidad_medida", "created_at", "updated_at")
+
+def a_centavos(precio) -> int:
+    """Precio (float, Decimal o str) a centavos enteros con ROUND_HALF_UP"""
+    if not isinstance(precio, Decimal):
+        precio = Decimal(repr(precio) if isinstance(precio, float) else str(precio))
+    return int((precio * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def _alinear(datos: bytearray):
+    datos.extend(b"\0" * (-len(datos) % 8))
+
+def serializar(items: List[dict], version: int) -> bytes:
+    """Snapshot en bytes de una lista de productos"""
+    items = sorted(items, key=lambda item: item["id"])
+    cadenas: Dict[str, int] = {}
+
+    def indice(texto) -> int:
+        texto = "" if texto is None else str(texto)
+        posicion = cadenas.get(texto)
+        if posicion is None:
+            posicion = cadenas[texto] = len(cadenas)
+        return posicion
+
+    columnas = [[indice(item.get(columna)) for item in items] for columna in COLUMNAS_TEXTO]
+    precios = [a_centavos(item.get("precio_base", 0)) for item in items]
+
+    codificadas = [texto.encode() for texto in cadenas]
+    offsets = [0]
+    for texto in codificadas:
+        offsets.append(offsets[-1] + len(texto))
+
+    datos = bytearray(ENCABEZADO.pack(MAGIC, FORMATO, version, len(items)))
+    datos += struct.pack("<Q", len(codificadas))
+    datos += struct.pack(f"<{len(offsets)}I", *offsets)
+    datos += b"".join(codificadas)
+    _alinear(datos)
+    for columna in columnas:
+        datos += struct.pack(f"<{len(columna)}I", *columna)
+        _alinear(datos)
+    datos += struct.pack(f"<{len(precios)}q", *precios)
+    return bytes(datos)
+
+class SnapshotProductos:
+    """Productos de un snapshot mapeado en memoria (solo lectura)"""
+
+    __slots__ = ("version", "_archivo", "_mapa", "_cadenas", "_offsets", "_columnas", "_precios", "_n")
+
+    def __init__(self, datos, archivo=None):
+        self._archivo = archivo
+        self._mapa = datos
+        vista = memoryview(datos)
+        magic, formato, self.version, self._n = ENCABEZADO.unpack_from(vista, 0)
+        if magic != MAGIC or formato != FORMATO:
+            raise ValueError("Archivo de snapshot de productos inválido")
+        posicion = ENCABEZADO.size
+        n_cadenas, = struct.unpack_from("<Q", vista, posicion)
+        posicion += 8
+        self._offsets = vista[posicion:posicion + 4 * (n_cadenas + 1)].cast("I")
+        posicion += 4 * (n_cadenas + 1)
+        self._cadenas = vista[posicion:posicion + self._offsets[n_cadenas]]
+        posicion += self._offsets[n_cadenas]
+        posicion += -posicion % 8
+        self._columnas = {}
+        for columna in COLUMNAS_TEXTO:
+            self._columnas[columna] = vista[posicion:posicion + 4 * self._n].cast("I")
+            posicion += 4 * self._n
+            posicion += -posicion % 8
+        self._precios = vista[posicion:posicion + 8 * self._n].cast("q")
+
+    @classmethod
+    def abrir(cls, ruta: str) -> "SnapshotProductos":
+        archivo = open(ruta, "rb")
+        try:
+            return cls(mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ), archivo)
+        except Exception:
+            archivo.close()
+            raise
+
+    def cerrar(self):
+        for vista in (self._offsets, self._cadenas, self._precios, *self._columnas.values()):
+            vista.release()
+        if self._archivo is not None:
+            self._mapa.close()
+            self._archivo.close()
+
+    def __len__(self):
+        return self._n
+
+    def _texto(self, indice: int) -> str:
+        return str(self._cadenas[self._offsets[indice]:self._offsets[indice + 1]], "utf-8")
+
+    def _valor(self, columna: str, fila: int) -> str:
+        return self._texto(self._columnas[columna][fila])
+
+    def _fila(self, producto_id: str) -> Optional[int]:
+        ids = _Columna(self, "id")
+        fila = bisect_left(ids, producto_id)
+        if fila < self._n and ids[fila] == producto_id:
+            return fila
+        return None
+
+    def _producto(self, fila: int) -> dict:
+        producto = {columna: self._valor(columna, fila) for columna in COLUMNAS_TEXTO}
+        producto["precio_base"] = self._precios[fila] / 100
+        return producto
+
+    def obtener(self, producto_id: str) -> Optional[dict]:
+        fila = self._fila(producto_id)
+        return self._producto(fila) if fila is not None else None
+
+    def precio_centavos(self, producto_id: str) -> Optional[int]:
+        fila = self._fila(producto_id)
+        return self._precios[fila] if fila is not None else None
+
+    def productos(self) -> Iterator[dict]:
+        for fila in range(self._n):
+            yield self._producto(fila)
+
+class _Columna:
+    """Vista de una columna de texto como secuencia (para bisect)"""
+
+    __slots__ = ("_snapshot", "_columna")
+
+    def __init__(self, snapshot: SnapshotProductos, columna: str):
+        self._snapshot = snapshot
+        self._columna = columna
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def __getitem__(self, fila: int) -> str:
+        return self._snapshot._valor(self._columna, fila)
+
+# ==================== PERSISTENCIA ====================
+
+def guardar(ruta: str, datos: bytes):
+    # Escritura atómica: un lector nunca mapea un archivo a medias
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+def clave_s3(version: int) -> str:
+    return f"{SNAPSHOT_PREFIJO}/v{version:012d}.snap"
+
+class CatalogoCompacto:
+    """Snapshot vigente del contenedor; se rehace cuando cambia la versión"""
+
+    def __init__(self, ruta: str = None, bucket: str = None, get_s3: Callable = None):
+        self.ruta = ruta or SNAPSHOT_RUTA
+        self.bucket = SNAPSHOT_BUCKET if bucket is None else bucket
+        self._get_s3 = get_s3
+        self._lock = threading.Lock()
+        self.snapshot: Optional[SnapshotProductos] = None
+
+    def _descargar(self, version: int) -> bool:
+        if not (self.bucket and self._get_s3):
+            return False
+        try:
+            response = self._get_s3().get_object(Bucket=self.bucket, Key=clave_s3(version))
+        except Exception:
+            return False
+        guardar(self.ruta, response["Body"].read())
+        return True
+
+    def _publicar(self, version: int, datos: bytes):
+        if not (self.bucket and self._get_s3):
+            return
+        try:
+            self._get_s3().put_object(Bucket=self.bucket, Key=clave_s3(version), Body=datos)
+        except Exception as e:
+            # El snapshot local sirve igual; el siguiente contenedor hará el scan
+            print(f"Error publicando snapshot de productos v{version}: {e}")
+
+    def vigente(self, version: int, cargar: Callable[[], List[dict]]) -> SnapshotProductos:
+        """Snapshot de `version`: el ya abierto, el de S3 o uno nuevo a partir
+        de cargar() (scan), en ese orden
+
+        Un archivo local que no escribió este proceso no se reutiliza: podría
+        ser de otra tabla o de un backend en memoria ya reiniciado.
+        """
+        actual = self.snapshot
+        if actual is not None and actual.version == version:
+            return actual
+        with self._lock:
+            if self.snapshot is not None and self.snapshot.version == version:
+                return self.snapshot
+            if not self._descargar(version):
+                datos = serializar(cargar(), version)
+                guardar(self.ruta, datos)
+                self._publicar(version, datos)
+            # El snapshot anterior no se cierra: puede haber lectores usándolo;
+            # su mapeo se libera cuando deja de tener referencias
+            self.snapshot = SnapshotProductos.abrir(self.ruta)
+            return self.snapshot
@@ -5,14 +5,20 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
 import sys
+import json
 import os
+import tempfile
+from decimal import Decimal
 
 # Agregar el path del src
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-# Mock de boto3 antes de importar la app
-with patch('boto3.resource'), patch('boto3.client'):
-    from app import app
+# Mock de boto3 antes de importar la app; los clientes AWS se crean de
+# forma perezosa, por lo que el mock se mantiene durante toda la sesión
+patch('boto3.session.Session').start()
+from app import app
+import app as app_module
+import repositorios
 
 client = TestClient(app)
 
@@ -26,6 +32,15 @@ class TestHealthCheck:
         data = response.json()
         assert data["status"] == "healthy"
         assert data["service"] == "catalogos"
+        assert response.headers["server-timing"].startswith("total;dur=")
+    
+    def test_lifespan_precalienta_worker(self):
+        import app as modulo
+        modulo.aws_clients.reset()
+        modulo._tablas.clear()
+        with TestClient(app):
+            assert "cloudwatch" in modulo.aws_clients._clients
+            assert set(modulo._tablas) == set(modulo.ESQUEMAS_POR_TABLA)
 
 
 class TestClientes:
@@ -148,3 +163,336 @@ class TestProductos:
         
         response = client.post("/productos", json=producto_data)
         assert response.status_code == 422  # Validation error
+
+
+class TestBackendMemoria:
+    """Tests de flujo completo con el backend de repositorios en memoria"""
+    
+    def setup_method(self):
+        self.repos = repositorios.crear_repositorios("memory", dict.fromkeys(repositorios.ENTIDADES))
+        self.patcher = patch('app.get_repositorios', return_value=self.repos)
+        self.patcher.start()
+        app_module._listados.limpiar()
+        app_module.busqueda.indice = app_module.busqueda.IndiceProductos()
+        app_module._catalogo_compacto = app_module.snapshot_catalogo.CatalogoCompacto(
+            ruta=os.path.join(tempfile.mkdtemp(), "productos.snap"), bucket=""
+        )
+    
+    def teardown_method(self):
+        self.patcher.stop()
+    
+    def test_cliente_domicilios_y_eliminacion(self):
+        cliente = client.post("/clientes", json={
+            "razon_social": "Empresa Test SA de CV",
+            "nombre_comercial": "Test Corp",
+            "rfc": "TEST123456ABC",
+            "correo_electronico": "test@empresa.com",
+            "telefono": "5551234567"
+        }).json()
+        
+        response = client.post("/domicilios", json={
+            "cliente_id": cliente["id"],
+            "domicilio": "Calle Test 123",
+            "colonia": "Centro",
+            "municipio": "Guadalajara",
+            "estado": "Jalisco",
+            "tipo_direccion": "ENVIO"
+        })
+        assert response.status_code == 201
+        assert len(client.get(f"/domicilios/cliente/{cliente['id']}").json()) == 1
+        
+        response = client.put(f"/clientes/{cliente['id']}", json={"telefono": "5559999999"})
+        assert response.json()["telefono"] == "5559999999"
+        
+        assert client.delete(f"/clientes/{cliente['id']}").status_code == 204
+        assert self.repos.domicilios.listar() == []
+        assert client.get(f"/clientes/{cliente['id']}").status_code == 404
+    
+    def _cliente_con_domicilios(self, n: int) -> str:
+        self.repos.clientes.cargar([{"id": "cli-1", "razon_social": "Test SA"}])
+        self.repos.domicilios.cargar([
+            {"id": f"dom-{i:03d}", "cliente_id": "cli-1"} for i in range(n)
+        ] + [{"id": "dom-otro", "cliente_id": "cli-2"}])
+        return "cli-1"
+    
+    def test_eliminacion_en_lotes(self):
+        cliente_id = self._cliente_con_domicilios(230)
+        with patch.object(self.repos.domicilios, 'eliminar', side_effect=AssertionError):
+            assert client.delete(f"/clientes/{cliente_id}").status_code == 204
+        
+        assert [d["id"] for d in self.repos.domicilios.listar()] == ["dom-otro"]
+        trabajo = client.get(f"/clientes/{cliente_id}/eliminacion").json()
+        assert (trabajo["estado"], trabajo["procesados"]) == ("COMPLETADO", 230)
+    
+    def test_eliminacion_asincrona_y_reanudacion(self):
+        cliente_id = self._cliente_con_domicilios(150)
+        original = self.repos.domicilios.eliminar_lote
+        llamadas = []
+        
+        def falla_en_la_segunda(ids):
+            llamadas.append(len(ids))
+            if len(llamadas) == 2:
+                raise Exception("throttled")
+            return original(ids)
+        
+        with patch.object(self.repos.domicilios, 'eliminar_lote', side_effect=falla_en_la_segunda):
+            response = client.delete(f"/clientes/{cliente_id}", params={"asincrono": "true"})
+        assert response.status_code == 202
+        assert response.headers["location"] == f"/clientes/{cliente_id}/eliminacion"
+        
+        trabajo = client.get(f"/clientes/{cliente_id}/eliminacion").json()
+        assert (trabajo["estado"], trabajo["procesados"]) == ("FALLIDO", 100)
+        # El cliente sigue marcado y no admite domicilios nuevos
+        assert client.post("/domicilios", json={
+            "cliente_id": cliente_id, "domicilio": "Calle 1", "colonia": "Centro",
+            "municipio": "Guadalajara", "estado": "Jalisco", "tipo_direccion": "ENVIO"
+        }).status_code == 409
+        
+        # Repetir el DELETE reanuda con lo que falta
+        assert client.delete(f"/clientes/{cliente_id}").status_code == 204
+        trabajo = client.get(f"/clientes/{cliente_id}/eliminacion").json()
+        assert (trabajo["estado"], trabajo["procesados"]) == ("COMPLETADO", 150)
+        assert self.repos.clientes.obtener(cliente_id) is None
+    
+    def test_eliminacion_asincrona_en_lambda(self):
+        cliente_id = self._cliente_con_domicilios(250)
+        mock_lambda = MagicMock()
+        with patch.object(app_module, 'LAMBDA_FUNCTION_NAME', "dev-catalogos"), \
+             patch.object(app_module, 'get_lambda', return_value=mock_lambda):
+            response = client.delete(f"/clientes/{cliente_id}", params={"asincrono": "true"})
+            assert response.status_code == 202
+            # La cascada no corre dentro del request
+            assert len(self.repos.domicilios.listar()) == 251
+            kwargs = mock_lambda.invoke.call_args.kwargs
+            assert (kwargs["FunctionName"], kwargs["InvocationType"]) == ("dev-catalogos", "Event")
+            evento = json.loads(kwargs["Payload"])
+            assert evento == {"eliminar_cliente": cliente_id}
+            
+            # Con poco tiempo restante borra una página y se vuelve a invocar
+            contexto = MagicMock()
+            contexto.get_remaining_time_in_millis.return_value = 1000
+            mock_lambda.reset_mock()
+            app_module.handler(evento, contexto)
+            trabajo = client.get(f"/clientes/{cliente_id}/eliminacion").json()
+            assert (trabajo["estado"], trabajo["procesados"]) == ("EN_CURSO", 100)
+            assert mock_lambda.invoke.call_count == 1
+            
+            contexto.get_remaining_time_in_millis.return_value = 60000
+            mock_lambda.reset_mock()
+            app_module.handler(evento, contexto)
+            mock_lambda.invoke.assert_not_called()
+        trabajo = client.get(f"/clientes/{cliente_id}/eliminacion").json()
+        assert (trabajo["estado"], trabajo["procesados"]) == ("COMPLETADO", 250)
+        assert self.repos.clientes.obtener(cliente_id) is None
+    
+    def test_idempotency_key_reproduce_respuesta(self):
+        producto = {"nombre": "Producto", "unidad_medida": "PZA", "precio_base": 10.5}
+        headers = {"Idempotency-Key": "prod-abc"}
+        
+        primera = client.post("/productos", json=producto, headers=headers)
+        segunda = client.post("/productos", json=producto, headers=headers)
+        
+        assert primera.status_code == segunda.status_code == 201
+        assert segunda.json() == primera.json()
+        assert segunda.headers["idempotent-replayed"] == "true"
+        assert len(self.repos.productos.listar()) == 1
+        
+        otro = client.post("/productos", json={**producto, "precio_base": 11}, headers=headers)
+        assert otro.status_code == 422
+    
+    def test_idempotency_key_error_permite_reintento(self):
+        domicilio = {
+            "cliente_id": "no-existe", "domicilio": "Calle 1", "colonia": "Centro",
+            "municipio": "Guadalajara", "estado": "Jalisco", "tipo_direccion": "ENVIO"
+        }
+        headers = {"Idempotency-Key": "dom-1"}
+        assert client.post("/domicilios", json=domicilio, headers=headers).status_code == 404
+        assert self.repos.idempotencia.listar() == []
+        
+        self.repos.clientes.cargar([{"id": "no-existe"}])
+        assert client.post("/domicilios", json=domicilio, headers=headers).status_code == 201
+    
+    def test_item_etag_y_304(self):
+        producto = client.post("/productos", json={
+            "nombre": "Producto", "unidad_medida": "PZA", "precio_base": 10.5
+        }).json()
+        
+        response = client.get(f"/productos/{producto['id']}")
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "no-cache"
+        
+        response = client.get(f"/productos/{producto['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        
+        client.put(f"/productos/{producto['id']}", json={"precio_base": 12})
+        response = client.get(f"/productos/{producto['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+    
+    def test_listado_etag_por_version_de_catalogo(self):
+        self.repos.productos.cargar([
+            {"id": "p1", "nombre": "Uno", "unidad_medida": "PZA", "precio_base": Decimal("1.5"),
+             "created_at": "2026-01-01", "updated_at": "2026-01-01"}
+        ])
+        response = client.get("/productos")
+        etag = response.headers["etag"]
+        assert response.json()[0]["precio_base"] == 1.5
+        
+        # Sin cambios: 304 sin scan, y el cuerpo sale de la caché por versión
+        with patch.object(self.repos.productos, 'listar', side_effect=AssertionError):
+            assert client.get("/productos", headers={"If-None-Match": f'W/{etag}'}).status_code == 304
+            assert client.get("/productos").json() == response.json()
+        
+        client.post("/productos", json={"nombre": "Dos", "unidad_medida": "PZA", "precio_base": 2})
+        response = client.get("/productos", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert self.repos.versiones.obtener("VERSION#productos")["version"] == 1
+    
+    def test_cuerpos_por_version_con_scan_consistente(self):
+        listar = self.repos.productos.listar
+        with patch.object(self.repos.productos, 'listar', side_effect=listar) as mock_productos, \
+             patch.object(self.repos.clientes, 'listar', side_effect=self.repos.clientes.listar) as mock_clientes:
+            client.get("/productos")
+            client.get("/clientes")
+            client.get("/productos/buscar", params={"q": "x"})
+        # Listado en caché por versión y snapshot compacto de búsqueda
+        assert [c.kwargs for c in mock_productos.call_args_list] == [{"consistente": True}] * 2
+        assert mock_clientes.call_args.kwargs == {"consistente": True}
+    
+    def test_compresion_gzip_con_etag(self):
+        self.repos.productos.cargar([
+            {"id": f"p{i}", "nombre": f"Producto {i}", "unidad_medida": "PZA", "precio_base": 1,
+             "created_at": "2026-01-01", "updated_at": "2026-01-01"} for i in range(50)
+        ])
+        response = client.get("/productos", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"].endswith('-gzip"')
+        assert len(response.json()) == 50
+        
+        response = client.get("/productos", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]
+        })
+        assert response.status_code == 304
+        
+        # Respuestas chicas o sin Accept-Encoding van sin comprimir
+        response = client.get("/productos/p1", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        response = client.get("/productos", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+    
+    def test_vary_en_toda_respuesta_comprimible(self):
+        self.repos.productos.cargar([
+            {"id": f"p{i}", "nombre": f"Producto {i}", "unidad_medida": "PZA", "precio_base": 1,
+             "created_at": "2026-01-01", "updated_at": "2026-01-01"} for i in range(50)
+        ])
+        etag = client.get("/productos").headers["etag"]
+        respuestas = [
+            client.get("/productos", headers={"Accept-Encoding": "identity"}),
+            client.get("/productos/p1", headers={"Accept-Encoding": "gzip"}),
+            client.get("/productos", headers={"Accept-Encoding": "identity", "If-None-Match": etag}),
+            client.get("/productos", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}),
+        ]
+        assert [r.status_code for r in respuestas] == [200, 200, 304, 304]
+        # Sin comprimir esta vez, pero un caché compartido debe separar variantes
+        assert all(r.headers["vary"] == "Accept-Encoding" for r in respuestas)
+    
+    def test_batch_get_productos(self):
+        self.repos.productos.cargar([
+            {"id": f"p{i}", "nombre": f"Producto {i}", "unidad_medida": "PZA", "precio_base": Decimal("2.5"),
+             "created_at": "2026-01-01", "updated_at": "2026-01-01", "interno": "x"} for i in range(3)
+        ])
+        response = client.post("/productos:batchGet", json={"ids": ["p2", "nada", "p0", "p2"]})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert list(data["items"]) == ["p2", "p0"]
+        assert data["items"]["p0"]["precio_base"] == 2.5
+        assert "interno" not in data["items"]["p0"]
+        assert data["no_encontrados"] == ["nada"]
+        
+        assert client.post("/clientes:batchGet", json={"ids": []}).status_code == 422
+        assert client.post("/domicilios:batchGet", json={"ids": ["d1"]}).json() == {
+            "items": {}, "no_encontrados": ["d1"]
+        }
+
+    def test_listado_sin_revalidar_igual_a_validado(self):
+        self.repos.productos.cargar([
+            {"id": f"p{i}", "nombre": f"Producto {i}", "unidad_medida": "PZA", "precio_base": Decimal(i * 5 + 5),
+             "created_at": "2026-01-01", "updated_at": "2026-01-01", "interno": "x"} for i in range(3)
+        ])
+        rapido = client.get("/productos").json()
+        app_module._listados.limpiar()
+        with patch('respuestas.RESPUESTAS_VALIDAR', True):
+            validado = client.get("/productos").json()
+
+        assert rapido == validado
+        assert [p["precio_base"] for p in rapido] == [5, 10, 15]
+        assert all("interno" not in p for p in rapido)
+    
+    def test_buscar_productos_prefijo_y_aproximado(self):
+        for nombre, unidad in [("Tornillo hexagonal", "PZA"), ("Tuerca", "PZA"),
+                               ("Tornillo para madera", "CAJA"), ("Cemento gris", "Bulto")]:
+            client.post("/productos", json={"nombre": nombre, "unidad_medida": unidad, "precio_base": 1})
+        
+        def buscar(q):
+            response = client.get("/productos/buscar", params={"q": q})
+            assert response.status_code == 200
+            return [p["nombre"] for p in response.json()]
+        
+        assert buscar("torn") == ["Tornillo hexagonal", "Tornillo para madera"]
+        assert buscar("tronillo madera") == ["Tornillo para madera"]
+        assert buscar("CEMENTÓ") == ["Cemento gris"]
+        assert buscar("caja") == ["Tornillo para madera"]
+        assert buscar("xyz") == []
+        
+        # Cambios y bajas de este contenedor se aplican sin reconstruir
+        producto_id = next(p["id"] for p in self.repos.productos.listar() if p["nombre"] == "Tuerca")
+        client.put(f"/productos/{producto_id}", json={"nombre": "Tuerca mariposa"})
+        with patch.object(self.repos.productos, 'listar', side_effect=AssertionError):
+            assert buscar("mariposa") == ["Tuerca mariposa"]
+            client.delete(f"/productos/{producto_id}")
+            assert buscar("tuerca") == []
+    
+    def test_buscar_reconstruye_con_escrituras_de_otro_contenedor(self):
+        client.get("/productos/buscar", params={"q": "tornillo"})
+        # Alta hecha por otro contenedor: solo se ve en la tabla y la versión
+        self.repos.productos.guardar({"id": "p-x", "nombre": "Tornillo", "unidad_medida": "PZA",
+                                      "precio_base": 1, "created_at": "2026-01-01", "updated_at": "2026-01-01"})
+        app_module.etags.incrementar_version(self.repos.versiones, "productos")
+        
+        with patch('busqueda.BUSQUEDA_REVISION_SEGUNDOS', 0):
+            resultados = client.get("/productos/buscar", params={"q": "tornillo"}).json()
+        assert [(p["id"], p["relevancia"]) for p in resultados] == [("p-x", 1.0)]
+
+
+class TestConcurrencia:
+    """Los endpoints no bloquean el event loop mientras esperan I/O"""
+    
+    def test_requests_concurrentes_se_traslapan(self):
+        import asyncio
+        import time
+        import httpx
+        
+        repos = repositorios.crear_repositorios(
+            "memory", {"clientes": None, "domicilios": None, "productos": None}, latencia_ms=100
+        )
+        repos.productos.cargar([{"id": "prod-1", "nombre": "Producto", "unidad_medida": "PZA", "precio_base": 10.0,
+                                 "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00"}])
+        
+        async def correr():
+            transporte = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transporte, base_url="http://test") as http:
+                inicio = time.perf_counter()
+                respuestas = await asyncio.gather(*(http.get("/productos/prod-1") for _ in range(10)))
+                return time.perf_counter() - inicio, respuestas
+        
+        with patch('app.get_repositorios', return_value=repos):
+            duracion, respuestas = asyncio.run(correr())
+        
+        assert all(r.status_code == 200 for r in respuestas)
+        # En serie serían al menos 10 x 100 ms
+        assert duracion < 0.5
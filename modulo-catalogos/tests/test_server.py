@@ -0,0 +1,41 @@
+"""
+Tests para el servidor multi-worker
+"""
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import server
+
+
+class TestOpciones:
+    """Tests para la configuración de uvicorn"""
+
+    def test_un_worker_por_core_por_default(self):
+        with patch.object(server, 'WEB_CONCURRENCY', 0), patch('os.cpu_count', return_value=8):
+            assert server.opciones()["workers"] == 8
+
+    def test_opciones_de_ambiente(self):
+        with patch.object(server, 'WEB_CONCURRENCY', 3), \
+             patch.object(server, 'SERVER_KEEP_ALIVE', 90), \
+             patch.object(server, 'SERVER_GRACEFUL_TIMEOUT', 15), \
+             patch.object(server, 'SERVER_MAX_REQUESTS', 0):
+            opciones = server.opciones()
+
+        assert opciones["workers"] == 3
+        assert opciones["timeout_keep_alive"] == 90
+        assert opciones["timeout_graceful_shutdown"] == 15
+        assert opciones["limit_max_requests"] is None
+        assert opciones["lifespan"] == "on"
+
+    def test_max_requests_solo_con_un_worker(self):
+        # uvicorn no reemplaza workers que terminan: con varios se ignora
+        with patch.object(server, 'SERVER_MAX_REQUESTS', 1000):
+            with patch.object(server, 'WEB_CONCURRENCY', 4):
+                assert server.opciones()["limit_max_requests"] is None
+            with patch.object(server, 'WEB_CONCURRENCY', 1):
+                assert server.opciones()["limit_max_requests"] == 1000
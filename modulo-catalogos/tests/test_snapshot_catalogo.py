@@ -0,0 +1,86 @@
+"""
+Tests para el snapshot compacto de productos
+"""
+import io
+from decimal import Decimal
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import snapshot_catalogo
+from snapshot_catalogo import CatalogoCompacto, SnapshotProductos, serializar
+
+PRODUCTOS = [
+    {"id": "p-2", "nombre": "Cemento gris", "unidad_medida": "Bulto", "precio_base": Decimal("215.5"),
+     "created_at": "2026-01-01", "updated_at": "2026-01-02"},
+    {"id": "p-1", "nombre": "Tornillo ½\"", "unidad_medida": "PZA", "precio_base": 0.105,
+     "created_at": "2026-01-01", "updated_at": "2026-01-01"},
+    {"id": "p-3", "nombre": "Tuerca", "unidad_medida": "PZA", "precio_base": 1,
+     "created_at": "2026-01-01", "updated_at": "2026-01-01"},
+]
+
+
+class TestSnapshotProductos:
+    """Formato columnar y lecturas sobre el archivo mapeado"""
+    
+    def test_ida_y_vuelta_con_mmap(self, tmp_path):
+        ruta = str(tmp_path / "productos.snap")
+        snapshot_catalogo.guardar(ruta, serializar(PRODUCTOS, version=7))
+        snapshot = SnapshotProductos.abrir(ruta)
+        
+        assert (snapshot.version, len(snapshot)) == (7, 3)
+        assert [p["id"] for p in snapshot.productos()] == ["p-1", "p-2", "p-3"]
+        assert snapshot.obtener("p-1") == {
+            "id": "p-1", "nombre": "Tornillo ½\"", "unidad_medida": "PZA",
+            "created_at": "2026-01-01", "updated_at": "2026-01-01", "precio_base": 0.11,
+        }
+        assert snapshot.precio_centavos("p-2") == 21550
+        assert snapshot.obtener("p-0") is None and snapshot.obtener("p-9") is None
+        snapshot.cerrar()
+    
+    def test_cadenas_repetidas_se_guardan_una_vez(self):
+        muchos = [{**PRODUCTOS[2], "id": f"p-{i:04d}"} for i in range(1000)]
+        datos = serializar(muchos, version=1)
+        assert datos.count(b"Tuerca") == 1
+        # Por producto: 5 columnas de 4 bytes, precio de 8 y su id (offset + texto)
+        assert len(datos) < 1000 * (28 + 4 + 6) + 200
+    
+    def test_formato_invalido(self):
+        import pytest
+        with pytest.raises(ValueError):
+            SnapshotProductos(b"X" * 64)
+
+
+class TestCatalogoCompacto:
+    """Snapshot vigente por versión de catálogo"""
+    
+    def test_rehace_solo_cuando_cambia_la_version(self, tmp_path):
+        catalogo = CatalogoCompacto(ruta=str(tmp_path / "p.snap"), bucket="")
+        cargar = MagicMock(return_value=PRODUCTOS)
+        
+        primero = catalogo.vigente(1, cargar)
+        assert catalogo.vigente(1, cargar) is primero
+        assert cargar.call_count == 1
+        
+        cargar.return_value = PRODUCTOS[:1]
+        segundo = catalogo.vigente(2, cargar)
+        assert (segundo.version, len(segundo), cargar.call_count) == (2, 1, 2)
+        # El snapshot anterior sigue legible por quien lo tenga
+        assert primero.obtener("p-3")["nombre"] == "Tuerca"
+    
+    def test_contenedor_frio_usa_el_de_s3(self, tmp_path):
+        s3 = MagicMock()
+        publicador = CatalogoCompacto(ruta=str(tmp_path / "a.snap"), bucket="b", get_s3=lambda: s3)
+        s3.get_object.side_effect = Exception("NoSuchKey")
+        publicador.vigente(5, lambda: PRODUCTOS)
+        publicado = s3.put_object.call_args.kwargs
+        assert publicado["Key"] == "snapshots/productos/v000000000005.snap"
+        
+        s3.get_object.side_effect = None
+        s3.get_object.return_value = {"Body": io.BytesIO(publicado["Body"])}
+        frio = CatalogoCompacto(ruta=str(tmp_path / "b.snap"), bucket="b", get_s3=lambda: s3)
+        snapshot = frio.vigente(5, MagicMock(side_effect=AssertionError))
+        assert len(snapshot) == 3
@@ -0,0 +1,103 @@
+"""
+Agregados de ventas mantenidos de forma incremental
+
+Cada nota creada suma a tres tipos de contador con ADD atómico de DynamoDB:
+- DIA#<YYYY-MM-DD>: ventas del día
+- CLIENTE#<cliente_id>: ventas históricas del cliente
+- PRODUCTO#<producto_id>: ventas históricas del producto
+
+Cada contador lleva notas, lineas, unidades e importe, así las consultas leen
+un solo item en lugar de recorrer el historial de notas y contenido.
+"""
+import os
+import contextvars
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+# Configuración de ambiente
+AGREGADOS_ENABLED = os.getenv("AGREGADOS_ENABLED", "true").lower() == "true"
+# Actualizaciones en paralelo por nota (una por día, cliente y producto)
+AGREGADOS_HILOS = int(os.getenv("AGREGADOS_HILOS", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=AGREGADOS_HILOS, thread_name_prefix="agregados")
+    return _executor
+
+def clave_dia(fecha: str) -> str:
+    return f"DIA#{fecha[:10]}"
+
+def clave_cliente(cliente_id: str) -> str:
+    return f"CLIENTE#{cliente_id}"
+
+def clave_producto(producto_id: str) -> str:
+    return f"PRODUCTO#{producto_id}"
+
+def incrementos(nota: dict, contenido: list) -> dict:
+    """Contadores a sumar por clave para una nota nueva"""
+    unidades = sum(item["cantidad"] for item in contenido)
+    importe = sum((Decimal(str(item["importe"])) for item in contenido), Decimal(0))
+    totales_nota = {"notas": 1, "lineas": len(contenido), "unidades": unidades, "importe": importe}
+
+    resultado = {
+        clave_dia(nota["created_at"]): dict(totales_nota),
+        clave_cliente(nota["cliente_id"]): dict(totales_nota),
+    }
+    # Un producto puede repetirse en varias líneas de la misma nota
+    for item in contenido:
+        clave = clave_producto(item["producto_id"])
+        contadores = resultado.setdefault(clave, {"notas": 1, "lineas": 0, "unidades": 0, "importe": Decimal(0)})
+        contadores["lineas"] += 1
+        contadores["unidades"] += item["cantidad"]
+        contadores["importe"] += Decimal(str(item["importe"]))
+    return resultado
+
+def registrar_nota(repo, nota: dict, contenido: list) -> int:
+    """
+    Suma la nota a sus agregados y regresa cuántas actualizaciones fallaron
+
+    Una falla no revierte la nota: se reporta para alertar y recalcular.
+    """
+    return registrar_notas(repo, [(nota, contenido)])
+
+def registrar_notas(repo, notas: List[Tuple[dict, list]]) -> int:
+    """Como registrar_nota para varias notas (alta en lote): los incrementos
+    de la misma clave se suman antes, así cada clave es un solo ADD"""
+    por_clave = {}
+    for nota, contenido in notas:
+        for clave, contadores in incrementos(nota, contenido).items():
+            acumulado = por_clave.setdefault(clave, dict.fromkeys(contadores, 0))
+            for contador, valor in contadores.items():
+                acumulado[contador] += valor
+    campos = {"actualizado_at": max(nota["created_at"] for nota, _ in notas)}
+    futuros = {
+        clave: get_executor().submit(
+            # Cada tarea con su copia del contexto para conservar la traza
+            contextvars.copy_context().run, repo.incrementar, clave, contadores, campos
+        )
+        for clave, contadores in por_clave.items()
+    }
+    fallidos = 0
+    for clave, futuro in futuros.items():
+        try:
+            futuro.result()
+        except Exception as e:
+            print(f"Error actualizando agregado {clave}: {e}")
+            fallidos += 1
+    return fallidos
+
+def leer(repo, clave: str) -> dict:
+    """Agregado de una clave; en ceros si aún no hay ventas"""
+    item = repo.obtener(clave) or {}
+    return {
+        "clave": clave,
+        "notas": item.get("notas", 0),
+        "lineas": item.get("lineas", 0),
+        "unidades": item.get("unidades", 0),
+        "importe": item.get("importe", 0),
+        "actualizado_at": item.get("actualizado_at"),
+    }
@@ -6,21 +6,29 @@ import os
 import json
 import time
 import uuid
-import boto3
-from io import BytesIO
+import base64
 from decimal import Decimal
-from datetime import datetime
-from functools import wraps
-from fastapi import FastAPI, HTTPException, Response
+from datetime import datetime, timezone
+from functools import wraps, partial
+from contextlib import asynccontextmanager
+import anyio
+from anyio.lowlevel import RunVar
+from fastapi import FastAPI, HTTPException, Path, Query, Response
 from fastapi.responses import StreamingResponse
 from mangum import Mangum
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+import agregados
+import aws_clients
+import importes
+import pdfs
+import dynamodb_codec
+import exportacion
+import folios
+import idempotencia
+import repositorios
+import respuestas
+import tracing
 
 # Configuración de ambiente
 ENVIRONMENT = os.getenv("ENVIRONMENT", "local")
@@ -35,19 +43,130 @@ TABLE_CONTENIDO_NOTAS = os.getenv("TABLE_CONTENIDO_NOTAS", "contenido_notas")
 TABLE_CLIENTES = os.getenv("TABLE_CLIENTES", "clientes")
 TABLE_DOMICILIOS = os.getenv("TABLE_DOMICILIOS", "domicilios")
 TABLE_PRODUCTOS = os.getenv("TABLE_PRODUCTOS", "productos")
+TABLE_AGREGADOS = os.getenv("TABLE_AGREGADOS", "agregados_ventas")
+TABLE_FOLIOS = os.getenv("TABLE_FOLIOS", "folios")
+TABLE_IDEMPOTENCIA = os.getenv("TABLE_IDEMPOTENCIA", "idempotencia")
 
-# Inicializar clientes AWS
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-s3_client = boto3.client('s3', region_name=AWS_REGION)
-sns_client = boto3.client('sns', region_name=AWS_REGION)
-cloudwatch = boto3.client('cloudwatch', region_name=AWS_REGION)
+# Índices secundarios (ver infrastructure/template.yaml)
+INDEX_NOTAS_CLIENTE = os.getenv("INDEX_NOTAS_CLIENTE", "cliente-fecha-index")
+INDEX_NOTAS_PERIODO = os.getenv("INDEX_NOTAS_PERIODO", "periodo-fecha-index")
+INDEX_NOTAS_FOLIO = os.getenv("INDEX_NOTAS_FOLIO", "folio-index")
+INDEX_CONTENIDO_NOTA = os.getenv("INDEX_CONTENIDO_NOTA", "nota-index")
+
+# "client" usa el cliente de bajo nivel con (de)serialización por esquema;
+# "resource" conserva boto3.resource('dynamodb').Table
+DYNAMODB_ACCESS_MODE = os.getenv("DYNAMODB_ACCESS_MODE", "client")
+
+# "dynamodb" o "memory" (pruebas de carga locales sin AWS)
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "dynamodb")
+MEMORY_LATENCY_MS = float(os.getenv("MEMORY_LATENCY_MS", "0"))
+
+# Hilos para los endpoints (boto3 es bloqueante); alineado con
+# AWS_MAX_POOL_CONNECTIONS para no encolar requests con conexiones libres
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "50"))
+
+# Precalentar clientes y repositorios al iniciar el worker (solo server.py;
+# en Lambda Mangum corre con lifespan="off" y todo se crea en el primer uso)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# Tamaño máximo del contenido embebido en el item de la nota (DynamoDB admite
+# items de hasta 400 KB); notas más grandes leen el contenido de su tabla
+NOTA_CONTENIDO_EMBEBIDO_MAX_BYTES = int(os.getenv("NOTA_CONTENIDO_EMBEBIDO_MAX_BYTES", "300000"))
+
+# Exportación de PDFs en ZIP: "respuesta" (streaming) o "s3" (URL prefirmada)
+EXPORT_ENTREGA = os.getenv("EXPORT_ENTREGA", "respuesta")
+EXPORT_MAX_NOTAS = int(os.getenv("EXPORT_MAX_NOTAS", "10000"))
+EXPORT_PREFIJO = os.getenv("EXPORT_PREFIJO", "exportaciones")
+EXPORT_URL_SEGUNDOS = int(os.getenv("EXPORT_URL_SEGUNDOS", "3600"))
+
+# Alta de notas en lote: máximo de notas por request y dónde se renderizan
+# los PDFs, "procesos" (contenedor) o "hilos" (Lambda no tiene /dev/shm)
+NOTAS_BULK_MAX = int(os.getenv("NOTAS_BULK_MAX", "500"))
+NOTAS_BULK_RENDER = os.getenv("NOTAS_BULK_RENDER", "procesos")
+
+# Máximo de mensajes por PublishBatch de SNS
+SNS_LOTE = 10
+
+ESQUEMAS_POR_TABLA = {
+    TABLE_NOTAS: "nota",
+    TABLE_CONTENIDO_NOTAS: "contenido",
+    TABLE_CLIENTES: "cliente",
+    TABLE_DOMICILIOS: "domicilio",
+    TABLE_PRODUCTOS: "producto",
+    TABLE_AGREGADOS: "agregado",
+    TABLE_FOLIOS: "folio",
+    TABLE_IDEMPOTENCIA: "idempotencia",
+}
+
+# Clientes AWS: se crean en el primer uso desde la fábrica compartida y se
+# reutilizan mientras el contenedor siga caliente
+def get_dynamodb():
+    return aws_clients.get_resource('dynamodb')
+
+def get_dynamodb_client():
+    return aws_clients.get_client('dynamodb')
+
+def get_s3_client():
+    return aws_clients.get_client('s3')
+
+def get_sns_client():
+    return aws_clients.get_client('sns')
+
+def get_cloudwatch():
+    return aws_clients.get_client('cloudwatch')
+
+def precalentar():
+    """Crea clientes AWS, tablas y repositorios y carga ReportLab antes del primer request"""
+    get_s3_client()
+    get_sns_client()
+    get_cloudwatch()
+    get_repositorios()
+    if REPOSITORY_BACKEND == "dynamodb":
+        for table_name in ESQUEMAS_POR_TABLA:
+            get_table(table_name)
+    generar_pdf_nota(
+        {"folio": "NV-WARMUP", "created_at": "", "total": 0.0}, {},
+        [{"cantidad": 1, "producto_nombre": "", "precio_unitario": 0.0, "importe": 0.0}]
+    )
+    if NOTAS_BULK_RENDER == "procesos":
+        get_pool_pdfs()
+
+# Pool de procesos de /notas/bulk: uno por worker, no uno por request (cada
+# proceso spawn vuelve a importar ReportLab); se cierra al salir del lifespan
+_pool_pdfs = None
+
+def get_pool_pdfs():
+    global _pool_pdfs
+    if _pool_pdfs is None:
+        _pool_pdfs = pdfs.crear_pool()
+    return _pool_pdfs
+
+def cerrar_pool_pdfs():
+    global _pool_pdfs
+    pool, _pool_pdfs = _pool_pdfs, None
+    if pool is not None:
+        pool.shutdown()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Precalienta cada worker de server.py antes de aceptar requests"""
+    if WARMUP_ON_STARTUP:
+        await anyio.to_thread.run_sync(precalentar)
+    try:
+        yield
+    finally:
+        cerrar_pool_pdfs()
 
 app = FastAPI(
     title="API Notas de Venta",
     description="Creación y gestión de notas de venta con generación de PDF",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+tracing.configurar("notas-venta", "NotasVenta/Notas")
+app.add_middleware(tracing.ServerTimingMiddleware)
+
 # ==================== MÉTRICAS ====================
 
 def put_metric(metric_name: str, value: float, unit: str = "Count", dimensions: dict = None):
@@ -61,7 +180,7 @@ def put_metric(metric_name: str, value: float, unit: str = "Count", dimensions:
             for key, val in dimensions.items():
                 metric_dimensions.append({"Name": key, "Value": str(val)})
         
-        cloudwatch.put_metric_data(
+        get_cloudwatch().put_metric_data(
             Namespace="NotasVenta/Notas",
             MetricData=[{
                 "MetricName": metric_name,
@@ -74,13 +193,28 @@ def put_metric(metric_name: str, value: float, unit: str = "Count", dimensions:
     except Exception as e:
         print(f"Error enviando métrica: {e}")
 
+_limitador = RunVar("limitador_endpoints")
+
+def get_limitador() -> anyio.CapacityLimiter:
+    """Limitador de hilos para endpoints, uno por event loop"""
+    try:
+        return _limitador.get()
+    except LookupError:
+        limitador = anyio.CapacityLimiter(THREADPOOL_SIZE)
+        _limitador.set(limitador)
+        return limitador
+
 def track_request_metrics(func):
-    """Decorador para trackear métricas de requests HTTP"""
+    """Decorador para trackear métricas de requests HTTP
+
+    El endpoint y el envío de métricas corren en el pool de hilos, así el
+    event loop sigue atendiendo otros requests mientras boto3 espera red.
+    """
     @wraps(func)
-    async def wrapper(*args, **kwargs):
+    def medido(*args, **kwargs):
         start_time = time.time()
         try:
-            response = await func(*args, **kwargs)
+            response = func(*args, **kwargs)
             status_code = getattr(response, 'status_code', 200)
             
             if 200 <= status_code < 300:
@@ -104,6 +238,10 @@ def track_request_metrics(func):
             execution_time = (time.time() - start_time) * 1000
             put_metric("ExecutionTime", execution_time, "Milliseconds", {"Endpoint": func.__name__})
     
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await anyio.to_thread.run_sync(partial(medido, *args, **kwargs), limiter=get_limitador())
+    
     return wrapper
 
 # ==================== MODELOS ====================
@@ -112,6 +250,7 @@ class ContenidoNotaCreate(BaseModel):
     producto_id: str
     cantidad: int = Field(..., gt=0)
     precio_unitario: float = Field(..., gt=0)
+    descuento_porcentaje: float = Field(0, ge=0, le=100)
 
 class ContenidoNota(BaseModel):
     id: str
@@ -120,6 +259,7 @@ class ContenidoNota(BaseModel):
     producto_nombre: Optional[str] = None
     cantidad: int
     precio_unitario: float
+    descuento: Optional[float] = None
     importe: float
 
 class NotaVentaCreate(BaseModel):
@@ -137,16 +277,79 @@ class NotaVenta(BaseModel):
     direccion_facturacion_info: Optional[dict] = None
     direccion_envio_id: str
     direccion_envio_info: Optional[dict] = None
+    subtotal: Optional[float] = None
+    descuento: Optional[float] = None
+    impuestos: Optional[float] = None
     total: float
     contenido: Optional[List[ContenidoNota]] = None
     pdf_url: Optional[str] = None
     created_at: str
 
+class NotasBulkCreate(BaseModel):
+    notas: List[NotaVentaCreate] = Field(..., min_length=1, max_length=NOTAS_BULK_MAX)
+
+class ResultadoBulkResumen(BaseModel):
+    indice: int
+    estado: str
+    id: Optional[str] = None
+    folio: Optional[str] = None
+    error: Optional[str] = None
+    notificada: Optional[bool] = None
+
+class ResultadoBulk(ResultadoBulkResumen):
+    nota: Optional[NotaVenta] = None
+
+class NotasBulkResumen(BaseModel):
+    """Lo que se guarda para reintentos con Idempotency-Key: las notas
+    completas de un lote no caben en un item de DynamoDB"""
+    creadas: int
+    errores: int
+    resultados: List[ResultadoBulkResumen]
+
+class NotasBulkRespuesta(NotasBulkResumen):
+    resultados: List[ResultadoBulk]
+
+# Lecturas sin revalidar con pydantic (ver respuestas.py)
+_json_nota = respuestas.Serializador(NotaVenta)
+
 # ==================== HELPERS ====================
 
+_tablas = {}
+
 def get_table(table_name: str):
     """Obtiene una referencia a la tabla de DynamoDB"""
-    return dynamodb.Table(table_name)
+    if DYNAMODB_ACCESS_MODE == "resource":
+        return get_dynamodb().Table(table_name)
+    tabla = _tablas.get(table_name)
+    if tabla is None:
+        esquema = dynamodb_codec.ESQUEMAS.get(ESQUEMAS_POR_TABLA.get(table_name))
+        tabla = dynamodb_codec.TablaDynamo(get_dynamodb_client(), table_name, esquema)
+        _tablas[table_name] = tabla
+    return tabla
+
+_repositorios = None
+
+def get_repositorios() -> repositorios.Repositorios:
+    """Obtiene los repositorios del backend configurado"""
+    global _repositorios
+    if _repositorios is None:
+        _repositorios = repositorios.crear_repositorios(
+            REPOSITORY_BACKEND,
+            {
+                "clientes": TABLE_CLIENTES,
+                "domicilios": TABLE_DOMICILIOS,
+                "productos": TABLE_PRODUCTOS,
+                "notas": TABLE_NOTAS,
+                "contenido": TABLE_CONTENIDO_NOTAS,
+                "agregados": TABLE_AGREGADOS,
+                "folios": TABLE_FOLIOS,
+                "idempotencia": TABLE_IDEMPOTENCIA,
+            },
+            # get_table se resuelve en cada llamada para poder sustituirla
+            get_table=lambda table_name: get_table(table_name),
+            latencia_ms=MEMORY_LATENCY_MS
+        )
+    return _repositorios
 
 def decimal_default(obj):
     if isinstance(obj, Decimal):
@@ -158,123 +361,184 @@ def convert_decimals(item: dict) -> dict:
         return None
     return json.loads(json.dumps(item, default=decimal_default))
 
+def get_repo_idempotencia():
+    return get_repositorios().idempotencia
+
 def generar_folio() -> str:
-    """Genera un folio único para la nota"""
-    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    random_suffix = str(uuid.uuid4())[:4].upper()
-    return f"NV-{timestamp}-{random_suffix}"
+    """Siguiente folio de la serie (ver folios.py)"""
+    return folios.get_asignador(lambda: get_repositorios().folios).siguiente()
 
 def obtener_cliente(cliente_id: str) -> dict:
     """Obtiene información del cliente"""
-    table = get_table(TABLE_CLIENTES)
-    response = table.get_item(Key={"id": cliente_id})
-    return convert_decimals(response.get("Item"))
+    return convert_decimals(get_repositorios().clientes.obtener(cliente_id))
 
 def obtener_domicilio(domicilio_id: str) -> dict:
     """Obtiene información del domicilio"""
-    table = get_table(TABLE_DOMICILIOS)
-    response = table.get_item(Key={"id": domicilio_id})
-    return convert_decimals(response.get("Item"))
+    return convert_decimals(get_repositorios().domicilios.obtener(domicilio_id))
 
 def obtener_producto(producto_id: str) -> dict:
     """Obtiene información del producto"""
-    table = get_table(TABLE_PRODUCTOS)
-    response = table.get_item(Key={"id": producto_id})
-    return convert_decimals(response.get("Item"))
+    return convert_decimals(get_repositorios().productos.obtener(producto_id))
+
+# Campos que se copian a la nota al crearla: lo que aparece en la factura
+CAMPOS_SNAPSHOT_CLIENTE = ("id", "razon_social", "nombre_comercial", "rfc", "correo_electronico", "telefono")
+CAMPOS_SNAPSHOT_DOMICILIO = ("id", "cliente_id", "domicilio", "colonia", "municipio", "estado", "tipo_direccion")
+
+CAMPOS_LISTADO_NOTA = (
+    "id", "folio", "cliente_id", "direccion_facturacion_id", "direccion_envio_id", "total", "created_at",
+)
+
+def snapshot(item: dict, campos: tuple) -> dict:
+    """Copia inmutable de los datos del catálogo al momento de la venta"""
+    return {campo: item[campo] for campo in campos if campo in item}
+
+def contenido_cabe_en_nota(contenido: list) -> bool:
+    tamano = len(json.dumps(contenido, default=decimal_default))
+    return tamano <= NOTA_CONTENIDO_EMBEBIDO_MAX_BYTES
+
+def cliente_de_nota(nota: dict) -> dict:
+    """Cliente de la nota: el snapshot si existe, si no el del catálogo"""
+    return nota.get("cliente_info") or obtener_cliente(nota["cliente_id"])
+
+def completar_nota(nota: dict, live: bool = False) -> dict:
+    """Agrega cliente, domicilios y contenido a una nota ya convertida
+
+    Las notas con snapshot se sirven sin lecturas adicionales. Con live=True,
+    o en notas creadas antes del snapshot, se consultan los datos actuales del
+    catálogo.
+    """
+    if "contenido" not in nota:
+        contenido, _ = get_repositorios().contenido.consultar(INDEX_CONTENIDO_NOTA, "nota_id", nota["id"])
+        nota["contenido"] = [convert_decimals(item) for item in contenido]
+    
+    if live or "cliente_info" not in nota:
+        nota["cliente_info"] = obtener_cliente(nota["cliente_id"])
+        nota["direccion_facturacion_info"] = obtener_domicilio(nota["direccion_facturacion_id"])
+        nota["direccion_envio_info"] = obtener_domicilio(nota["direccion_envio_id"])
+    
+    if live:
+        productos = {}
+        for item in nota["contenido"]:
+            if item["producto_id"] not in productos:
+                productos[item["producto_id"]] = obtener_producto(item["producto_id"])
+            producto = productos[item["producto_id"]]
+            if producto:
+                item["producto_nombre"] = producto.get("nombre")
+    
+    nota["pdf_url"] = f"{API_BASE_URL}/notas/{nota['id']}/pdf"
+    return nota
+
+def trabajo_pdf(nota: dict) -> pdfs.Trabajo:
+    """Datos con los que se dibujó el PDF de una nota guardada"""
+    nota = completar_nota(convert_decimals(nota))
+    if not nota.get("cliente_info"):
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    return pdfs.Trabajo(nota, nota["cliente_info"], nota["contenido"])
+
+def regenerar_pdfs(nota_ids: list, forzar: bool = False, procesos: int = None, pool=None) -> dict:
+    """Regeneración en lote (contenedor o CLI); regresa cuántas notas quedaron en cada estado"""
+    # Notas en BatchGetItem de 100 en lugar de un GetItem por nota
+    notas = get_repositorios().notas.obtener_lote(nota_ids)
+    
+    def cargar(nota):
+        try:
+            return trabajo_pdf(nota)
+        except HTTPException:
+            # Nota sin snapshot cuyo cliente ya no existe
+            return None
+    
+    with tracing.EjecutorConTraza(max_workers=pdfs.PDF_HILOS_S3, thread_name_prefix="pdfs-datos") as executor:
+        trabajos = [t for t in executor.map(cargar, [notas[i] for i in nota_ids if i in notas]) if t is not None]
+    planes = pdfs.regenerar_lote(get_s3_client(), S3_BUCKET, trabajos, forzar, procesos, pool=pool)
+    conteo = {pdfs.SIN_CAMBIOS: 0, pdfs.RENDERIZADO: 0}
+    for plan in planes:
+        conteo[plan.estado] += 1
+    conteo["no_encontradas"] = len(nota_ids) - len(trabajos)
+    return conteo
+
+# ==================== CONSULTAS POR ÍNDICE ====================
+
+def codificar_cursor(cursor: dict) -> str:
+    texto = json.dumps(cursor, separators=(",", ":"), default=decimal_default)
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+def decodificar_cursor(cursor: str) -> dict:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def normalizar_fecha(valor: Optional[str], fin_de_dia: bool = False) -> Optional[str]:
+    """Fecha ISO comparable con created_at (UTC sin zona); una fecha sin hora
+    cubre el día completo cuando es el límite superior"""
+    if valor is None:
+        return None
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Fecha inválida: {valor}")
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    if fin_de_dia and len(valor) == 10:
+        fecha = fecha.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return fecha.isoformat()
+
+def periodos_entre(desde: str, hasta: str) -> List[str]:
+    """Meses (YYYY-MM) que cubre el rango, en orden"""
+    anio, mes = int(desde[:4]), int(desde[5:7])
+    periodos = []
+    while f"{anio:04d}-{mes:02d}" <= hasta[:7]:
+        periodos.append(f"{anio:04d}-{mes:02d}")
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return periodos
+
+def consultar_notas_por_periodo(desde: str, hasta: str, limite: int, cursor: Optional[dict]):
+    """Notas en el rango consultando el índice por periodo mes a mes"""
+    repos = get_repositorios()
+    periodos = periodos_entre(desde, hasta)
+    llave = None
+    if cursor:
+        periodos = [p for p in periodos if p >= cursor["p"]]
+        llave = cursor.get("k")
+    
+    items = []
+    for i, periodo in enumerate(periodos):
+        pagina, siguiente = repos.notas.consultar(
+            INDEX_NOTAS_PERIODO, "periodo", periodo, ("created_at", desde, hasta),
+            limite=limite - len(items), cursor=llave
+        )
+        llave = None
+        items.extend(pagina)
+        if siguiente:
+            return items, {"p": periodo, "k": siguiente}
+        if len(items) >= limite:
+            return items, ({"p": periodos[i + 1]} if i + 1 < len(periodos) else None)
+    return items, None
 
 # ==================== GENERACIÓN DE PDF ====================
 
+@tracing.medir("pdf.render")
 def generar_pdf_nota(nota: dict, cliente: dict, contenido: list) -> bytes:
-    """Genera un PDF con la información de la nota de venta"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Estilo personalizado para el título
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=20,
-        alignment=1  # Centrado
-    )
-    
-    # Título
-    elements.append(Paragraph("NOTA DE VENTA", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Información de la nota
-    elements.append(Paragraph(f"<b>Folio:</b> {nota['folio']}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Fecha:</b> {nota['created_at']}", styles['Normal']))
-    elements.append(Spacer(1, 15))
-    
-    # Información del cliente
-    elements.append(Paragraph("<b>DATOS DEL CLIENTE</b>", styles['Heading2']))
-    elements.append(Paragraph(f"<b>Razón Social:</b> {cliente.get('razon_social', 'N/A')}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Nombre Comercial:</b> {cliente.get('nombre_comercial', 'N/A')}", styles['Normal']))
-    elements.append(Paragraph(f"<b>RFC:</b> {cliente.get('rfc', 'N/A')}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Correo:</b> {cliente.get('correo_electronico', 'N/A')}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Teléfono:</b> {cliente.get('telefono', 'N/A')}", styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Tabla de contenido
-    elements.append(Paragraph("<b>DETALLE DE LA NOTA</b>", styles['Heading2']))
-    elements.append(Spacer(1, 10))
-    
-    # Encabezados de la tabla
-    table_data = [['Cantidad', 'Producto', 'Precio Unitario', 'Importe']]
-    
-    # Agregar contenido
-    for item in contenido:
-        table_data.append([
-            str(item['cantidad']),
-            item.get('producto_nombre', 'Producto'),
-            f"${item['precio_unitario']:,.2f}",
-            f"${item['importe']:,.2f}"
-        ])
-    
-    # Agregar fila de total
-    table_data.append(['', '', 'TOTAL:', f"${nota['total']:,.2f}"])
-    
-    # Crear tabla
-    table = Table(table_data, colWidths=[1*inch, 3*inch, 1.5*inch, 1.5*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('ALIGN', (2, -1), (-1, -1), 'RIGHT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BOX', (0, 0), (-1, -1), 2, colors.black),
-    ]))
-    
-    elements.append(table)
-    
-    # Construir el PDF
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer.getvalue()
-
-def subir_pdf_a_s3(pdf_bytes: bytes, rfc_cliente: str, folio: str) -> str:
+    """Genera un PDF con la información de la nota de venta (ver pdfs.py)"""
+    return pdfs.renderizar(nota, cliente, contenido)
+
+def subir_pdf_a_s3(pdf_bytes: bytes, rfc_cliente: str, folio: str, pdf_hash: str = None) -> str:
     """Sube el PDF a S3 con los metadatos requeridos"""
-    object_key = f"{rfc_cliente}/{folio}.pdf"
+    object_key = pdfs.clave_nota(rfc_cliente, folio)
+    metadata = {
+        'hora-envio': datetime.utcnow().isoformat(),
+        'nota-descargada': 'false',
+        'veces-enviado': '1'
+    }
+    if pdf_hash:
+        metadata['pdf-hash'] = pdf_hash
     
-    s3_client.put_object(
+    get_s3_client().put_object(
         Bucket=S3_BUCKET,
         Key=object_key,
         Body=pdf_bytes,
         ContentType='application/pdf',
-        Metadata={
-            'hora-envio': datetime.utcnow().isoformat(),
-            'nota-descargada': 'false',
-            'veces-enviado': '1'
-        }
+        Metadata=metadata
     )
     
     put_metric("PDFGenerados", 1)
@@ -282,10 +546,11 @@ def subir_pdf_a_s3(pdf_bytes: bytes, rfc_cliente: str, folio: str) -> str:
 
 def actualizar_metadatos_s3(rfc_cliente: str, folio: str, descargada: bool = False):
     """Actualiza los metadatos del PDF en S3"""
-    object_key = f"{rfc_cliente}/{folio}.pdf"
+    object_key = pdfs.clave_nota(rfc_cliente, folio)
     
     # Obtener metadatos actuales
     try:
+        s3_client = get_s3_client()
         response = s3_client.head_object(Bucket=S3_BUCKET, Key=object_key)
         metadata = response.get('Metadata', {})
         
@@ -310,13 +575,9 @@ def actualizar_metadatos_s3(rfc_cliente: str, folio: str, descargada: bool = Fal
         print(f"Error actualizando metadatos: {e}")
         raise
 
-def publicar_notificacion_sns(cliente: dict, nota: dict, download_url: str):
-    """Publica notificación a SNS para envío de correo"""
-    if not SNS_TOPIC_ARN:
-        print("SNS_TOPIC_ARN no configurado, saltando notificación")
-        return
-    
-    message = {
+def mensaje_notificacion(cliente: dict, nota: dict, download_url: str) -> dict:
+    """Mensaje SNS de una nota generada"""
+    return {
         "type": "NOTA_VENTA_GENERADA",
         "cliente_email": cliente.get('correo_electronico'),
         "cliente_nombre": cliente.get('nombre_comercial'),
@@ -326,20 +587,133 @@ def publicar_notificacion_sns(cliente: dict, nota: dict, download_url: str):
         "download_url": download_url,
         "timestamp": datetime.utcnow().isoformat()
     }
+
+def publicar_notificacion_sns(cliente: dict, nota: dict, download_url: str):
+    """Publica notificación a SNS para envío de correo"""
+    if not SNS_TOPIC_ARN:
+        print("SNS_TOPIC_ARN no configurado, saltando notificación")
+        return
     
-    sns_client.publish(
+    get_sns_client().publish(
         TopicArn=SNS_TOPIC_ARN,
-        Message=json.dumps(message),
+        Message=json.dumps(mensaje_notificacion(cliente, nota, download_url)),
         Subject=f"Nueva Nota de Venta - {nota['folio']}"
     )
     
     put_metric("NotificacionesEnviadas", 1)
 
+def publicar_notificaciones_sns(notificaciones: List[tuple]) -> set:
+    """
+    Publica varias notificaciones (cliente, nota, download_url) con
+    PublishBatch de 10; regresa los índices que no se publicaron
+    """
+    if not SNS_TOPIC_ARN:
+        print("SNS_TOPIC_ARN no configurado, saltando notificación")
+        return set()
+    
+    fallidas = set()
+    for inicio in range(0, len(notificaciones), SNS_LOTE):
+        entradas = [
+            {
+                "Id": str(i),
+                "Message": json.dumps(mensaje_notificacion(cliente, nota, download_url)),
+                "Subject": f"Nueva Nota de Venta - {nota['folio']}",
+            }
+            for i, (cliente, nota, download_url) in enumerate(notificaciones[inicio:inicio + SNS_LOTE], inicio)
+        ]
+        try:
+            response = get_sns_client().publish_batch(TopicArn=SNS_TOPIC_ARN, PublishBatchRequestEntries=entradas)
+            fallidas.update(int(fallo["Id"]) for fallo in response.get("Failed", []))
+        except Exception as e:
+            print(f"Error publicando notificaciones: {e}")
+            fallidas.update(int(entrada["Id"]) for entrada in entradas)
+    
+    put_metric("NotificacionesEnviadas", len(notificaciones) - len(fallidas))
+    if fallidas:
+        put_metric("NotificacionesFallidas", len(fallidas))
+    return fallidas
+
+def armar_nota(nota_data: NotaVentaCreate, cliente: dict, dir_facturacion: dict, dir_envio: dict,
+               productos: List[dict]) -> tuple:
+    """
+    Nota nueva con sus importes, folio y snapshot a partir de datos ya validados
+
+    Regresa (nota, contenido_procesado, nota_dict): la nota y sus líneas para
+    guardar, con montos en Decimal, y la vista con montos en float para PDF,
+    SNS y respuesta.
+    """
+    # Importes en centavos enteros (ver importes.py)
+    calculo = importes.calcular(
+        (item.cantidad, item.precio_unitario, item.descuento_porcentaje) for item in nota_data.contenido
+    )
+    
+    # Crear nota
+    now = datetime.utcnow().isoformat()
+    folio = generar_folio()
+    nota_id = str(uuid.uuid4())
+    
+    # Contenido con montos en Decimal exacto (requerido por DynamoDB)
+    contenido_procesado = []
+    for item, producto, linea in zip(nota_data.contenido, productos, calculo.lineas):
+        contenido_procesado.append({
+            "id": str(uuid.uuid4()),
+            "nota_id": nota_id,
+            "producto_id": item.producto_id,
+            "producto_nombre": producto.get('nombre'),
+            "cantidad": linea.cantidad,
+            "precio_unitario": importes.a_decimal(linea.precio_unitario),
+            "descuento": importes.a_decimal(linea.descuento),
+            "importe": importes.a_decimal(linea.importe)
+        })
+    
+    # La nota guarda un snapshot de cliente, domicilios y contenido para que
+    # GET /notas/{id} se resuelva con una sola lectura
+    nota = {
+        "id": nota_id,
+        "folio": folio,
+        "cliente_id": nota_data.cliente_id,
+        "direccion_facturacion_id": nota_data.direccion_facturacion_id,
+        "direccion_envio_id": nota_data.direccion_envio_id,
+        "subtotal": importes.a_decimal(calculo.subtotal),
+        "descuento": importes.a_decimal(calculo.descuento),
+        "impuestos": importes.a_decimal(calculo.impuestos),
+        "total": importes.a_decimal(calculo.total),
+        "created_at": now,
+        "periodo": now[:7],
+        "cliente_info": snapshot(cliente, CAMPOS_SNAPSHOT_CLIENTE),
+        "direccion_facturacion_info": snapshot(dir_facturacion, CAMPOS_SNAPSHOT_DOMICILIO),
+        "direccion_envio_info": snapshot(dir_envio, CAMPOS_SNAPSHOT_DOMICILIO),
+    }
+    if contenido_cabe_en_nota(contenido_procesado):
+        nota["contenido"] = contenido_procesado
+    
+    # Vista con montos en float para PDF, SNS y respuesta, tomada de los
+    # centavos sin pasar por convert_decimals
+    contenido_respuesta = [
+        {
+            **item,
+            "precio_unitario": importes.a_float(linea.precio_unitario),
+            "descuento": importes.a_float(linea.descuento),
+            "importe": importes.a_float(linea.importe),
+        }
+        for item, linea in zip(contenido_procesado, calculo.lineas)
+    ]
+    nota_dict = {
+        **nota,
+        "subtotal": importes.a_float(calculo.subtotal),
+        "descuento": importes.a_float(calculo.descuento),
+        "impuestos": importes.a_float(calculo.impuestos),
+        "total": importes.a_float(calculo.total),
+        "contenido": contenido_respuesta,
+    }
+    return nota, contenido_procesado, nota_dict
+
 # ==================== ENDPOINTS ====================
 
 @app.post("/notas", response_model=NotaVenta, status_code=201)
 @track_request_metrics
-async def crear_nota_venta(nota_data: NotaVentaCreate):
+@idempotencia.idempotente("notas", get_repo_idempotencia, NotaVenta)
+def crear_nota_venta(nota_data: NotaVentaCreate):
     """Crear una nueva nota de venta con generación de PDF y notificación"""
     start_time = time.time()
     
@@ -357,60 +731,39 @@ async def crear_nota_venta(nota_data: NotaVentaCreate):
     if not dir_envio:
         raise HTTPException(status_code=404, detail="Dirección de envío no encontrada")
     
-    # Validar productos y calcular totales
-    contenido_procesado = []
-    total = 0
-    
+    # Validar productos
+    productos = []
     for item in nota_data.contenido:
         producto = obtener_producto(item.producto_id)
         if not producto:
             raise HTTPException(status_code=404, detail=f"Producto {item.producto_id} no encontrado")
-        
-        importe = item.cantidad * item.precio_unitario
-        total += importe
-        
-        contenido_procesado.append({
-            "id": str(uuid.uuid4()),
-            "producto_id": item.producto_id,
-            "producto_nombre": producto.get('nombre'),
-            "cantidad": item.cantidad,
-            "precio_unitario": item.precio_unitario,
-            "importe": importe
-        })
-    
-    # Crear nota
-    now = datetime.utcnow().isoformat()
-    folio = generar_folio()
-    nota_id = str(uuid.uuid4())
+        productos.append(producto)
     
-    nota = {
-        "id": nota_id,
-        "folio": folio,
-        "cliente_id": nota_data.cliente_id,
-        "direccion_facturacion_id": nota_data.direccion_facturacion_id,
-        "direccion_envio_id": nota_data.direccion_envio_id,
-        "total": Decimal(str(total)),
-        "created_at": now
-    }
+    nota, contenido_procesado, nota_dict = armar_nota(nota_data, cliente, dir_facturacion, dir_envio, productos)
+    nota_id, folio = nota["id"], nota["folio"]
+    contenido_respuesta = nota_dict["contenido"]
     
-    # Guardar nota en DynamoDB
-    table_notas = get_table(TABLE_NOTAS)
-    table_notas.put_item(Item=nota)
+    # Guardar nota
+    repos = get_repositorios()
+    repos.notas.guardar(nota)
     
-    # Guardar contenido
-    table_contenido = get_table(TABLE_CONTENIDO_NOTAS)
+    # Guardar contenido (se conserva la tabla para consultas por línea y
+    # para las notas que no caben en un item)
     for item in contenido_procesado:
-        item["nota_id"] = nota_id
-        item["precio_unitario"] = Decimal(str(item["precio_unitario"]))
-        item["importe"] = Decimal(str(item["importe"]))
-        table_contenido.put_item(Item=item)
+        repos.contenido.guardar(item)
+    
+    # Agregados de ventas por día, cliente y producto
+    if agregados.AGREGADOS_ENABLED:
+        fallidos = agregados.registrar_nota(repos.agregados, nota, contenido_procesado)
+        if fallidos:
+            put_metric("AgregadosFallidos", fallidos)
     
     # Generar PDF
-    nota_dict = convert_decimals(nota)
-    pdf_bytes = generar_pdf_nota(nota_dict, cliente, contenido_procesado)
+    pdf_bytes = generar_pdf_nota(nota_dict, cliente, contenido_respuesta)
     
-    # Subir PDF a S3
-    object_key = subir_pdf_a_s3(pdf_bytes, cliente['rfc'], folio)
+    # Subir PDF a S3 con su huella para no renderizarlo de nuevo al regenerar
+    pdf_hash = pdfs.huella(nota_dict, cliente, contenido_respuesta)
+    object_key = subir_pdf_a_s3(pdf_bytes, cliente['rfc'], folio, pdf_hash)
     
     # URL de descarga
     download_url = f"{API_BASE_URL}/notas/{nota_id}/pdf"
@@ -423,80 +776,276 @@ async def crear_nota_venta(nota_data: NotaVentaCreate):
     put_metric("TiempoGeneracionNota", generation_time, "Milliseconds")
     put_metric("NotasCreadas", 1)
     
-    # Preparar respuesta
-    response_nota = convert_decimals(nota)
-    response_nota["cliente_info"] = cliente
-    response_nota["direccion_facturacion_info"] = dir_facturacion
-    response_nota["direccion_envio_info"] = dir_envio
-    response_nota["contenido"] = [convert_decimals(c) for c in contenido_procesado]
-    response_nota["pdf_url"] = download_url
-    
-    return response_nota
+    nota_dict["pdf_url"] = download_url
+    return nota_dict
 
-@app.get("/notas/{nota_id}", response_model=NotaVenta)
+def validar_nota(nota_data: NotaVentaCreate, clientes: dict, domicilios: dict, productos: dict) -> tuple:
+    """Datos de la nota tomados de las lecturas en lote; HTTPException si falta alguno"""
+    cliente = clientes.get(nota_data.cliente_id)
+    if not cliente:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    dir_facturacion = domicilios.get(nota_data.direccion_facturacion_id)
+    if not dir_facturacion:
+        raise HTTPException(status_code=404, detail="Dirección de facturación no encontrada")
+    dir_envio = domicilios.get(nota_data.direccion_envio_id)
+    if not dir_envio:
+        raise HTTPException(status_code=404, detail="Dirección de envío no encontrada")
+    faltante = next((item.producto_id for item in nota_data.contenido if item.producto_id not in productos), None)
+    if faltante:
+        raise HTTPException(status_code=404, detail=f"Producto {faltante} no encontrado")
+    return cliente, dir_facturacion, dir_envio, [productos[item.producto_id] for item in nota_data.contenido]
+
+def renderizar_pdfs_bulk(trabajos: List[pdfs.Trabajo]):
+    """PDFs de las notas nuevas en paralelo (ver pdfs.regenerar_lote)"""
+    if NOTAS_BULK_RENDER == "hilos":
+        with tracing.EjecutorConTraza(max_workers=pdfs.PDF_HILOS_S3, thread_name_prefix="bulk-pdfs") as pool:
+            return pdfs.regenerar_lote(get_s3_client(), S3_BUCKET, trabajos, pool=pool, nuevas=True)
+    return pdfs.regenerar_lote(get_s3_client(), S3_BUCKET, trabajos, pool=get_pool_pdfs(), nuevas=True)
+
+@app.post("/notas/bulk", response_model=NotasBulkRespuesta)
 @track_request_metrics
-async def obtener_nota_venta(nota_id: str):
-    """Obtener una nota de venta por ID"""
-    table_notas = get_table(TABLE_NOTAS)
-    response = table_notas.get_item(Key={"id": nota_id})
-    nota = response.get("Item")
+@idempotencia.idempotente("notas-bulk", get_repo_idempotencia, NotasBulkResumen, status_code=200)
+def crear_notas_bulk(lote: NotasBulkCreate):
+    """
+    Crear muchas notas en un request, con resultado por nota
+
+    Clientes, domicilios y productos se leen una sola vez para todo el lote;
+    las notas válidas se guardan con escrituras en lote, sus PDFs se
+    renderizan en paralelo y las notificaciones salen con PublishBatch.
+    Un reintento con Idempotency-Key regresa el resumen sin las notas.
+    """
+    start_time = time.time()
+    repos = get_repositorios()
     
-    if not nota:
-        raise HTTPException(status_code=404, detail="Nota no encontrada")
+    # Una lectura en lote por catálogo con los ids sin repetir
+    clientes = repos.clientes.obtener_lote([n.cliente_id for n in lote.notas])
+    domicilios = repos.domicilios.obtener_lote(
+        [d for n in lote.notas for d in (n.direccion_facturacion_id, n.direccion_envio_id)]
+    )
+    productos = repos.productos.obtener_lote([item.producto_id for n in lote.notas for item in n.contenido])
+    clientes, domicilios, productos = (
+        {k: convert_decimals(v) for k, v in catalogo.items()} for catalogo in (clientes, domicilios, productos)
+    )
     
-    nota = convert_decimals(nota)
+    resultados: List[dict] = []
+    creadas = []
+    for indice, nota_data in enumerate(lote.notas):
+        try:
+            cliente, dir_facturacion, dir_envio, productos_nota = validar_nota(
+                nota_data, clientes, domicilios, productos
+            )
+        except HTTPException as e:
+            resultados.append({"indice": indice, "estado": "error", "error": e.detail})
+            continue
+        nota, contenido_procesado, nota_dict = armar_nota(
+            nota_data, cliente, dir_facturacion, dir_envio, productos_nota
+        )
+        nota_dict["pdf_url"] = f"{API_BASE_URL}/notas/{nota['id']}/pdf"
+        resultado = {
+            "indice": indice, "estado": "creada", "id": nota["id"], "folio": nota["folio"], "nota": nota_dict
+        }
+        resultados.append(resultado)
+        creadas.append((resultado, cliente, nota, contenido_procesado))
+    
+    if creadas:
+        # Escrituras en lote: primero las notas y después su contenido
+        repos.notas.guardar_lote([nota for _, _, nota, _ in creadas])
+        repos.contenido.guardar_lote([item for _, _, _, contenido in creadas for item in contenido])
+        if agregados.AGREGADOS_ENABLED:
+            fallidos = agregados.registrar_notas(
+                repos.agregados, [(nota, contenido) for _, _, nota, contenido in creadas]
+            )
+            if fallidos:
+                put_metric("AgregadosFallidos", fallidos)
+        
+        # Las notas ya están guardadas: si el render falla se reporta y los
+        # PDFs se recuperan con el verificador o render_masivo.py
+        try:
+            renderizar_pdfs_bulk([
+                pdfs.Trabajo(r["nota"], cliente, r["nota"]["contenido"]) for r, cliente, _, _ in creadas
+            ])
+            put_metric("PDFGenerados", len(creadas))
+            fallidas = publicar_notificaciones_sns(
+                [(cliente, r["nota"], r["nota"]["pdf_url"]) for r, cliente, _, _ in creadas]
+            )
+            for i, (resultado, _, _, _) in enumerate(creadas):
+                resultado["notificada"] = bool(SNS_TOPIC_ARN) and i not in fallidas
+        except Exception as e:
+            print(f"Error generando PDFs del lote: {e}")
+            put_metric("PDFsFallidos", len(creadas))
+            for resultado, _, _, _ in creadas:
+                resultado["notificada"] = False
+    
+    generation_time = (time.time() - start_time) * 1000
+    put_metric("TiempoGeneracionLote", generation_time, "Milliseconds")
+    put_metric("NotasCreadas", len(creadas))
     
-    # Obtener información relacionada
-    cliente = obtener_cliente(nota['cliente_id'])
-    dir_facturacion = obtener_domicilio(nota['direccion_facturacion_id'])
-    dir_envio = obtener_domicilio(nota['direccion_envio_id'])
+    return {"creadas": len(creadas), "errores": len(resultados) - len(creadas), "resultados": resultados}
+
+def notas_para_exportar(cliente_id: Optional[str], desde: Optional[str], hasta: Optional[str]) -> List[dict]:
+    """Notas del cliente y/o rango de fechas, hasta EXPORT_MAX_NOTAS"""
+    if not (cliente_id or desde):
+        raise HTTPException(status_code=400, detail="Se requiere cliente_id o desde")
+    desde = normalizar_fecha(desde)
+    hasta = normalizar_fecha(hasta, fin_de_dia=True)
+    repos = get_repositorios()
+    notas, cursor = [], None
+    while True:
+        limite = EXPORT_MAX_NOTAS + 1 - len(notas)
+        if cliente_id:
+            items, cursor = repos.notas.consultar(
+                INDEX_NOTAS_CLIENTE, "cliente_id", cliente_id, ("created_at", desde, hasta),
+                limite=limite, cursor=cursor
+            )
+        else:
+            items, cursor = consultar_notas_por_periodo(
+                desde, hasta or datetime.utcnow().isoformat(), limite, cursor
+            )
+        notas.extend(items)
+        if len(notas) > EXPORT_MAX_NOTAS:
+            raise HTTPException(
+                status_code=400, detail=f"La exportación excede {EXPORT_MAX_NOTAS} notas; reduce el rango"
+            )
+        if not cursor:
+            return notas
+
+def entradas_zip(notas: List[dict]) -> List[tuple]:
+    """
+    (nombre en el ZIP, llave en S3) de cada nota; llave None si ya no hay cliente
+
+    Los índices no proyectan cliente_info: el snapshot de cada nota se lee en
+    lote para armar la llave con el RFC con el que se subió el PDF, igual que
+    cliente_de_nota. Solo las notas sin snapshot usan el catálogo.
+    """
+    sin_snapshot = [nota["id"] for nota in notas if not nota.get("cliente_info")]
+    snapshots = get_repositorios().notas.obtener_lote(sin_snapshot, campos=("cliente_info",)) if sin_snapshot else {}
+    clientes = {}
+    entradas = []
+    for nota in notas:
+        cliente = nota.get("cliente_info") or snapshots.get(nota["id"], {}).get("cliente_info")
+        if not cliente:
+            if nota["cliente_id"] not in clientes:
+                clientes[nota["cliente_id"]] = obtener_cliente(nota["cliente_id"])
+            cliente = clientes[nota["cliente_id"]]
+        if cliente:
+            clave = pdfs.clave_nota(cliente["rfc"], nota["folio"])
+            entradas.append((clave, clave))
+        else:
+            entradas.append((f"{nota['folio']}.pdf", None))
+    return entradas
+
+@app.get("/notas/export.zip")
+@track_request_metrics
+def exportar_pdfs(
+    cliente_id: Optional[str] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    entrega: Optional[str] = Query(None, pattern="^(respuesta|s3)$")
+):
+    """Descargar en un ZIP los PDFs de un cliente y/o rango de fechas
+
+    El ZIP se genera mientras se descargan los PDFs (ver exportacion.py). Con
+    entrega=s3 (default en Lambda) se sube a S3 y se regresa una URL
+    prefirmada. No cambia el metadato nota-descargada de los PDFs.
+    """
+    entradas = entradas_zip(notas_para_exportar(cliente_id, desde, hasta))
+    entrega = entrega or EXPORT_ENTREGA
+    s3_client = get_s3_client()
+    bloques = exportacion.generar_zip(s3_client, S3_BUCKET, entradas)
+    put_metric("ExportacionesZIP", 1, dimensions={"Entrega": entrega})
+    put_metric("NotasExportadas", len(entradas))
+    
+    if entrega == "s3":
+        clave = f"{EXPORT_PREFIJO}/{datetime.utcnow():%Y%m%d}/{uuid.uuid4()}.zip"
+        tamano = exportacion.SubidaMultiparte(s3_client, S3_BUCKET, clave).subir(bloques)
+        url = s3_client.generate_presigned_url(
+            "get_object", Params={"Bucket": S3_BUCKET, "Key": clave}, ExpiresIn=EXPORT_URL_SEGUNDOS
+        )
+        return {"url": url, "clave": clave, "notas": len(entradas), "bytes": tamano}
     
-    # Obtener contenido
-    table_contenido = get_table(TABLE_CONTENIDO_NOTAS)
-    contenido_response = table_contenido.scan(
-        FilterExpression="nota_id = :nota_id",
-        ExpressionAttributeValues={":nota_id": nota_id}
+    return StreamingResponse(
+        bloques, media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="notas.zip"'}
     )
-    contenido = [convert_decimals(item) for item in contenido_response.get("Items", [])]
+
+@app.get("/notas/{nota_id}", response_model=NotaVenta)
+@track_request_metrics
+def obtener_nota_venta(nota_id: str, expand: Optional[str] = Query(None, pattern="^live$")):
+    """Obtener una nota de venta por ID (expand=live consulta el catálogo actual)"""
+    nota = get_repositorios().notas.obtener(nota_id)
     
-    nota["cliente_info"] = cliente
-    nota["direccion_facturacion_info"] = dir_facturacion
-    nota["direccion_envio_info"] = dir_envio
-    nota["contenido"] = contenido
-    nota["pdf_url"] = f"{API_BASE_URL}/notas/{nota_id}/pdf"
+    if not nota:
+        raise HTTPException(status_code=404, detail="Nota no encontrada")
     
-    return nota
+    return _json_nota.uno(completar_nota(convert_decimals(nota), live=expand == "live"))
 
 @app.get("/notas")
 @track_request_metrics
-async def listar_notas():
-    """Listar todas las notas de venta"""
-    table = get_table(TABLE_NOTAS)
-    response = table.scan()
-    return [convert_decimals(item) for item in response.get("Items", [])]
+def listar_notas(
+    cliente_id: Optional[str] = None,
+    folio: Optional[str] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """Listar notas de venta
+
+    Sin filtros regresa todas las notas. Con cliente_id, folio o rango de
+    fechas consulta los índices secundarios en orden de created_at, pagina con
+    `limit` y regresa el cursor de la siguiente página en X-Next-Cursor.
+    """
+    repos = get_repositorios()
+    if not (cliente_id or folio or desde or hasta):
+        # Sin el snapshot: cliente, domicilios y contenido solo van en GET /notas/{id}
+        return respuestas.respuesta_json(repos.notas.listar(CAMPOS_LISTADO_NOTA))
+    
+    desde = normalizar_fecha(desde)
+    hasta = normalizar_fecha(hasta, fin_de_dia=True)
+    anterior = decodificar_cursor(cursor) if cursor else None
+    
+    if folio:
+        items, siguiente = repos.notas.consultar(
+            INDEX_NOTAS_FOLIO, "folio", folio,
+            limite=limit, cursor=anterior.get("k") if anterior else None
+        )
+        siguiente = {"k": siguiente} if siguiente else None
+    elif cliente_id:
+        items, siguiente = repos.notas.consultar(
+            INDEX_NOTAS_CLIENTE, "cliente_id", cliente_id, ("created_at", desde, hasta),
+            limite=limit, cursor=anterior.get("k") if anterior else None
+        )
+        siguiente = {"k": siguiente} if siguiente else None
+    else:
+        if not desde:
+            raise HTTPException(status_code=400, detail="Se requiere desde para consultar por fechas")
+        hasta = hasta or datetime.utcnow().isoformat()
+        items, siguiente = consultar_notas_por_periodo(desde, hasta, limit, anterior)
+    
+    headers = {"X-Next-Cursor": codificar_cursor(siguiente)} if siguiente else None
+    return respuestas.respuesta_json([snapshot(item, CAMPOS_LISTADO_NOTA) for item in items], headers=headers)
 
 @app.get("/notas/{nota_id}/pdf")
 @track_request_metrics
-async def descargar_pdf_nota(nota_id: str):
+def descargar_pdf_nota(nota_id: str):
     """Descargar el PDF de una nota de venta y actualizar metadato nota-descargada"""
     # Obtener nota
-    table_notas = get_table(TABLE_NOTAS)
-    response = table_notas.get_item(Key={"id": nota_id})
-    nota = response.get("Item")
+    nota = get_repositorios().notas.obtener(nota_id)
     
     if not nota:
         raise HTTPException(status_code=404, detail="Nota no encontrada")
     
     nota = convert_decimals(nota)
     
-    # Obtener cliente para el RFC
-    cliente = obtener_cliente(nota['cliente_id'])
+    # Cliente para el RFC: el snapshot corresponde a la llave con la que se subió el PDF
+    cliente = cliente_de_nota(nota)
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     
     # Descargar PDF de S3
-    object_key = f"{cliente['rfc']}/{nota['folio']}.pdf"
+    object_key = pdfs.clave_nota(cliente['rfc'], nota['folio'])
     
+    s3_client = get_s3_client()
     try:
         s3_response = s3_client.get_object(Bucket=S3_BUCKET, Key=object_key)
         pdf_content = s3_response['Body'].read()
@@ -519,22 +1068,33 @@ async def descargar_pdf_nota(nota_id: str):
         print(f"Error descargando PDF: {e}")
         raise HTTPException(status_code=500, detail="Error al descargar PDF")
 
+@app.post("/notas/{nota_id}/pdf:regenerate")
+@track_request_metrics
+def regenerar_pdf_nota(nota_id: str, forzar: bool = False):
+    """Regenerar el PDF de una nota; solo se renderiza si cambió su huella"""
+    nota = get_repositorios().notas.obtener(nota_id)
+    
+    if not nota:
+        raise HTTPException(status_code=404, detail="Nota no encontrada")
+    
+    plan = pdfs.regenerar(get_s3_client(), S3_BUCKET, trabajo_pdf(nota), forzar, render=generar_pdf_nota)
+    put_metric("PDFRegenerados", 1, dimensions={"Resultado": plan.estado})
+    return {"nota_id": nota_id, "estado": plan.estado, "pdf_hash": plan.hash_pdf}
+
 @app.post("/notas/{nota_id}/reenviar")
 @track_request_metrics
-async def reenviar_notificacion(nota_id: str):
+def reenviar_notificacion(nota_id: str):
     """Reenviar notificación de una nota de venta"""
     # Obtener nota
-    table_notas = get_table(TABLE_NOTAS)
-    response = table_notas.get_item(Key={"id": nota_id})
-    nota = response.get("Item")
+    nota = get_repositorios().notas.obtener(nota_id)
     
     if not nota:
         raise HTTPException(status_code=404, detail="Nota no encontrada")
     
     nota = convert_decimals(nota)
     
-    # Obtener cliente
-    cliente = obtener_cliente(nota['cliente_id'])
+    # Cliente del snapshot, igual que al descargar: su RFC es el de la llave del PDF
+    cliente = cliente_de_nota(nota)
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     
@@ -549,8 +1109,33 @@ async def reenviar_notificacion(nota_id: str):
     
     return {"message": "Notificación reenviada exitosamente"}
 
+# ==================== AGREGADOS ====================
+
+@app.get("/notas/agregados/dias/{fecha}")
+@track_request_metrics
+def obtener_agregado_dia(fecha: str = Path(..., pattern=r"^\d{4}-\d{2}-\d{2}$")):
+    """Ventas de un día (UTC): notas, líneas, unidades e importe"""
+    agregado = agregados.leer(get_repositorios().agregados, agregados.clave_dia(fecha))
+    return convert_decimals(agregado)
+
+@app.get("/notas/agregados/clientes/{cliente_id}")
+@track_request_metrics
+def obtener_agregado_cliente(cliente_id: str):
+    """Ventas históricas de un cliente"""
+    agregado = agregados.leer(get_repositorios().agregados, agregados.clave_cliente(cliente_id))
+    return convert_decimals(agregado)
+
+@app.get("/notas/agregados/productos/{producto_id}")
+@track_request_metrics
+def obtener_agregado_producto(producto_id: str):
+    """Ventas históricas de un producto"""
+    agregado = agregados.leer(get_repositorios().agregados, agregados.clave_producto(producto_id))
+    return convert_decimals(agregado)
+
 # ==================== HEALTH CHECK ====================
 
+# async def: no hace I/O, así que no pasa por el threadpool (que en frío se
+# crea con el primer request)
 @app.get("/health")
 async def health_check():
     """Endpoint de salud"""
@@ -558,7 +1143,8 @@ async def health_check():
         "status": "healthy",
         "service": "notas-venta",
         "environment": ENVIRONMENT,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat(),
+        "aws_pool": aws_clients.pool_stats()
     }
 
 # Handler para Lambda
@@ -0,0 +1,91 @@
+"""
+Backfill del atributo periodo (YYYY-MM) en notas anteriores a los índices
+
+periodo-fecha-index solo contiene las notas con periodo; las notas creadas
+antes de ese cambio no aparecen en GET /notas?desde=&hasta= ni en
+render_masivo --desde hasta que se les asigna, tomado de su created_at.
+
+La tabla se recorre con un scan paralelo por segmento (ver verificador.py)
+proyectando solo id, created_at y periodo. Cada nota sin periodo se
+actualiza con la condición de que su created_at no haya cambiado, así una
+nota borrada durante el backfill no se vuelve a crear.
+
+Al terminar cada segmento se guarda un checkpoint; volver a lanzarlo con el
+mismo número de segmentos continúa con los segmentos pendientes. Repetir un
+segmento es inofensivo: las notas que ya tienen periodo se saltan.
+
+Uso:
+    python backfill_periodo.py
+    python backfill_periodo.py --segmentos 32 --checkpoint backfill.json
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+from render_masivo import leer_checkpoint, guardar_checkpoint
+
+# Configuración de ambiente
+BACKFILL_SEGMENTOS = int(os.getenv("BACKFILL_SEGMENTOS", "16"))
+BACKFILL_HILOS = int(os.getenv("BACKFILL_HILOS", "8"))
+BACKFILL_CHECKPOINT = os.getenv("BACKFILL_CHECKPOINT", ".backfill_periodo.json")
+
+def asignar_periodos(repo, pagina: list) -> int:
+    """Asigna periodo a las notas de la página que no lo tienen"""
+    actualizadas = 0
+    for nota in pagina:
+        if nota.get("periodo") or not nota.get("created_at"):
+            continue
+        if repo.actualizar(nota["id"], {"periodo": nota["created_at"][:7]}, si={"created_at": nota["created_at"]}):
+            actualizadas += 1
+    return actualizadas
+
+def correr(repo, segmentos: int = BACKFILL_SEGMENTOS, hilos: int = BACKFILL_HILOS,
+           checkpoint_ruta: str = BACKFILL_CHECKPOINT, salida=sys.stdout) -> dict:
+    """Procesa los segmentos pendientes; regresa el conteo acumulado"""
+    checkpoint = leer_checkpoint(checkpoint_ruta, {"backfill": "periodo", "segmentos": segmentos})
+    terminados = set(checkpoint.setdefault("terminados", []))
+    conteo = checkpoint["conteo"]
+    lock = threading.Lock()
+    inicio = time.perf_counter()
+
+    def segmento(numero: int):
+        revisadas = actualizadas = 0
+        for pagina in repo.recorrer(("id", "created_at", "periodo"), numero, segmentos):
+            revisadas += len(pagina)
+            actualizadas += asignar_periodos(repo, pagina)
+        with lock:
+            conteo["revisadas"] = conteo.get("revisadas", 0) + revisadas
+            conteo["actualizadas"] = conteo.get("actualizadas", 0) + actualizadas
+            checkpoint["terminados"] = sorted(terminados | {numero})
+            terminados.add(numero)
+            guardar_checkpoint(checkpoint_ruta, checkpoint)
+            print(f"{len(terminados):>4}/{segmentos} segmentos  {time.perf_counter() - inicio:7.1f} s  {conteo}",
+                  file=salida, flush=True)
+
+    pendientes = [n for n in range(segmentos) if n not in terminados]
+    with ThreadPoolExecutor(max_workers=max(1, min(hilos, len(pendientes))), thread_name_prefix="backfill") as executor:
+        # list() para propagar la excepción de cualquier segmento
+        list(executor.map(segmento, pendientes))
+    return conteo
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segmentos", type=int, default=BACKFILL_SEGMENTOS)
+    parser.add_argument("--hilos", type=int, default=BACKFILL_HILOS, help="Segmentos en proceso a la vez")
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT)
+    parser.add_argument("--reiniciar", action="store_true", help="Ignorar el checkpoint existente")
+    args = parser.parse_args()
+
+    if args.reiniciar and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    conteo = correr(app.get_repositorios().notas, args.segmentos, args.hilos, args.checkpoint)
+    print(f"Terminado: {conteo}")
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+if __name__ == "__main__":
+    main()
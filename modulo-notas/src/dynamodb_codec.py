@@ -0,0 +1,317 @@
+"""
+Acceso a DynamoDB con el cliente de bajo nivel y (de)serialización por esquema
+
+Table de boto3 convierte cada atributo con TypeSerializer/TypeDeserializer
+(todo número se vuelve Decimal) y después la API lo vuelve a convertir con
+convert_decimals. Para las formas de item que conocemos (cliente, domicilio,
+producto, nota, contenido) cada atributo tiene un decodificador precompilado
+que produce directamente str/int/float. Atributos fuera del esquema (y los
+valores anidados en mapas, listas y conjuntos) usan la conversión genérica,
+que como TypeDeserializer regresa todo número como Decimal.
+
+TablaDynamo expone el subconjunto de la interfaz de Table que usa la API
+(get_item, put_item, update_item, delete_item, scan, query, batch_writer,
+batch_get_item)
+para que pueda sustituirla sin cambiar los endpoints.
+
+Este archivo es idéntico en modulo-catalogos y modulo-notas (lo verifica
+modulo-notas/tests/test_compartidos.py).
+"""
+import time
+from decimal import Decimal
+from typing import List
+
+# Tipos de atributo: S = texto, I = entero, F = número con decimales
+ESQUEMAS = {
+    "cliente": {
+        "id": "S", "razon_social": "S", "nombre_comercial": "S", "rfc": "S",
+        "correo_electronico": "S", "telefono": "S", "created_at": "S", "updated_at": "S",
+    },
+    "domicilio": {
+        "id": "S", "cliente_id": "S", "domicilio": "S", "colonia": "S", "municipio": "S",
+        "estado": "S", "tipo_direccion": "S", "created_at": "S", "updated_at": "S",
+    },
+    "producto": {
+        "id": "S", "nombre": "S", "unidad_medida": "S", "precio_base": "F",
+        "created_at": "S", "updated_at": "S",
+    },
+    "nota": {
+        "id": "S", "folio": "S", "cliente_id": "S", "direccion_facturacion_id": "S",
+        "direccion_envio_id": "S", "subtotal": "F", "descuento": "F", "impuestos": "F", "total": "F",
+        "created_at": "S", "periodo": "S",
+    },
+    "contenido": {
+        "id": "S", "nota_id": "S", "producto_id": "S", "producto_nombre": "S",
+        "cantidad": "I", "precio_unitario": "F", "descuento": "F", "importe": "F",
+    },
+    "agregado": {
+        "id": "S", "notas": "I", "lineas": "I", "unidades": "I", "importe": "F", "actualizado_at": "S",
+    },
+    "folio": {
+        "id": "S", "ultimo": "I",
+    },
+    "idempotencia": {
+        "id": "S", "estado": "S", "huella": "S", "status": "I", "respuesta": "S",
+        "creado_at": "S", "expira_en": "I",
+    },
+    "trabajo": {
+        "id": "S", "tipo": "S", "estado": "S", "procesados": "I", "error": "S",
+        "iniciado_at": "S", "actualizado_at": "S", "expira_en": "I",
+    },
+    "version": {
+        "id": "S", "version": "I", "actualizado_at": "S",
+    },
+}
+
+# ==================== CONVERSIÓN GENÉRICA ====================
+
+def _numero(texto: str) -> Decimal:
+    # Decimal como TypeDeserializer: sin esquema no se sabe si es entero
+    return Decimal(texto)
+
+def deserializar_valor(valor: dict):
+    """Conversión genérica de un AttributeValue a tipos de Python"""
+    (tipo, dato), = valor.items()
+    if tipo == "S":
+        return dato
+    if tipo == "N":
+        return _numero(dato)
+    if tipo == "BOOL":
+        return dato
+    if tipo == "NULL":
+        return None
+    if tipo == "M":
+        return {k: deserializar_valor(v) for k, v in dato.items()}
+    if tipo == "L":
+        return [deserializar_valor(v) for v in dato]
+    if tipo == "SS":
+        return set(dato)
+    if tipo == "NS":
+        return {_numero(n) for n in dato}
+    if tipo == "B":
+        return dato
+    if tipo == "BS":
+        return set(dato)
+    raise TypeError(f"Tipo de DynamoDB no soportado: {tipo}")
+
+def _texto_numero(valor) -> str:
+    if isinstance(valor, float):
+        return repr(valor)
+    return str(valor)
+
+def serializar_valor(valor) -> dict:
+    """Conversión genérica de un valor de Python a AttributeValue"""
+    if valor is None:
+        return {"NULL": True}
+    if isinstance(valor, bool):
+        return {"BOOL": valor}
+    if isinstance(valor, str):
+        return {"S": valor}
+    if isinstance(valor, (int, float, Decimal)):
+        return {"N": _texto_numero(valor)}
+    if isinstance(valor, dict):
+        return {"M": {k: serializar_valor(v) for k, v in valor.items()}}
+    if isinstance(valor, (list, tuple)):
+        return {"L": [serializar_valor(v) for v in valor]}
+    if isinstance(valor, (bytes, bytearray)):
+        return {"B": bytes(valor)}
+    if isinstance(valor, (set, frozenset)):
+        if all(isinstance(v, str) for v in valor):
+            return {"SS": sorted(valor)}
+        return {"NS": [_texto_numero(v) for v in valor]}
+    raise TypeError(f"Tipo no soportado para DynamoDB: {type(valor).__name__}")
+
+# ==================== CONVERSIÓN POR ESQUEMA ====================
+
+_DECODIFICADORES = {
+    "S": lambda v: v["S"],
+    "I": lambda v: int(v["N"]),
+    "F": lambda v: float(v["N"]),
+}
+
+class Codec:
+    """(De)serializador precompilado para una forma de item"""
+
+    def __init__(self, esquema: dict = None):
+        self.tipos = dict(esquema or {})
+        self.decodificadores = {k: _DECODIFICADORES[t] for k, t in self.tipos.items()}
+
+    def deserializar(self, item: dict) -> dict:
+        if item is None:
+            return None
+        decodificadores = self.decodificadores
+        resultado = {}
+        for nombre, valor in item.items():
+            decodificar = decodificadores.get(nombre)
+            if decodificar is not None:
+                try:
+                    resultado[nombre] = decodificar(valor)
+                    continue
+                except KeyError:
+                    # El atributo no tiene el tipo esperado (p. ej. NULL)
+                    pass
+            resultado[nombre] = deserializar_valor(valor)
+        return resultado
+
+    def serializar(self, item: dict) -> dict:
+        tipos = self.tipos
+        resultado = {}
+        for nombre, valor in item.items():
+            tipo = tipos.get(nombre)
+            if tipo == "S" and isinstance(valor, str):
+                resultado[nombre] = {"S": valor}
+            elif tipo in ("I", "F") and isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+                resultado[nombre] = {"N": _texto_numero(valor)}
+            else:
+                resultado[nombre] = serializar_valor(valor)
+        return resultado
+
+def _serializar_valores(valores: dict) -> dict:
+    return {k: serializar_valor(v) for k, v in valores.items()}
+
+# ==================== TABLA ====================
+
+class TablaDynamo:
+    """Subconjunto de boto3 Table sobre el cliente de bajo nivel"""
+
+    def __init__(self, client, table_name: str, esquema: dict = None):
+        self.client = client
+        self.table_name = table_name
+        self.codec = Codec(esquema)
+
+    def _parametros(self, kwargs: dict) -> dict:
+        """Serializa los parámetros con valores tipados de una operación"""
+        params = {"TableName": self.table_name}
+        for nombre, valor in kwargs.items():
+            if nombre == "ExpressionAttributeValues":
+                valor = _serializar_valores(valor)
+            elif nombre in ("Key", "ExclusiveStartKey", "Item"):
+                valor = self.codec.serializar(valor)
+            params[nombre] = valor
+        return params
+
+    def _respuesta_items(self, response: dict) -> dict:
+        deserializar = self.codec.deserializar
+        resultado = {
+            "Items": [deserializar(item) for item in response.get("Items", [])],
+            "Count": response.get("Count", 0),
+            "ScannedCount": response.get("ScannedCount", 0),
+        }
+        if "LastEvaluatedKey" in response:
+            resultado["LastEvaluatedKey"] = self.codec.deserializar(response["LastEvaluatedKey"])
+        return resultado
+
+    def get_item(self, **kwargs) -> dict:
+        response = self.client.get_item(**self._parametros(kwargs))
+        if "Item" not in response:
+            return {}
+        return {"Item": self.codec.deserializar(response["Item"])}
+
+    def put_item(self, **kwargs) -> dict:
+        response = self.client.put_item(**self._parametros(kwargs))
+        if "Attributes" in response:
+            return {"Attributes": self.codec.deserializar(response["Attributes"])}
+        return {}
+
+    def update_item(self, **kwargs) -> dict:
+        response = self.client.update_item(**self._parametros(kwargs))
+        if "Attributes" in response:
+            return {"Attributes": self.codec.deserializar(response["Attributes"])}
+        return {}
+
+    def delete_item(self, **kwargs) -> dict:
+        response = self.client.delete_item(**self._parametros(kwargs))
+        if "Attributes" in response:
+            return {"Attributes": self.codec.deserializar(response["Attributes"])}
+        return {}
+
+    def scan(self, **kwargs) -> dict:
+        return self._respuesta_items(self.client.scan(**self._parametros(kwargs)))
+
+    def query(self, **kwargs) -> dict:
+        return self._respuesta_items(self.client.query(**self._parametros(kwargs)))
+
+    def batch_get_item(self, Keys: List[dict], **kwargs) -> dict:
+        """Un BatchGetItem (hasta 100 llaves) sobre esta tabla; los reintentos
+        de UnprocessedKeys quedan a cargo de quien llama. kwargs admite
+        ProjectionExpression y ExpressionAttributeNames"""
+        response = self.client.batch_get_item(RequestItems={
+            self.table_name: {"Keys": [self.codec.serializar(llave) for llave in Keys], **kwargs}
+        })
+        deserializar = self.codec.deserializar
+        sin_procesar = response.get("UnprocessedKeys", {}).get(self.table_name, {}).get("Keys", [])
+        return {
+            "Items": [deserializar(item) for item in response.get("Responses", {}).get(self.table_name, [])],
+            "UnprocessedKeys": [deserializar(llave) for llave in sin_procesar],
+        }
+
+    def batch_writer(self) -> "LoteEscritura":
+        return LoteEscritura(self)
+
+    def scan_all(self, **kwargs):
+        """Itera todos los items de un scan siguiendo la paginación"""
+        while True:
+            response = self.scan(**kwargs)
+            yield from response["Items"]
+            if "LastEvaluatedKey" not in response:
+                return
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+# Máximo de operaciones por BatchWriteItem
+MAX_LOTE = 25
+
+class LoteEscritura:
+    """
+    Equivalente a Table.batch_writer sobre TablaDynamo
+
+    Agrupa put_item/delete_item en BatchWriteItem de 25 y vuelve a encolar los
+    UnprocessedItems con espera exponencial hasta vaciar la cola. Como en
+    boto3, lo encolado se envía al salir del bloque aunque este falle.
+    """
+
+    def __init__(self, tabla: TablaDynamo, max_reintentos: int = 10):
+        self.tabla = tabla
+        self.max_reintentos = max_reintentos
+        self._pendientes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.vaciar()
+            return
+        # Se propaga la excepción del bloque, no la del envío
+        try:
+            self.vaciar()
+        except Exception as e:
+            print(f"Error enviando el lote pendiente de {self.tabla.table_name}: {e}")
+
+    def put_item(self, Item: dict):
+        self._agregar({"PutRequest": {"Item": self.tabla.codec.serializar(Item)}})
+
+    def delete_item(self, Key: dict):
+        self._agregar({"DeleteRequest": {"Key": self.tabla.codec.serializar(Key)}})
+
+    def _agregar(self, peticion: dict):
+        self._pendientes.append(peticion)
+        if len(self._pendientes) >= MAX_LOTE:
+            self._enviar()
+
+    def _enviar(self):
+        lote, self._pendientes = self._pendientes[:MAX_LOTE], self._pendientes[MAX_LOTE:]
+        response = self.tabla.client.batch_write_item(RequestItems={self.tabla.table_name: lote})
+        sin_procesar = response.get("UnprocessedItems", {}).get(self.tabla.table_name, [])
+        self._pendientes.extend(sin_procesar)
+        return len(sin_procesar)
+
+    def vaciar(self):
+        intentos = 0
+        while self._pendientes:
+            if self._enviar():
+                intentos += 1
+                if intentos > self.max_reintentos:
+                    raise RuntimeError(f"BatchWriteItem sin avance en {self.tabla.table_name}")
+                time.sleep(min(0.05 * 2 ** intentos, 2.0))
+            else:
+                intentos = 0
@@ -0,0 +1,141 @@
+"""
+Exportación de PDFs de notas en un ZIP generado al vuelo
+
+El ZIP se escribe por partes mientras se descargan los PDFs: zipfile escribe
+sobre una salida que no se puede recorrer (usa data descriptors) y cada
+bloque se entrega en cuanto está listo, así que nunca se tiene el archivo
+completo en memoria.
+
+- Los PDFs se descargan de S3 en EXPORT_HILOS_S3 hilos, con una ventana de
+  a lo más 2 x hilos PDFs descargados por delante del que se está
+  escribiendo; el orden del ZIP es el de las notas
+- Solo se usa get_object: exportar no cuenta como descarga de la nota (no
+  toca el metadato nota-descargada)
+- Los PDFs que no están en S3 (o cuya nota ya no tiene cliente para armar
+  la llave) se listan en FALTANTES.txt dentro del ZIP
+
+Los PDFs de ReportLab ya van comprimidos, por eso las entradas se guardan
+sin compresión (ZIP_STORED).
+
+Para respuestas que no caben en Lambda (6 MB) el mismo flujo se sube a S3
+con multipart upload (SubidaMultiparte) y se regresa una URL prefirmada.
+"""
+import os
+import zipfile
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, Tuple
+from botocore.exceptions import ClientError
+import tracing
+
+# Configuración de ambiente
+EXPORT_HILOS_S3 = int(os.getenv("EXPORT_HILOS_S3", "8"))
+# Tamaño de parte del multipart upload (mínimo de S3: 5 MB)
+EXPORT_PARTE_BYTES = int(os.getenv("EXPORT_PARTE_BYTES", str(8 * 1024 * 1024)))
+
+FALTANTES = "FALTANTES.txt"
+
+class _Salida:
+    """Destino de zipfile que solo acumula los bytes escritos"""
+
+    def __init__(self):
+        self._bloques: List[bytes] = []
+
+    def write(self, datos) -> int:
+        self._bloques.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._bloques)
+        self._bloques.clear()
+        return datos
+
+def descargar(s3, bucket: str, clave: str) -> Optional[bytes]:
+    """Bytes del objeto, o None si no existe (o no hay llave)"""
+    if not clave:
+        return None
+    try:
+        return s3.get_object(Bucket=bucket, Key=clave)["Body"].read()
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+
+def generar_zip(s3, bucket: str, entradas: Iterable[Tuple[str, str]],
+                hilos: int = EXPORT_HILOS_S3) -> Iterator[bytes]:
+    """Bloques del ZIP con un archivo por (nombre en el ZIP, llave en S3)"""
+    salida = _Salida()
+    faltantes = []
+    with tracing.EjecutorConTraza(max_workers=hilos, thread_name_prefix="export-s3") as executor:
+        pendientes = deque()
+        entradas = iter(entradas)
+
+        def encolar():
+            for nombre, clave in entradas:
+                pendientes.append((nombre, executor.submit(descargar, s3, bucket, clave)))
+                if len(pendientes) >= 2 * hilos:
+                    return
+
+        try:
+            with zipfile.ZipFile(salida, "w", zipfile.ZIP_STORED) as archivo:
+                encolar()
+                while pendientes:
+                    nombre, futuro = pendientes.popleft()
+                    contenido = futuro.result()
+                    encolar()
+                    if contenido is None:
+                        faltantes.append(nombre)
+                        continue
+                    archivo.writestr(nombre, contenido)
+                    yield salida.vaciar()
+                if faltantes:
+                    archivo.writestr(FALTANTES, "\n".join(faltantes) + "\n")
+            yield salida.vaciar()
+        finally:
+            # Si el cliente corta la descarga no se siguen bajando PDFs
+            for _, futuro in pendientes:
+                futuro.cancel()
+
+class SubidaMultiparte:
+    """Sube a S3 un flujo de bloques con multipart upload"""
+
+    def __init__(self, s3, bucket: str, clave: str, parte_bytes: int = EXPORT_PARTE_BYTES,
+                 content_type: str = "application/zip"):
+        self.s3 = s3
+        self.bucket = bucket
+        self.clave = clave
+        self.parte_bytes = parte_bytes
+        self.content_type = content_type
+
+    def subir(self, bloques: Iterable[bytes]) -> int:
+        """Sube todos los bloques; regresa el total de bytes"""
+        upload_id = self.s3.create_multipart_upload(
+            Bucket=self.bucket, Key=self.clave, ContentType=self.content_type
+        )["UploadId"]
+        partes, buffer, total = [], bytearray(), 0
+        try:
+            for bloque in bloques:
+                buffer += bloque
+                total += len(bloque)
+                if len(buffer) >= self.parte_bytes:
+                    partes.append(self._parte(upload_id, len(partes) + 1, bytes(buffer)))
+                    buffer.clear()
+            # La última parte puede ser menor al mínimo; siempre hay al menos una
+            if buffer or not partes:
+                partes.append(self._parte(upload_id, len(partes) + 1, bytes(buffer)))
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.clave, UploadId=upload_id,
+                MultipartUpload={"Parts": partes}
+            )
+        except BaseException:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.clave, UploadId=upload_id)
+            raise
+        return total
+
+    def _parte(self, upload_id: str, numero: int, datos: bytes) -> dict:
+        response = self.s3.upload_part(
+            Bucket=self.bucket, Key=self.clave, UploadId=upload_id, PartNumber=numero, Body=datos
+        )
+        return {"PartNumber": numero, "ETag": response["ETag"]}
@@ -0,0 +1,78 @@
+"""
+Asignación de folios sin colisiones y ordenables
+
+Cada serie tiene un contador en la tabla de folios (id FOLIO#<serie>). Un
+contenedor no pide un número por nota: reserva un bloque de FOLIO_BLOQUE
+números con un ADD atómico y los entrega localmente hasta agotarlo, así que
+casi todas las asignaciones son en memoria y DynamoDB solo ve una escritura
+por bloque.
+
+    folio = <serie>-<número con ceros a la izquierda>   p. ej. NV-0000001234
+
+Garantías:
+- Nunca se repite un folio: cada bloque lo reserva un solo contenedor
+- Dentro de un contenedor los folios son crecientes; entre contenedores se
+  intercalan por bloque (con FOLIO_BLOQUE=1 el orden es global)
+- Los números de un bloque sin usar al terminar el contenedor quedan como
+  huecos en la serie
+"""
+import os
+import threading
+from typing import Callable, Dict
+
+# Configuración de ambiente
+FOLIO_SERIE = os.getenv("FOLIO_SERIE", "NV")
+FOLIO_BLOQUE = int(os.getenv("FOLIO_BLOQUE", "50"))
+FOLIO_DIGITOS = int(os.getenv("FOLIO_DIGITOS", "10"))
+
+def clave_serie(serie: str) -> str:
+    return f"FOLIO#{serie}"
+
+def formatear(serie: str, numero: int) -> str:
+    return f"{serie}-{numero:0{FOLIO_DIGITOS}d}"
+
+class AsignadorFolios:
+    """Folios de una serie a partir de bloques reservados en el contador"""
+
+    def __init__(self, repo_getter: Callable, serie: str = None, bloque: int = None):
+        self._repo_getter = repo_getter
+        self.serie = serie or FOLIO_SERIE
+        self.bloque = max(1, bloque or FOLIO_BLOQUE)
+        self._lock = threading.Lock()
+        # Rango reservado pendiente de entregar: [_siguiente, _limite)
+        self._siguiente = 0
+        self._limite = 0
+
+    def _reservar_bloque(self):
+        nuevos = self._repo_getter().incrementar(clave_serie(self.serie), {"ultimo": self.bloque})
+        ultimo = int(nuevos["ultimo"])
+        self._siguiente, self._limite = ultimo - self.bloque + 1, ultimo + 1
+
+    def siguiente(self) -> str:
+        with self._lock:
+            if self._siguiente >= self._limite:
+                self._reservar_bloque()
+            numero = self._siguiente
+            self._siguiente += 1
+        return formatear(self.serie, numero)
+
+    def reiniciar(self):
+        """Descarta el bloque en memoria (sus números quedan como hueco)"""
+        with self._lock:
+            self._siguiente = self._limite = 0
+
+_asignadores: Dict[str, AsignadorFolios] = {}
+_asignadores_lock = threading.Lock()
+
+def get_asignador(repo_getter: Callable, serie: str = None) -> AsignadorFolios:
+    """Asignador por serie, compartido por el contenedor caliente"""
+    serie = serie or FOLIO_SERIE
+    asignador = _asignadores.get(serie)
+    if asignador is None:
+        with _asignadores_lock:
+            asignador = _asignadores.setdefault(serie, AsignadorFolios(repo_getter, serie))
+    return asignador
+
+def reiniciar():
+    with _asignadores_lock:
+        _asignadores.clear()
@@ -0,0 +1,97 @@
+"""
+Cálculo de importes de notas en centavos enteros
+
+Todas las operaciones se hacen con enteros (centavos) y los redondeos con
+Decimal en ROUND_HALF_UP, en una sola pasada sobre las líneas:
+
+    bruto      = cantidad * precio_unitario            (exacto, sin redondear)
+    importe    = redondeo(bruto * (100 - descuento_porcentaje) / 100)
+    descuento  = redondeo(bruto) - importe
+    subtotal   = suma de importes
+    impuestos  = redondeo(subtotal * TASA_IVA)
+    total      = subtotal + impuestos
+
+El importe de cada línea se redondea una sola vez: un precio con más de dos
+decimales (0.333) se multiplica completo por la cantidad y el precio_unitario
+que se guarda, ya redondeado a centavos, es solo informativo.
+
+Los montos salen como Decimal exacto con dos decimales para DynamoDB y como
+float para las respuestas, sin ida y vuelta por strings.
+"""
+import os
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List, NamedTuple
+
+# Configuración de ambiente (0 conserva total = suma de importes)
+TASA_IVA = Decimal(os.getenv("TASA_IVA", "0"))
+
+_CIEN = Decimal(100)
+_UNIDAD = Decimal(1)
+
+def redondear(valor: Decimal) -> int:
+    """Redondeo comercial (mitad hacia arriba) a entero"""
+    return int(valor.quantize(_UNIDAD, rounding=ROUND_HALF_UP))
+
+def centavos_exactos(monto):
+    """Monto en centavos sin redondear: int si tiene hasta dos decimales, Decimal si no"""
+    if isinstance(monto, float):
+        # Camino rápido: montos con hasta dos decimales caen a menos de 1e-6
+        # de un entero; el resto se toma de su representación decimal
+        escalado = monto * 100
+        entero = round(escalado)
+        if abs(escalado - entero) < 1e-6:
+            return int(entero)
+        monto = repr(monto)
+    valor = Decimal(monto) * _CIEN
+    return int(valor) if valor == valor.to_integral_value() else valor
+
+def a_centavos(monto) -> int:
+    """Monto (float, int, str o Decimal) a centavos enteros con ROUND_HALF_UP"""
+    centavos = centavos_exactos(monto)
+    return centavos if isinstance(centavos, int) else redondear(centavos)
+
+def a_decimal(centavos: int) -> Decimal:
+    return Decimal(centavos).scaleb(-2)
+
+def a_float(centavos: int) -> float:
+    return centavos / 100
+
+class Linea(NamedTuple):
+    cantidad: int
+    precio_unitario: int
+    descuento: int
+    importe: int
+
+class Importes(NamedTuple):
+    lineas: List[Linea]
+    subtotal: int
+    descuento: int
+    impuestos: int
+    total: int
+
+def calcular(lineas, tasa_iva: Decimal = None) -> Importes:
+    """
+    Calcula importes, subtotal, descuentos, impuestos y total en centavos
+
+    lineas: iterable de (cantidad, precio_unitario, descuento_porcentaje)
+    """
+    tasa = TASA_IVA if tasa_iva is None else tasa_iva
+    resultado = []
+    subtotal = 0
+    descuento_total = 0
+    for cantidad, precio, porcentaje in lineas:
+        precio_centavos = centavos_exactos(precio)
+        bruto = cantidad * precio_centavos
+        if porcentaje:
+            importe = redondear(bruto * (_CIEN - Decimal(str(porcentaje))) / _CIEN)
+            descuento = (bruto if isinstance(bruto, int) else redondear(bruto)) - importe
+        else:
+            importe = bruto if isinstance(bruto, int) else redondear(bruto)
+            descuento = 0
+        if not isinstance(precio_centavos, int):
+            precio_centavos = redondear(precio_centavos)
+        resultado.append(Linea(cantidad, precio_centavos, descuento, importe))
+        subtotal += importe
+        descuento_total += descuento
+    impuestos = redondear(subtotal * tasa) if tasa else 0
+    return Importes(resultado, subtotal, descuento_total, impuestos, subtotal + impuestos)
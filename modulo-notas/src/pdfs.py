@@ -0,0 +1,264 @@
+"""
+Render de PDFs de notas con caché por contenido
+
+Cada PDF se identifica por la huella (SHA-256) de lo que se dibuja en él:
+los campos de la nota, del cliente y de las líneas que usa la plantilla, más
+VERSION_PLANTILLA. Con la misma huella el PDF es el mismo, así que:
+
+- El objeto de la nota ({rfc}/{folio}.pdf) lleva la huella en el metadato
+  pdf-hash; regenerar con la misma huella no hace nada
+- Solo se renderizan las notas cuya huella cambió (o cuyo objeto falta), y
+  en lote se reparten en un pool de procesos (ReportLab es CPU puro y no
+  libera el GIL)
+
+No hay un almacén por contenido compartido entre notas: el PDF lleva folio y
+fecha, así que dos notas nunca tienen los mismos bytes y una copia aparte
+solo duplicaría cada PDF en S3.
+
+Este módulo no depende de la app para poder importarse en los procesos
+worker sin cargar FastAPI ni boto3.
+"""
+import os
+import json
+import hashlib
+from io import BytesIO
+from decimal import Decimal
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, NamedTuple, Optional
+import tracing
+
+# Cambiar al modificar la plantilla: invalida todas las huellas
+VERSION_PLANTILLA = "1"
+
+# Configuración de ambiente
+PDF_PROCESOS = int(os.getenv("PDF_PROCESOS", "0"))  # 0 = uno por core
+PDF_HILOS_S3 = int(os.getenv("PDF_HILOS_S3", "16"))
+
+CAMPOS_NOTA = ("folio", "created_at", "subtotal", "descuento", "impuestos", "total")
+CAMPOS_CLIENTE = ("razon_social", "nombre_comercial", "rfc", "correo_electronico", "telefono")
+CAMPOS_LINEA = ("cantidad", "producto_nombre", "precio_unitario", "importe")
+
+# Estados de una regeneración
+SIN_CAMBIOS = "sin_cambios"
+RENDERIZADO = "renderizado"
+
+class Trabajo(NamedTuple):
+    nota: dict
+    cliente: dict
+    contenido: list
+
+def _normalizar(valor):
+    # Decimal de DynamoDB y float de la respuesta dibujan igual
+    if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+        return float(valor)
+    return valor
+
+def entradas(nota: dict, cliente: dict, contenido: list) -> dict:
+    """Solo los datos que aparecen en el PDF"""
+    return {
+        "plantilla": VERSION_PLANTILLA,
+        "nota": {c: _normalizar(nota.get(c)) for c in CAMPOS_NOTA},
+        "cliente": {c: cliente.get(c) for c in CAMPOS_CLIENTE},
+        "contenido": [{c: _normalizar(item.get(c)) for c in CAMPOS_LINEA} for item in contenido],
+    }
+
+def huella(nota: dict, cliente: dict, contenido: list) -> str:
+    datos = json.dumps(entradas(nota, cliente, contenido), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(datos.encode()).hexdigest()
+
+def clave_nota(rfc: str, folio: str) -> str:
+    return f"{rfc}/{folio}.pdf"
+
+def renderizar(nota: dict, cliente: dict, contenido: list) -> bytes:
+    """Genera un PDF con la información de la nota de venta"""
+    # ReportLab se importa aquí para no cargarlo en el arranque en frío
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    # Estilo personalizado para el título
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=20,
+        alignment=1  # Centrado
+    )
+    
+    # Título
+    elements.append(Paragraph("NOTA DE VENTA", title_style))
+    elements.append(Spacer(1, 20))
+    
+    # Información de la nota
+    elements.append(Paragraph(f"<b>Folio:</b> {nota['folio']}", styles['Normal']))
+    elements.append(Paragraph(f"<b>Fecha:</b> {nota['created_at']}", styles['Normal']))
+    elements.append(Spacer(1, 15))
+    
+    # Información del cliente
+    elements.append(Paragraph("<b>DATOS DEL CLIENTE</b>", styles['Heading2']))
+    elements.append(Paragraph(f"<b>Razón Social:</b> {cliente.get('razon_social', 'N/A')}", styles['Normal']))
+    elements.append(Paragraph(f"<b>Nombre Comercial:</b> {cliente.get('nombre_comercial', 'N/A')}", styles['Normal']))
+    elements.append(Paragraph(f"<b>RFC:</b> {cliente.get('rfc', 'N/A')}", styles['Normal']))
+    elements.append(Paragraph(f"<b>Correo:</b> {cliente.get('correo_electronico', 'N/A')}", styles['Normal']))
+    elements.append(Paragraph(f"<b>Teléfono:</b> {cliente.get('telefono', 'N/A')}", styles['Normal']))
+    elements.append(Spacer(1, 20))
+    
+    # Tabla de contenido
+    elements.append(Paragraph("<b>DETALLE DE LA NOTA</b>", styles['Heading2']))
+    elements.append(Spacer(1, 10))
+    
+    # Encabezados de la tabla
+    table_data = [['Cantidad', 'Producto', 'Precio Unitario', 'Importe']]
+    
+    # Agregar contenido
+    for item in contenido:
+        table_data.append([
+            str(item['cantidad']),
+            item.get('producto_nombre', 'Producto'),
+            f"${item['precio_unitario']:,.2f}",
+            f"${item['importe']:,.2f}"
+        ])
+    
+    # Filas de subtotal, descuento e IVA (solo si aplican) y total
+    if nota.get('descuento') or nota.get('impuestos'):
+        table_data.append(['', '', 'SUBTOTAL:', f"${nota['subtotal']:,.2f}"])
+        if nota.get('descuento'):
+            table_data.append(['', '', 'DESCUENTO:', f"-${nota['descuento']:,.2f}"])
+        if nota.get('impuestos'):
+            table_data.append(['', '', 'IVA:', f"${nota['impuestos']:,.2f}"])
+    table_data.append(['', '', 'TOTAL:', f"${nota['total']:,.2f}"])
+    
+    # Crear tabla
+    table = Table(table_data, colWidths=[1*inch, 3*inch, 1.5*inch, 1.5*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('ALIGN', (2, -1), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BOX', (0, 0), (-1, -1), 2, colors.black),
+    ]))
+    
+    elements.append(table)
+    
+    # Construir el PDF
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+# ==================== CACHÉ EN S3 ====================
+
+class Plan(NamedTuple):
+    trabajo: Trabajo
+    hash_pdf: str
+    clave: str
+    metadatos: dict  # metadatos actuales del objeto de la nota ({} si no existe)
+    estado: str
+
+def _no_encontrado(error: Exception) -> bool:
+    codigo = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return codigo in ("404", "NoSuchKey", "NotFound")
+
+def _head(s3, bucket: str, clave: str) -> Optional[dict]:
+    try:
+        return s3.head_object(Bucket=bucket, Key=clave)
+    except Exception as e:
+        if _no_encontrado(e):
+            return None
+        raise
+
+def metadatos_nota(previos: dict, hash_pdf: str) -> dict:
+    """Metadatos del objeto de la nota; conserva envíos y descargas previos"""
+    return {
+        "hora-envio": previos.get("hora-envio", datetime.utcnow().isoformat()),
+        "nota-descargada": previos.get("nota-descargada", "false"),
+        "veces-enviado": previos.get("veces-enviado", "1"),
+        "pdf-hash": hash_pdf,
+    }
+
+def planear(s3, bucket: str, trabajo: Trabajo, forzar: bool = False, nueva: bool = False) -> Plan:
+    """Decide si el PDF de la nota sigue igual o se renderiza
+
+    Una nota recién creada (nueva=True) no tiene objeto en S3 (su folio es
+    nuevo), así que se renderiza sin consultarlo.
+    """
+    hash_pdf = huella(*trabajo)
+    clave = clave_nota(trabajo.cliente["rfc"], trabajo.nota["folio"])
+    if nueva:
+        return Plan(trabajo, hash_pdf, clave, {}, RENDERIZADO)
+    actual = _head(s3, bucket, clave)
+    metadatos = actual.get("Metadata", {}) if actual else {}
+    if not forzar and metadatos.get("pdf-hash") == hash_pdf:
+        estado = SIN_CAMBIOS
+    else:
+        estado = RENDERIZADO
+    return Plan(trabajo, hash_pdf, clave, metadatos, estado)
+
+def publicar(s3, bucket: str, plan: Plan, pdf_bytes: bytes):
+    """Sube el render al objeto de la nota con su huella"""
+    if plan.estado == SIN_CAMBIOS:
+        return
+    s3.put_object(
+        Bucket=bucket, Key=plan.clave, Body=pdf_bytes,
+        ContentType="application/pdf", Metadata=metadatos_nota(plan.metadatos, plan.hash_pdf)
+    )
+
+def regenerar(s3, bucket: str, trabajo: Trabajo, forzar: bool = False,
+              render: Callable = renderizar) -> Plan:
+    """Regenera el PDF de una nota renderizando solo si su huella es nueva"""
+    plan = planear(s3, bucket, trabajo, forzar)
+    pdf_bytes = render(*trabajo) if plan.estado == RENDERIZADO else None
+    publicar(s3, bucket, plan, pdf_bytes)
+    return plan
+
+def crear_pool(procesos: int = None) -> ProcessPoolExecutor:
+    """Pool de procesos para renders; spawn no hereda los hilos de boto3 del padre"""
+    import multiprocessing
+    procesos = procesos or PDF_PROCESOS or os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+
+def regenerar_lote(s3, bucket: str, trabajos: List[Trabajo], forzar: bool = False,
+                   procesos: int = None, hilos: int = None,
+                   pool: ProcessPoolExecutor = None, nuevas: bool = False) -> List[Plan]:
+    """
+    Regenera muchos PDFs: consultas y subidas a S3 en hilos, renders en procesos
+
+    Cada huella nueva se renderiza una sola vez aunque se repita en el lote.
+    Con `pool` se reutiliza un pool ya creado (varios lotes seguidos o el del
+    worker). El pool de procesos necesita multiprocessing completo (contenedor
+    o CLI, no Lambda). nuevas=True marca notas recién creadas (ver planear).
+    """
+    hilos = hilos or PDF_HILOS_S3
+    with tracing.EjecutorConTraza(max_workers=hilos, thread_name_prefix="pdfs-s3") as io:
+        planes = list(io.map(lambda t: planear(s3, bucket, t, forzar, nuevas), trabajos))
+
+        # Una nota repetida en el lote tiene la misma huella y el mismo objeto
+        unicos = {}
+        for plan in planes:
+            if plan.estado == RENDERIZADO:
+                unicos.setdefault(plan.hash_pdf, plan)
+        if unicos:
+            propio = pool is None
+            pool = pool or crear_pool(min(procesos or PDF_PROCESOS or os.cpu_count() or 1, len(unicos)))
+            try:
+                renders = pool.map(renderizar, *zip(*(p.trabajo for p in unicos.values())))
+                list(io.map(lambda par: publicar(s3, bucket, *par), zip(unicos.values(), renders)))
+            finally:
+                if propio:
+                    pool.shutdown()
+    return planes
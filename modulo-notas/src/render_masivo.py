@@ -0,0 +1,135 @@
+"""
+Render masivo de PDFs para backfills y cierres de mes
+
+Toma una lista de notas (ids o un rango de fechas), las procesa en lotes y
+por cada lote usa app.regenerar_pdfs: lectura de notas en hilos, renders en
+un pool de procesos compartido por todos los lotes (uno por core por
+default) y subidas/copias a S3 concurrentes. Las notas cuya huella no cambió
+no se renderizan (ver pdfs.py).
+
+Después de cada lote se guarda un checkpoint con el último id procesado; si
+la corrida se interrumpe, volver a lanzarla con los mismos argumentos
+continúa después de ese id. El checkpoint se identifica solo por los
+argumentos: si el rango de fechas ganó notas entre corridas, se reanuda
+igual (las notas nuevas en la parte ya procesada nacieron con su PDF).
+
+Uso:
+    python render_masivo.py --desde 2026-09-01 --hasta 2026-09-30
+    python render_masivo.py --ids nota-1 nota-2 --forzar
+    python render_masivo.py --ids-archivo ids.txt --lote 200 --procesos 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import List
+
+import app
+import pdfs
+
+# Configuración de ambiente
+RENDER_LOTE = int(os.getenv("RENDER_LOTE", "100"))
+RENDER_CHECKPOINT = os.getenv("RENDER_CHECKPOINT", ".render_masivo.json")
+
+def ids_por_fechas(desde: str, hasta: str, pagina: int = 1000) -> List[str]:
+    """Ids de las notas del rango en orden de created_at (índice por periodo)"""
+    desde = app.normalizar_fecha(desde)
+    hasta = app.normalizar_fecha(hasta, fin_de_dia=True)
+    ids, cursor = [], None
+    while True:
+        items, cursor = app.consultar_notas_por_periodo(desde, hasta, pagina, cursor)
+        ids.extend(item["id"] for item in items)
+        if not cursor:
+            return ids
+
+def leer_checkpoint(ruta: str, origen: dict) -> dict:
+    """Checkpoint de la misma corrida, o uno nuevo"""
+    if os.path.exists(ruta):
+        with open(ruta) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("origen") == origen:
+            return checkpoint
+        raise SystemExit(f"{ruta} es de otra corrida; usa --reiniciar o --checkpoint")
+    return {"origen": origen, "procesadas": 0, "conteo": {}}
+
+def guardar_checkpoint(ruta: str, checkpoint: dict):
+    # Escritura atómica: una interrupción no deja el archivo a medias
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temporal, ruta)
+
+def posicion_reanudacion(ids: List[str], ultimo_id: str = None) -> int:
+    """Índice del primer id pendiente: el siguiente al último procesado"""
+    if ultimo_id is None:
+        return 0
+    try:
+        return ids.index(ultimo_id) + 1
+    except ValueError:
+        # La nota ya no está en la selección (p. ej. se borró): se empieza
+        # de nuevo; las ya procesadas salen sin_cambios con un HeadObject
+        print(f"{ultimo_id} ya no está en la selección; se recorre desde el inicio")
+        return 0
+
+def correr(ids: List[str], origen: dict, lote: int, forzar: bool = False, procesos: int = None,
+           checkpoint_ruta: str = RENDER_CHECKPOINT, salida=sys.stdout) -> dict:
+    """Procesa los ids por lotes desde el checkpoint; regresa el conteo acumulado"""
+    checkpoint = leer_checkpoint(checkpoint_ruta, origen)
+    inicio_corrida = posicion_reanudacion(ids, checkpoint.get("ultimo_id"))
+    inicio = time.perf_counter()
+    with pdfs.crear_pool(procesos) as pool:
+        for desde in range(inicio_corrida, len(ids), lote):
+            bloque = ids[desde:desde + lote]
+            conteo = app.regenerar_pdfs(bloque, forzar, pool=pool)
+            checkpoint["ultimo_id"] = bloque[-1]
+            checkpoint["procesadas"] += len(bloque)
+            for estado, n in conteo.items():
+                checkpoint["conteo"][estado] = checkpoint["conteo"].get(estado, 0) + n
+            guardar_checkpoint(checkpoint_ruta, checkpoint)
+
+            posicion = desde + len(bloque)
+            transcurrido = time.perf_counter() - inicio
+            tasa = (posicion - inicio_corrida) / transcurrido if transcurrido else 0.0
+            print(f"{posicion:>7}/{len(ids)}  {tasa:8.1f} notas/s  {checkpoint['conteo']}",
+                  file=salida, flush=True)
+    return checkpoint["conteo"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    seleccion = parser.add_mutually_exclusive_group(required=True)
+    seleccion.add_argument("--ids", nargs="+")
+    seleccion.add_argument("--ids-archivo", help="Archivo con un id de nota por línea")
+    seleccion.add_argument("--desde", help="Fecha ISO inicial (con --hasta)")
+    parser.add_argument("--hasta", help="Fecha ISO final (default: hoy, UTC)")
+    parser.add_argument("--lote", type=int, default=RENDER_LOTE)
+    parser.add_argument("--procesos", type=int, default=None, help="Default: PDF_PROCESOS o un proceso por core")
+    parser.add_argument("--forzar", action="store_true", help="Renderizar aunque la huella no haya cambiado")
+    parser.add_argument("--checkpoint", default=RENDER_CHECKPOINT)
+    parser.add_argument("--reiniciar", action="store_true", help="Ignorar el checkpoint existente")
+    args = parser.parse_args()
+
+    if args.desde:
+        # Default estable durante el día para que el checkpoint siga aplicando
+        hasta = args.hasta or datetime.utcnow().date().isoformat()
+        origen = {"desde": args.desde, "hasta": hasta}
+        ids = ids_por_fechas(args.desde, hasta)
+    else:
+        if args.ids_archivo:
+            with open(args.ids_archivo) as f:
+                ids = [linea.strip() for linea in f if linea.strip()]
+        else:
+            ids = args.ids
+        origen = {"ids": len(ids), "primero": ids[0] if ids else None, "ultimo": ids[-1] if ids else None}
+    origen["forzar"] = args.forzar
+
+    if args.reiniciar and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    conteo = correr(ids, origen, args.lote, args.forzar, args.procesos, args.checkpoint)
+    print(f"Terminado: {conteo}")
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+if __name__ == "__main__":
+    main()
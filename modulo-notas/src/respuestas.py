@@ -0,0 +1,137 @@
+"""
+Respuestas JSON sin revalidar en los endpoints de lectura
+
+Con response_model, FastAPI valida de nuevo cada item contra el modelo y lo
+pasa por jsonable_encoder antes de serializarlo, aunque el dict venga de
+DynamoDB y de nuestro propio código. En un listado de miles de items eso es
+casi todo el CPU del request.
+
+Los endpoints de lectura siguen declarando response_model (el esquema de
+OpenAPI no cambia) pero regresan un Response ya serializado:
+
+- Serializador(Modelo).proyectar(item) deja solo los campos del modelo (con
+  su default si faltan), en el orden del modelo; los campos que son otro
+  modelo (o lista de modelos) se proyectan igual y los campos float o int se
+  convierten con float() o int() (Decimal de DynamoDB, o el 3.0 que deja
+  convert_decimals en un int); en los campos dict se convierten los Decimal
+- La proyección se serializa con pydantic_core.to_json (el serializador en
+  Rust de pydantic, sin validar); ya no lleva Decimal, que to_json
+  escribiría como cadena
+- respuesta_json(datos) serializa cualquier dict o lista con json.dumps;
+  Decimal sale como número
+
+Con RESPUESTAS_VALIDAR=true se usa en su lugar un TypeAdapter precompilado
+(validación completa de pydantic), útil para detectar items que ya no
+cumplen con el modelo.
+
+Este archivo es idéntico en modulo-catalogos y modulo-notas (lo verifica
+modulo-notas/tests/test_compartidos.py).
+"""
+import os
+import json
+from decimal import Decimal
+from typing import List, Optional, Type, Union, get_args, get_origin
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+# Configuración de ambiente
+RESPUESTAS_VALIDAR = os.getenv("RESPUESTAS_VALIDAR", "false").lower() == "true"
+
+def _numero(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+def a_json(datos) -> bytes:
+    return json.dumps(datos, default=_numero, ensure_ascii=False, separators=(",", ":")).encode()
+
+def respuesta_json(datos, status_code: int = 200, headers: dict = None) -> Response:
+    """Response JSON a partir de datos ya confiables (sin pydantic)"""
+    return Response(a_json(datos), status_code=status_code, headers=headers, media_type="application/json")
+
+def _sin_decimales(valor):
+    if isinstance(valor, Decimal):
+        return _numero(valor)
+    if isinstance(valor, dict):
+        return {k: _sin_decimales(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_sin_decimales(v) for v in valor]
+    return valor
+
+def _sin_optional(anotacion):
+    if get_origin(anotacion) is Union:
+        argumentos = [a for a in get_args(anotacion) if a is not type(None)]
+        if len(argumentos) == 1:
+            return argumentos[0]
+    return anotacion
+
+def _modelo_anidado(anotacion):
+    """(modelo, es_lista) si la anotación es un modelo, una lista de modelos
+    o alguno de ellos Optional"""
+    anotacion = _sin_optional(anotacion)
+    es_lista = get_origin(anotacion) in (list, List)
+    if es_lista:
+        anotacion = get_args(anotacion)[0] if get_args(anotacion) else None
+    if isinstance(anotacion, type) and issubclass(anotacion, BaseModel):
+        return anotacion, es_lista
+    return None
+
+class Serializador:
+    """Proyección precompilada de items confiables a un modelo de respuesta"""
+
+    def __init__(self, modelo: Type[BaseModel]):
+        self.modelo = modelo
+        self.campos = tuple(
+            (nombre, None if campo.is_required() else campo.get_default(call_default_factory=True))
+            for nombre, campo in modelo.model_fields.items()
+        )
+        self._numericos = tuple(
+            (nombre, _sin_optional(campo.annotation)) for nombre, campo in modelo.model_fields.items()
+            if _sin_optional(campo.annotation) in (int, float)
+        )
+        self._dicts = tuple(
+            nombre for nombre, campo in modelo.model_fields.items()
+            if _sin_optional(campo.annotation) is dict or get_origin(_sin_optional(campo.annotation)) is dict
+        )
+        self._anidados = {}
+        for nombre, campo in modelo.model_fields.items():
+            anidado = _modelo_anidado(campo.annotation)
+            if anidado:
+                self._anidados[nombre] = (Serializador(anidado[0]), anidado[1])
+        self._uno = TypeAdapter(modelo)
+        self._lista = TypeAdapter(List[modelo])
+
+    def proyectar(self, item: dict) -> dict:
+        proyectado = {nombre: item.get(nombre, default) for nombre, default in self.campos}
+        for nombre, tipo in self._numericos:
+            valor = proyectado[nombre]
+            if valor is not None:
+                proyectado[nombre] = tipo(valor)
+        for nombre in self._dicts:
+            proyectado[nombre] = _sin_decimales(proyectado[nombre])
+        for nombre, (serializador, es_lista) in self._anidados.items():
+            valor = proyectado[nombre]
+            if valor is None:
+                continue
+            if es_lista:
+                proyectado[nombre] = [serializador.proyectar(v) for v in valor]
+            else:
+                proyectado[nombre] = serializador.proyectar(valor)
+        return proyectado
+
+    def uno(self, item: dict, headers: dict = None, status_code: int = 200) -> Response:
+        if RESPUESTAS_VALIDAR:
+            cuerpo = self._uno.dump_json(self._uno.validate_python(item))
+            return Response(cuerpo, status_code=status_code, headers=headers, media_type="application/json")
+        return Response(to_json(self.proyectar(item)), status_code=status_code, headers=headers,
+                        media_type="application/json")
+
+    def lista_json(self, items: List[dict]) -> bytes:
+        if RESPUESTAS_VALIDAR:
+            return self._lista.dump_json(self._lista.validate_python(items))
+        proyectar = self.proyectar
+        return to_json([proyectar(item) for item in items])
+
+    def lista(self, items: List[dict], headers: Optional[dict] = None) -> Response:
+        return Response(self.lista_json(items), headers=headers, media_type="application/json")
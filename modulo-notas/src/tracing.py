@@ -0,0 +1,343 @@
+"""
+Trazas ligeras por request: spans para llamadas AWS y generación de PDF
+
+Cada request (o invocación de Lambda) abre una traza; las llamadas de los
+clientes boto3 se registran solas mediante los eventos de botocore y el
+código puede abrir spans propios con `span("pdf.render")`. Al cerrar la traza
+se produce:
+- el header Server-Timing con el desglose por segmento (APIs FastAPI)
+- una línea de log estructurado en formato EMF de CloudWatch, que genera una
+  métrica por segmento sin llamadas extra a PutMetricData
+- opcionalmente, los spans en formato OTLP/JSON (TRACING_EXPORT=otlp)
+
+Con TRACING_ENABLED=false no se registran hooks y `span()` regresa un
+context manager vacío.
+
+Este archivo es idéntico en modulo-catalogos, modulo-notas y
+modulo-notificaciones (lo verifica modulo-notas/tests/test_compartidos.py).
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from functools import wraps
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# Configuración de ambiente
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACING_LOG = os.getenv("TRACING_LOG", "true").lower() == "true"
+TRACING_EXPORT = os.getenv("TRACING_EXPORT", "")
+
+_config = {"servicio": "desconocido", "namespace": "NotasVenta"}
+
+_traza_actual: ContextVar[Optional["Traza"]] = ContextVar("traza_actual", default=None)
+_span_actual: ContextVar[Optional["Span"]] = ContextVar("span_actual", default=None)
+
+def configurar(servicio: str, namespace: str):
+    """Define el servicio y el namespace de métricas del módulo"""
+    _config["servicio"] = servicio
+    _config["namespace"] = namespace
+
+# ==================== MODELO ====================
+
+class Span:
+    __slots__ = ("nombre", "span_id", "parent_id", "inicio", "fin", "atributos", "error")
+
+    def __init__(self, nombre: str, parent_id: Optional[str], atributos: dict = None):
+        self.nombre = nombre
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.inicio = time.time_ns()
+        self.fin = None
+        self.atributos = atributos or {}
+        self.error = None
+
+    @property
+    def duracion_ms(self) -> float:
+        return ((self.fin or time.time_ns()) - self.inicio) / 1e6
+
+class Traza:
+    """Spans de un request"""
+
+    def __init__(self, nombre: str):
+        self.trace_id = uuid.uuid4().hex
+        self.raiz = Span(nombre, None)
+        # Dimensión Endpoint de las métricas; debe tener pocos valores posibles
+        self.endpoint = nombre
+        self.spans = []
+        self.status = None
+        self._lock = threading.Lock()
+
+    def agregar(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def desglose(self) -> dict:
+        """Duración total y número de llamadas por nombre de segmento"""
+        resultado = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            segmento = resultado.setdefault(span.nombre, {"ms": 0.0, "n": 0})
+            segmento["ms"] += span.duracion_ms
+            segmento["n"] += 1
+        return resultado
+
+    def server_timing(self) -> str:
+        partes = [
+            f'{nombre};dur={datos["ms"]:.2f};desc="x{datos["n"]}"'
+            for nombre, datos in self.desglose().items()
+        ]
+        partes.append(f"total;dur={self.raiz.duracion_ms:.2f}")
+        return ", ".join(partes)
+
+# ==================== API ====================
+
+def traza_actual() -> Optional[Traza]:
+    return _traza_actual.get()
+
+class _SpanVacio:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+_SPAN_VACIO = _SpanVacio()
+
+class _SpanContexto:
+    __slots__ = ("traza", "span", "token")
+
+    def __init__(self, traza: Traza, nombre: str, atributos: dict):
+        padre = _span_actual.get() or traza.raiz
+        self.traza = traza
+        self.span = Span(nombre, padre.span_id, atributos)
+
+    def __enter__(self):
+        self.token = _span_actual.set(self.span)
+        return self.span
+
+    def __exit__(self, tipo, error, tb):
+        self.span.fin = time.time_ns()
+        if error is not None:
+            self.span.error = type(error).__name__
+        _span_actual.reset(self.token)
+        self.traza.agregar(self.span)
+        return False
+
+def span(nombre: str, **atributos):
+    """Context manager que mide un segmento dentro de la traza actual"""
+    traza = _traza_actual.get()
+    if traza is None:
+        return _SPAN_VACIO
+    return _SpanContexto(traza, nombre, atributos)
+
+class traza:
+    """Context manager que abre una traza y la emite al cerrarse"""
+
+    def __init__(self, nombre: str, **atributos):
+        self.nombre = nombre
+        self.atributos = atributos
+        self.traza = None
+
+    def __enter__(self) -> Optional[Traza]:
+        if not TRACING_ENABLED:
+            return None
+        self.traza = Traza(self.nombre)
+        self.traza.raiz.atributos.update(self.atributos)
+        self._token = _traza_actual.set(self.traza)
+        self._token_span = _span_actual.set(None)
+        return self.traza
+
+    def __exit__(self, tipo, error, tb):
+        if self.traza is None:
+            return False
+        self.traza.raiz.fin = time.time_ns()
+        if error is not None:
+            self.traza.raiz.error = type(error).__name__
+        _span_actual.reset(self._token_span)
+        _traza_actual.reset(self._token)
+        emitir(self.traza)
+        return False
+
+def medir(nombre: str):
+    """Decorador que registra cada llamada a la función como un span"""
+    def decorador(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(nombre):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorador
+
+def trazado(nombre: str):
+    """Decorador que abre una traza por invocación (handlers de Lambda)"""
+    def decorador(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with traza(nombre):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorador
+
+class EjecutorConTraza(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor cuyas tareas corren con una copia del contexto de
+    quien las envía, para que sus llamadas AWS queden en la traza del request
+
+    map() también pasa por submit() en el hilo que llama. Cada tarea lleva su
+    propia copia: un mismo Context no se puede usar en dos hilos a la vez.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+# ==================== INSTRUMENTACIÓN DE BOTOCORE ====================
+
+def _antes_llamada_aws(model=None, context=None, **kwargs):
+    traza = _traza_actual.get()
+    if traza is None or context is None:
+        return
+    nombre = f"{model.service_model.service_name}.{model.name}"
+    contexto = _SpanContexto(traza, nombre, {})
+    contexto.__enter__()
+    context["_span_traza"] = contexto
+
+def _despues_llamada_aws(context=None, exception=None, http_response=None, **kwargs):
+    contexto = context.pop("_span_traza", None) if context is not None else None
+    if contexto is None:
+        return
+    if http_response is not None:
+        contexto.span.atributos["http.status_code"] = http_response.status_code
+    contexto.__exit__(type(exception) if exception else None, exception, None)
+
+def instrumentar_cliente(client):
+    """Registra spans para cada llamada del cliente boto3"""
+    if not TRACING_ENABLED:
+        return client
+    eventos = client.meta.events
+    # Primero y en el nodo más específico: otros handlers de before-call
+    # (p.ej. Stubber) pueden responder y cortar la cadena
+    eventos.register_first("before-call.*.*", _antes_llamada_aws, unique_id="tracing-antes")
+    eventos.register("after-call", _despues_llamada_aws, unique_id="tracing-despues")
+    eventos.register("after-call-error", _despues_llamada_aws, unique_id="tracing-error")
+    return client
+
+# ==================== EMISIÓN ====================
+
+def _emf(traza: Traza, desglose: dict) -> dict:
+    """Documento EMF de CloudWatch con una métrica por segmento"""
+    metricas = [{"Name": "DuracionTotal", "Unit": "Milliseconds"}]
+    documento = {
+        "Service": _config["servicio"],
+        "Endpoint": traza.endpoint,
+        "path": traza.raiz.nombre,
+        "DuracionTotal": round(traza.raiz.duracion_ms, 3),
+        "trace_id": traza.trace_id,
+        "status": traza.status,
+    }
+    for nombre, datos in desglose.items():
+        metricas.append({"Name": nombre, "Unit": "Milliseconds"})
+        documento[nombre] = round(datos["ms"], 3)
+    documento["_aws"] = {
+        "Timestamp": int(time.time() * 1000),
+        "CloudWatchMetrics": [{
+            "Namespace": f'{_config["namespace"]}/Trazas',
+            "Dimensions": [["Service", "Endpoint"]],
+            "Metrics": metricas,
+        }],
+    }
+    return documento
+
+def _valor_otlp(valor) -> dict:
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+def _span_otlp(traza: Traza, span: Span) -> dict:
+    resultado = {
+        "traceId": traza.trace_id,
+        "spanId": span.span_id,
+        "name": span.nombre,
+        "kind": 2 if span.parent_id is None else 3,
+        "startTimeUnixNano": str(span.inicio),
+        "endTimeUnixNano": str(span.fin or time.time_ns()),
+        "attributes": [{"key": k, "value": _valor_otlp(v)} for k, v in span.atributos.items()],
+        "status": {"code": 2} if span.error else {},
+    }
+    if span.parent_id:
+        resultado["parentSpanId"] = span.parent_id
+    return resultado
+
+def exportar_otlp(traza: Traza) -> dict:
+    """Traza en formato OTLP/JSON (ExportTraceServiceRequest)"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": _config["servicio"]}}
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "notas-venta.tracing"},
+                "spans": [_span_otlp(traza, s) for s in [traza.raiz] + list(traza.spans)],
+            }],
+        }]
+    }
+
+def emitir(traza: Traza):
+    """Emite la traza cerrada como log EMF y, si se pidió, en OTLP/JSON"""
+    try:
+        if TRACING_LOG:
+            print(json.dumps(_emf(traza, traza.desglose())), file=sys.stdout)
+        if TRACING_EXPORT == "otlp":
+            print(json.dumps(exportar_otlp(traza)), file=sys.stdout)
+    except Exception as e:
+        print(f"Error emitiendo traza: {e}")
+
+# ==================== MIDDLEWARE ASGI ====================
+
+def _endpoint(scope) -> str:
+    """Ruta de FastAPI que atendió el request (la plantilla, sin ids)"""
+    ruta = scope.get("route")
+    if ruta is None or not hasattr(ruta, "path"):
+        return "unmatched"
+    return f'{scope["method"]} {ruta.path}'
+
+class ServerTimingMiddleware:
+    """
+    Abre una traza por request HTTP y agrega el header Server-Timing
+
+    La traza se nombra con el path real (para el log); la dimensión Endpoint
+    de EMF usa la plantilla de la ruta para no crear una métrica por id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        with traza(f'{scope["method"]} {scope["path"]}') as t:
+            async def send_con_timing(message):
+                if message["type"] == "http.response.start":
+                    t.status = message["status"]
+                    t.endpoint = _endpoint(scope)
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", t.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_con_timing)
+            finally:
+                t.endpoint = _endpoint(scope)
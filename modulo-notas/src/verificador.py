@@ -0,0 +1,283 @@
+"""
+Verificador de consistencia entre tablas y PDFs (job offline)
+
+Las escrituras de crear_nota_venta y de la eliminación de clientes no son
+atómicas; con el tiempo quedan:
+- contenido cuya nota ya no existe
+- domicilios cuyo cliente ya no existe
+- notas sin su PDF en S3
+
+El verificador recorre las tablas con scans paralelos por segmento
+(Segment/TotalSegments) y solo guarda lo indispensable:
+- Los ids de las tablas padre (notas, clientes) como hashes de 64 bits en
+  arreglos ordenados repartidos en cubetas, 8 bytes por id (ver ConjuntoIds)
+- Los hijos sin padre, que normalmente son pocos; antes de reportarlos se
+  confirman con BatchGetItem, así un padre creado después del scan o una
+  colisión de hash nunca generan un borrado
+- Para los PDFs, una línea (rfc, folio, nota) por nota en archivos
+  temporales particionados por RFC; cada partición se revisa con
+  list_objects_v2 por prefijo de RFC en lugar de un HeadObject por nota
+
+El resultado es un plan de reparación en JSON Lines, una acción por línea:
+
+    {"accion": "eliminar", "entidad": "contenido", "id": ..., "referencia": ...}
+    {"accion": "eliminar", "entidad": "domicilios", "id": ..., "referencia": ...}
+    {"accion": "regenerar_pdf", "entidad": "notas", "id": ..., "clave": ...}
+    {"accion": "revisar", "entidad": "notas", "id": ..., "motivo": ...}
+
+El plan no se aplica solo: se revisa y después se aplica con --aplicar.
+
+Uso:
+    python verificador.py --plan plan.jsonl
+    python verificador.py --plan plan.jsonl --segmentos 16 --sin-pdfs
+    python verificador.py --aplicar plan.jsonl
+"""
+import os
+import json
+import hashlib
+import argparse
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List
+
+import app
+import pdfs
+
+# Configuración de ambiente
+VERIFICADOR_SEGMENTOS = int(os.getenv("VERIFICADOR_SEGMENTOS", "8"))
+VERIFICADOR_PARTICIONES = int(os.getenv("VERIFICADOR_PARTICIONES", "64"))
+VERIFICADOR_HILOS_S3 = int(os.getenv("VERIFICADOR_HILOS_S3", "16"))
+VERIFICADOR_LOTE = int(os.getenv("VERIFICADOR_LOTE", "100"))
+
+CAMPOS_NOTA = ("id", "folio", "cliente_id", "cliente_info")
+
+def _hash(item_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(item_id.encode(), digest_size=8).digest(), "little")
+
+class ConjuntoIds:
+    """
+    Conjunto de ids en 8 bytes por id
+
+    Cada id se guarda como su hash de 64 bits en una de 256 cubetas (por el
+    byte bajo del hash). Al cerrar, cada cubeta se ordena por separado y la
+    pertenencia es una búsqueda binaria; ordenar por cubeta evita tener la
+    lista completa de ints en memoria. Una colisión de hash solo puede hacer
+    que un id ausente parezca presente.
+    """
+
+    CUBETAS = 256
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cubetas = [array("Q") for _ in range(self.CUBETAS)]
+        self._n = 0
+
+    def agregar(self, ids: List[str]):
+        hashes = [_hash(item_id) for item_id in ids]
+        with self._lock:
+            for h in hashes:
+                self._cubetas[h & 0xFF].append(h)
+            self._n += len(hashes)
+
+    def cerrar(self):
+        for i, cubeta in enumerate(self._cubetas):
+            self._cubetas[i] = array("Q", sorted(cubeta))
+
+    def __len__(self):
+        return self._n
+
+    def __contains__(self, item_id: str) -> bool:
+        h = _hash(item_id)
+        cubeta = self._cubetas[h & 0xFF]
+        posicion = bisect_left(cubeta, h)
+        return posicion < len(cubeta) and cubeta[posicion] == h
+
+def escanear(repo, campos: tuple, procesar: Callable[[List[dict]], None], segmentos: int = VERIFICADOR_SEGMENTOS):
+    """Scan paralelo: cada segmento en un hilo, procesar(página) por página"""
+    def segmento(numero: int):
+        for pagina in repo.recorrer(campos, numero, segmentos):
+            procesar(pagina)
+
+    with ThreadPoolExecutor(max_workers=segmentos, thread_name_prefix="verificador") as executor:
+        # list() para propagar la excepción de cualquier segmento
+        list(executor.map(segmento, range(segmentos)))
+
+def ids_de(repo, segmentos: int = VERIFICADOR_SEGMENTOS) -> ConjuntoIds:
+    ids = ConjuntoIds()
+    escanear(repo, ("id",), lambda pagina: ids.agregar([item["id"] for item in pagina]), segmentos)
+    ids.cerrar()
+    return ids
+
+def huerfanos(repo_hijos, campo_padre: str, padres: ConjuntoIds, repo_padres,
+              segmentos: int = VERIFICADOR_SEGMENTOS) -> List[dict]:
+    """Hijos cuyo padre no existe, confirmados contra la tabla padre"""
+    lock = threading.Lock()
+    candidatos = []
+
+    def procesar(pagina):
+        sin_padre = [item for item in pagina if item[campo_padre] not in padres]
+        if sin_padre:
+            with lock:
+                candidatos.extend(sin_padre)
+
+    escanear(repo_hijos, ("id", campo_padre), procesar, segmentos)
+    existentes = repo_padres.obtener_lote(list({item[campo_padre] for item in candidatos}))
+    return [item for item in candidatos if item[campo_padre] not in existentes]
+
+# ==================== PDFS ====================
+
+class Particiones:
+    """Líneas (rfc, folio, nota) en archivos temporales particionados por RFC"""
+
+    def __init__(self, directorio: str, n: int = VERIFICADOR_PARTICIONES):
+        self._lock = threading.Lock()
+        self.rutas = [os.path.join(directorio, f"notas-{i:04d}.tsv") for i in range(n)]
+        self._archivos = [open(ruta, "w") for ruta in self.rutas]
+
+    def agregar(self, filas: List[tuple]):
+        por_particion = defaultdict(list)
+        for rfc, folio, nota_id in filas:
+            por_particion[_hash(rfc) % len(self.rutas)].append(f"{rfc}\t{folio}\t{nota_id}\n")
+        with self._lock:
+            for i, lineas in por_particion.items():
+                self._archivos[i].writelines(lineas)
+
+    def cerrar(self):
+        for archivo in self._archivos:
+            archivo.close()
+
+    def leer(self) -> Iterator[Dict[str, List[tuple]]]:
+        """Por partición, {rfc: [(folio, nota_id)]}"""
+        for ruta in self.rutas:
+            por_rfc = defaultdict(list)
+            with open(ruta) as f:
+                for linea in f:
+                    rfc, folio, nota_id = linea.rstrip("\n").split("\t")
+                    por_rfc[rfc].append((folio, nota_id))
+            yield por_rfc
+
+def claves_s3(s3, bucket: str, prefijo: str) -> set:
+    """Todas las llaves bajo un prefijo (list_objects_v2 de 1000 en 1000)"""
+    claves = set()
+    kwargs = {"Bucket": bucket, "Prefix": prefijo}
+    while True:
+        response = s3.list_objects_v2(**kwargs)
+        claves.update(objeto["Key"] for objeto in response.get("Contents", []))
+        if not response.get("IsTruncated"):
+            return claves
+        kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+def notas_sin_pdf(repos, s3, bucket: str, directorio: str, segmentos: int = VERIFICADOR_SEGMENTOS,
+                  hilos: int = VERIFICADOR_HILOS_S3) -> Iterator[dict]:
+    """Acciones regenerar_pdf (y revisar, si no hay RFC) de las notas sin PDF"""
+    particiones = Particiones(directorio)
+    sin_cliente = []
+    lock = threading.Lock()
+
+    def procesar(pagina):
+        # Notas anteriores al snapshot: el RFC sale del catálogo actual
+        cliente_ids = [n["cliente_id"] for n in pagina if not (n.get("cliente_info") or {}).get("rfc")]
+        clientes = repos.clientes.obtener_lote(cliente_ids) if cliente_ids else {}
+        filas = []
+        for nota in pagina:
+            rfc = (nota.get("cliente_info") or {}).get("rfc") or clientes.get(nota["cliente_id"], {}).get("rfc")
+            if rfc:
+                filas.append((rfc, nota["folio"], nota["id"]))
+            else:
+                with lock:
+                    sin_cliente.append(nota["id"])
+        particiones.agregar(filas)
+
+    try:
+        escanear(repos.notas, CAMPOS_NOTA, procesar, segmentos)
+    finally:
+        particiones.cerrar()
+
+    for nota_id in sin_cliente:
+        yield {"accion": "revisar", "entidad": "notas", "id": nota_id, "motivo": "cliente inexistente"}
+
+    def revisar_rfc(rfc_y_notas):
+        rfc, notas = rfc_y_notas
+        existentes = claves_s3(s3, bucket, f"{rfc}/")
+        return [(nota_id, clave) for folio, nota_id in notas
+                if (clave := pdfs.clave_nota(rfc, folio)) not in existentes]
+
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="verificador-s3") as executor:
+        for por_rfc in particiones.leer():
+            for faltantes in executor.map(revisar_rfc, por_rfc.items()):
+                for nota_id, clave in faltantes:
+                    yield {"accion": "regenerar_pdf", "entidad": "notas", "id": nota_id, "clave": clave}
+
+# ==================== PLAN ====================
+
+def verificar(repos, s3=None, bucket: str = None, segmentos: int = VERIFICADOR_SEGMENTOS) -> Iterator[dict]:
+    """Acciones del plan de reparación; sin s3 no se revisan los PDFs"""
+    notas = ids_de(repos.notas, segmentos)
+    for item in huerfanos(repos.contenido, "nota_id", notas, repos.notas, segmentos):
+        yield {"accion": "eliminar", "entidad": "contenido", "id": item["id"], "referencia": item["nota_id"]}
+    del notas
+
+    clientes = ids_de(repos.clientes, segmentos)
+    for item in huerfanos(repos.domicilios, "cliente_id", clientes, repos.clientes, segmentos):
+        yield {"accion": "eliminar", "entidad": "domicilios", "id": item["id"], "referencia": item["cliente_id"]}
+    del clientes
+
+    if s3 is not None:
+        with tempfile.TemporaryDirectory(prefix="verificador-") as directorio:
+            yield from notas_sin_pdf(repos, s3, bucket, directorio, segmentos)
+
+def escribir_plan(acciones: Iterator[dict], ruta: str) -> Counter:
+    """Escribe el plan en JSON Lines; regresa el conteo por acción y entidad"""
+    conteo = Counter()
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w") as f:
+        for accion in acciones:
+            f.write(json.dumps(accion, ensure_ascii=False) + "\n")
+            conteo[f"{accion['accion']}:{accion['entidad']}"] += 1
+    os.replace(temporal, ruta)
+    return conteo
+
+def aplicar(ruta: str, repos, lote: int = VERIFICADOR_LOTE) -> Counter:
+    """Borra los huérfanos y regenera los PDFs del plan; las acciones
+    revisar solo se cuentan"""
+    por_accion = defaultdict(list)
+    with open(ruta) as f:
+        for linea in f:
+            if linea.strip():
+                accion = json.loads(linea)
+                por_accion[(accion["accion"], accion["entidad"])].append(accion["id"])
+
+    conteo = Counter()
+    for (accion, entidad), ids in por_accion.items():
+        for inicio in range(0, len(ids), lote):
+            bloque = ids[inicio:inicio + lote]
+            if accion == "eliminar":
+                getattr(repos, entidad).eliminar_lote(bloque)
+            elif accion == "regenerar_pdf":
+                app.regenerar_pdfs(bloque)
+        conteo[f"{accion}:{entidad}"] += len(ids)
+    return conteo
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    modo = parser.add_mutually_exclusive_group(required=True)
+    modo.add_argument("--plan", help="Ruta donde escribir el plan de reparación (JSON Lines)")
+    modo.add_argument("--aplicar", help="Plan a aplicar")
+    parser.add_argument("--segmentos", type=int, default=VERIFICADOR_SEGMENTOS)
+    parser.add_argument("--sin-pdfs", action="store_true", help="No revisar los PDFs en S3")
+    args = parser.parse_args()
+
+    repos = app.get_repositorios()
+    if args.aplicar:
+        print(f"Aplicado: {dict(aplicar(args.aplicar, repos))}")
+        return
+    s3 = None if args.sin_pdfs else app.get_s3_client()
+    conteo = escribir_plan(verificar(repos, s3, app.S3_BUCKET, args.segmentos), args.plan)
+    print(f"Plan en {args.plan}: {dict(conteo) or 'sin inconsistencias'}")
+
+if __name__ == "__main__":
+    main()
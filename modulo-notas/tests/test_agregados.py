@@ -0,0 +1,79 @@
+"""
+Tests para los agregados de ventas
+"""
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import agregados
+from repositorios import RepositorioMemoria, RepositorioDynamo
+
+NOTA = {"id": "nota-1", "cliente_id": "cli-1", "created_at": "2026-10-19T15:30:00"}
+CONTENIDO = [
+    {"producto_id": "prod-1", "cantidad": 2, "importe": Decimal("20.50")},
+    {"producto_id": "prod-2", "cantidad": 1, "importe": Decimal("5.25")},
+    {"producto_id": "prod-1", "cantidad": 3, "importe": Decimal("30.75")},
+]
+
+
+class TestIncrementos:
+    """Tests para el cálculo de contadores por nota"""
+
+    def test_claves_y_contadores(self):
+        resultado = agregados.incrementos(NOTA, CONTENIDO)
+
+        assert resultado["DIA#2026-10-19"] == {
+            "notas": 1, "lineas": 3, "unidades": 6, "importe": Decimal("56.50")
+        }
+        assert resultado["CLIENTE#cli-1"] == resultado["DIA#2026-10-19"]
+        # Líneas repetidas del mismo producto cuentan una sola nota
+        assert resultado["PRODUCTO#prod-1"] == {
+            "notas": 1, "lineas": 2, "unidades": 5, "importe": Decimal("51.25")
+        }
+
+
+class TestRegistrarNota:
+    """Tests para la actualización de agregados"""
+
+    def test_acumula_notas(self):
+        repo = RepositorioMemoria()
+        agregados.registrar_nota(repo, NOTA, CONTENIDO)
+        agregados.registrar_nota(repo, {**NOTA, "id": "nota-2"}, CONTENIDO[:1])
+
+        dia = agregados.leer(repo, agregados.clave_dia("2026-10-19"))
+        assert (dia["notas"], dia["unidades"], dia["importe"]) == (2, 8, Decimal("77.00"))
+        assert agregados.leer(repo, agregados.clave_producto("prod-2"))["notas"] == 1
+        assert agregados.leer(repo, agregados.clave_cliente("otro"))["notas"] == 0
+
+    def test_lote_un_incremento_por_clave(self):
+        repo = RepositorioMemoria()
+        lote = [(NOTA, CONTENIDO), ({**NOTA, "id": "nota-2", "created_at": "2026-10-19T16:00:00"}, CONTENIDO[:1])]
+        with patch.object(repo, 'incrementar', wraps=repo.incrementar) as incrementar:
+            assert agregados.registrar_notas(repo, lote) == 0
+        # DIA, CLIENTE, prod-1 y prod-2
+        assert incrementar.call_count == 4
+
+        dia = agregados.leer(repo, agregados.clave_dia("2026-10-19"))
+        assert (dia["notas"], dia["unidades"], dia["importe"]) == (2, 8, Decimal("77.00"))
+        assert dia["actualizado_at"] == "2026-10-19T16:00:00"
+
+    def test_fallas_se_cuentan_sin_propagar(self):
+        repo = MagicMock()
+        repo.incrementar.side_effect = [None, Exception("throttled"), None, None]
+        assert agregados.registrar_nota(repo, NOTA, CONTENIDO) == 1
+
+    def test_update_expression_dynamo(self):
+        table = MagicMock()
+        repo = RepositorioDynamo("agregados", lambda nombre: table)
+
+        repo.incrementar("DIA#2026-10-19", {"notas": 1, "importe": Decimal("5.25")},
+                         {"actualizado_at": "2026-10-19T15:30:00"})
+
+        kwargs = table.update_item.call_args.kwargs
+        assert kwargs["UpdateExpression"] == "ADD #a0 :a0, #a1 :a1 SET #s0 = :s0"
+        assert kwargs["ExpressionAttributeValues"][":a1"] == Decimal("5.25")
@@ -5,14 +5,20 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
 import sys
+import time
+from datetime import datetime
 import os
 
 # Agregar el path del src
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-# Mock de boto3 antes de importar la app
-with patch('boto3.resource'), patch('boto3.client'):
-    from app import app, generar_folio
+# Mock de boto3 antes de importar la app; los clientes AWS se crean de
+# forma perezosa, por lo que el mock se mantiene durante toda la sesión
+patch('boto3.session.Session').start()
+from app import app, generar_folio
+import app as app_module
+import aws_clients
+import repositorios
 
 client = TestClient(app)
 
@@ -28,16 +34,73 @@ class TestHealthCheck:
         assert data["service"] == "notas-venta"
 
 
+class TestInicializacionPerezosa:
+    """Tests para la inicialización diferida de dependencias"""
+    
+    def test_health_no_carga_reportlab(self):
+        import subprocess
+        codigo = (
+            "import sys; sys.path.insert(0, 'src');"
+            "from fastapi.testclient import TestClient;"
+            "import app;"
+            "TestClient(app.app).get('/health');"
+            "assert not [m for m in sys.modules if m.startswith('reportlab')];"
+            "assert not app.aws_clients._clients and not app.aws_clients._resources"
+        )
+        resultado = subprocess.run(
+            [sys.executable, "-c", codigo],
+            cwd=os.path.join(os.path.dirname(__file__), '..'),
+            capture_output=True
+        )
+        assert resultado.returncode == 0, resultado.stderr.decode()
+    
+    def test_lifespan_precalienta_worker(self):
+        import subprocess
+        codigo = (
+            "import sys; sys.path.insert(0, 'src');"
+            "from fastapi.testclient import TestClient;"
+            "import app;"
+            "cliente = TestClient(app.app); cliente.__enter__();"
+            "assert 'reportlab.platypus' in sys.modules;"
+            "assert {'s3', 'sns', 'cloudwatch'} <= set(app.aws_clients._clients);"
+            "assert set(app._tablas) == set(app.ESQUEMAS_POR_TABLA);"
+            # Un pool de procesos por worker para /notas/bulk, cerrado al salir
+            "assert app._pool_pdfs is not None;"
+            "cliente.__exit__(None, None, None);"
+            "assert app._pool_pdfs is None"
+        )
+        resultado = subprocess.run(
+            [sys.executable, "-c", codigo],
+            cwd=os.path.join(os.path.dirname(__file__), '..'),
+            env={**os.environ, "AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test"},
+            capture_output=True
+        )
+        assert resultado.returncode == 0, resultado.stderr.decode()
+    
+    def test_clientes_memorizados(self):
+        cliente = aws_clients.get_client('s3')
+        assert aws_clients.get_client('s3') is cliente
+
+
 class TestFolio:
     """Tests para generación de folios"""
     
+    def setup_method(self):
+        import folios
+        folios.reiniciar()
+        self.repos = repositorios.crear_repositorios("memory", dict.fromkeys(repositorios.ENTIDADES))
+        self.patcher = patch('app.get_repositorios', return_value=self.repos)
+        self.patcher.start()
+    
+    def teardown_method(self):
+        self.patcher.stop()
+    
     def test_generar_folio_formato(self):
         folio = generar_folio()
-        assert folio.startswith("NV-")
-        parts = folio.split("-")
-        assert len(parts) == 3
-        assert len(parts[1]) == 14  # Timestamp
-        assert len(parts[2]) == 4   # Random suffix
+        assert folio == "NV-0000000001"
+        assert generar_folio() == "NV-0000000002"
+        # Un solo ADD para todo el bloque
+        assert self.repos.folios.obtener("FOLIO#NV")["ultimo"] == 50
 
 
 class TestNotasVenta:
@@ -135,3 +198,494 @@ class TestDescargarPDF:
         
         response = client.get("/notas/nota-no-existe/pdf")
         assert response.status_code == 404
+
+
+class TestBackendMemoria:
+    """Tests de flujo completo con el backend de repositorios en memoria"""
+    
+    def setup_method(self):
+        self.repos = repositorios.crear_repositorios(
+            "memory", dict.fromkeys(repositorios.ENTIDADES)
+        )
+        self.repos.clientes.cargar([{
+            "id": "cliente-1",
+            "razon_social": "Test SA",
+            "nombre_comercial": "Test",
+            "rfc": "TEST123456ABC",
+            "correo_electronico": "test@test.com",
+            "telefono": "5551234567"
+        }])
+        self.repos.domicilios.cargar([{
+            "id": "dom-1",
+            "cliente_id": "cliente-1",
+            "domicilio": "Calle Test 123",
+            "colonia": "Centro",
+            "municipio": "Guadalajara",
+            "estado": "Jalisco",
+            "tipo_direccion": "FACTURACION"
+        }])
+        self.repos.productos.cargar([{
+            "id": "prod-1",
+            "nombre": "Producto Test",
+            "unidad_medida": "PZA",
+            "precio_base": 100.0
+        }])
+        self.patcher = patch('app.get_repositorios', return_value=self.repos)
+        self.patcher.start()
+    
+    def teardown_method(self):
+        self.patcher.stop()
+    
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_crear_y_obtener_nota(self, mock_sns, mock_s3):
+        response = client.post("/notas", json={
+            "cliente_id": "cliente-1",
+            "direccion_facturacion_id": "dom-1",
+            "direccion_envio_id": "dom-1",
+            "contenido": [
+                {"producto_id": "prod-1", "cantidad": 3, "precio_unitario": 100.0}
+            ]
+        })
+        assert response.status_code == 201
+        assert "pdf.render;dur=" in response.headers["server-timing"]
+        nota_id = response.json()["id"]
+        
+        nota = client.get(f"/notas/{nota_id}").json()
+        assert nota["total"] == 300.0
+        assert nota["cliente_info"]["rfc"] == "TEST123456ABC"
+        assert [c["producto_nombre"] for c in nota["contenido"]] == ["Producto Test"]
+        assert len(client.get("/notas").json()) == 1
+    
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_idempotency_key_no_repite_trabajo(self, mock_sns, mock_s3):
+        nota = {
+            "cliente_id": "cliente-1",
+            "direccion_facturacion_id": "dom-1",
+            "direccion_envio_id": "dom-1",
+            "contenido": [
+                {"producto_id": "prod-1", "cantidad": 2, "precio_unitario": 100.0}
+            ]
+        }
+        headers = {"Idempotency-Key": "reintento-1"}
+        
+        primera = client.post("/notas", json=nota, headers=headers)
+        segunda = client.post("/notas", json=nota, headers=headers)
+        
+        assert primera.status_code == segunda.status_code == 201
+        assert segunda.json() == primera.json()
+        assert segunda.headers["idempotent-replayed"] == "true"
+        assert len(self.repos.notas.listar()) == 1
+        mock_s3.assert_called_once()
+        mock_sns.assert_called_once()
+    
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_idempotency_key_sin_respuesta_guardada_no_repite(self, mock_sns, mock_s3):
+        nota = {
+            "cliente_id": "cliente-1",
+            "direccion_facturacion_id": "dom-1",
+            "direccion_envio_id": "dom-1",
+            "contenido": [
+                {"producto_id": "prod-1", "cantidad": 2, "precio_unitario": 100.0}
+            ]
+        }
+        headers = {"Idempotency-Key": "sin-respuesta"}
+        with patch.object(self.repos.idempotencia, 'guardar', side_effect=Exception("throttled")):
+            assert client.post("/notas", json=nota, headers=headers).status_code == 201
+        
+        # Aun con el plazo de EN_CURSO vencido la llave ya no se ejecuta
+        with patch('idempotencia.time.time', return_value=time.time() + 3600):
+            response = client.post("/notas", json=nota, headers=headers)
+        assert response.status_code == 409
+        assert "retry-after" not in response.headers
+        assert len(self.repos.notas.listar()) == 1
+        mock_sns.assert_called_once()
+    
+    def test_idempotency_key_renueva_plazo_de_solicitud_larga(self):
+        import idempotencia
+        from fastapi import HTTPException
+        repo = self.repos.idempotencia
+        reloj = [time.time()]
+        
+        def larga():
+            # La solicitud sigue viva más allá del plazo inicial
+            reloj[0] += 2 * idempotencia.IDEMPOTENCIA_EN_CURSO_SEGUNDOS
+            limite = time.monotonic() + 5
+            while repo.obtener("notas#larga")["expira_en"] <= reloj[0] and time.monotonic() < limite:
+                time.sleep(0.01)
+            # Un reintento no la retoma
+            with pytest.raises(HTTPException) as error:
+                idempotencia.ejecutar(repo, "notas#larga", "h", lambda: pytest.fail("se repitió"))
+            assert error.value.status_code == 409
+            return {"ok": True}
+        
+        with patch('idempotencia.time.time', side_effect=lambda: reloj[0]), \
+             patch('idempotencia.IDEMPOTENCIA_RENOVAR_SEGUNDOS', 0.01):
+            assert idempotencia.ejecutar(repo, "notas#larga", "h", larga) == {"ok": True}
+        assert repo.obtener("notas#larga")["estado"] == idempotencia.COMPLETADO
+    
+    def test_idempotency_key_en_curso_y_payload_distinto(self):
+        import idempotencia
+        nota = {
+            "cliente_id": "cliente-1",
+            "direccion_facturacion_id": "dom-1",
+            "direccion_envio_id": "dom-1",
+            "contenido": [
+                {"producto_id": "prod-1", "cantidad": 1, "precio_unitario": 100.0}
+            ]
+        }
+        # Simula una primera solicitud aún en proceso en otro contenedor
+        self.repos.idempotencia.guardar({
+            "id": "notas#en-curso",
+            "estado": idempotencia.EN_CURSO,
+            "huella": idempotencia.huella({"nota_data": app_module.NotaVentaCreate(**nota)}),
+            "expira_en": 2**40,
+        })
+        
+        response = client.post("/notas", json=nota, headers={"Idempotency-Key": "en-curso"})
+        assert response.status_code == 409
+        assert response.headers["retry-after"] == "1"
+        
+        otra = {**nota, "contenido": [{"producto_id": "prod-1", "cantidad": 5, "precio_unitario": 100.0}]}
+        response = client.post("/notas", json=otra, headers={"Idempotency-Key": "en-curso"})
+        assert response.status_code == 422
+    
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_regenerar_pdf_sin_cambios_no_renderiza(self, mock_sns, mock_s3):
+        nota_id = client.post("/notas", json={
+            "cliente_id": "cliente-1",
+            "direccion_facturacion_id": "dom-1",
+            "direccion_envio_id": "dom-1",
+            "contenido": [
+                {"producto_id": "prod-1", "cantidad": 2, "precio_unitario": 100.0}
+            ]
+        }).json()["id"]
+        pdf_hash = mock_s3.call_args.args[3]
+        
+        s3 = MagicMock()
+        s3.head_object.return_value = {"Metadata": {"pdf-hash": pdf_hash}}
+        with patch('app.get_s3_client', return_value=s3), patch('app.generar_pdf_nota') as mock_render:
+            response = client.post(f"/notas/{nota_id}/pdf:regenerate")
+            mock_render.assert_not_called()
+        assert response.status_code == 200
+        assert response.json() == {"nota_id": nota_id, "estado": "sin_cambios", "pdf_hash": pdf_hash}
+        s3.copy_object.assert_not_called()
+        
+        assert client.post("/notas/no-existe/pdf:regenerate").status_code == 404
+    
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_nota_servida_desde_snapshot(self, mock_sns, mock_s3):
+        nota_id = client.post("/notas", json={
+            "cliente_id": "cliente-1",
+            "direccion_facturacion_id": "dom-1",
+            "direccion_envio_id": "dom-1",
+            "contenido": [
+                {"producto_id": "prod-1", "cantidad": 1, "precio_unitario": 100.0}
+            ]
+        }).json()["id"]
+        
+        # Cambios posteriores en el catálogo no alteran la nota
+        self.repos.clientes.actualizar("cliente-1", {"razon_social": "Nueva Razón SA"})
+        self.repos.productos.actualizar("prod-1", {"nombre": "Producto Renombrado"})
+        
+        with patch.object(self.repos.clientes, 'obtener') as mock_cliente, \
+             patch.object(self.repos.contenido, 'buscar') as mock_contenido:
+            nota = client.get(f"/notas/{nota_id}").json()
+            mock_cliente.assert_not_called()
+            mock_contenido.assert_not_called()
+        
+        assert nota["cliente_info"]["razon_social"] == "Test SA"
+        assert nota["direccion_envio_info"]["domicilio"] == "Calle Test 123"
+        assert nota["contenido"][0]["producto_nombre"] == "Producto Test"
+        
+        live = client.get(f"/notas/{nota_id}", params={"expand": "live"}).json()
+        assert live["cliente_info"]["razon_social"] == "Nueva Razón SA"
+        assert live["contenido"][0]["producto_nombre"] == "Producto Renombrado"
+        
+        assert client.get(f"/notas/{nota_id}", params={"expand": "todo"}).status_code == 422
+        assert "contenido" not in client.get("/notas").json()[0]
+    
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_reenviar_usa_rfc_del_snapshot(self, mock_sns, mock_s3):
+        nota_id = client.post("/notas", json={
+            "cliente_id": "cliente-1",
+            "direccion_facturacion_id": "dom-1",
+            "direccion_envio_id": "dom-1",
+            "contenido": [
+                {"producto_id": "prod-1", "cantidad": 1, "precio_unitario": 100.0}
+            ]
+        }).json()["id"]
+        self.repos.clientes.actualizar("cliente-1", {"rfc": "NUEVO123456AB"})
+        
+        with patch('app.actualizar_metadatos_s3') as mock_metadatos:
+            assert client.post(f"/notas/{nota_id}/reenviar").status_code == 200
+        assert mock_metadatos.call_args.args[0] == "TEST123456ABC"
+        assert mock_sns.call_args.args[0]["rfc"] == "TEST123456ABC"
+    
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_importes_con_descuento_e_iva(self, mock_sns, mock_s3):
+        from decimal import Decimal
+        with patch('importes.TASA_IVA', Decimal("0.16")):
+            nota = client.post("/notas", json={
+                "cliente_id": "cliente-1",
+                "direccion_facturacion_id": "dom-1",
+                "direccion_envio_id": "dom-1",
+                "contenido": [
+                    {"producto_id": "prod-1", "cantidad": 3, "precio_unitario": 0.1},
+                    {"producto_id": "prod-1", "cantidad": 1, "precio_unitario": 100.0, "descuento_porcentaje": 15}
+                ]
+            }).json()
+        
+        assert [c["importe"] for c in nota["contenido"]] == [0.3, 85.0]
+        assert (nota["subtotal"], nota["descuento"], nota["impuestos"], nota["total"]) == (85.3, 15.0, 13.65, 98.95)
+        guardada = self.repos.notas.obtener(nota["id"])
+        assert guardada["total"] == Decimal("98.95")
+    
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_agregados_de_ventas(self, mock_sns, mock_s3):
+        for cantidad in (2, 3):
+            client.post("/notas", json={
+                "cliente_id": "cliente-1",
+                "direccion_facturacion_id": "dom-1",
+                "direccion_envio_id": "dom-1",
+                "contenido": [
+                    {"producto_id": "prod-1", "cantidad": cantidad, "precio_unitario": 10.0}
+                ]
+            })
+        
+        cliente = client.get("/notas/agregados/clientes/cliente-1").json()
+        assert (cliente["notas"], cliente["unidades"], cliente["importe"]) == (2, 5, 50.0)
+        assert client.get("/notas/agregados/productos/prod-1").json()["lineas"] == 2
+        
+        hoy = datetime.utcnow().strftime("%Y-%m-%d")
+        assert client.get(f"/notas/agregados/dias/{hoy}").json()["notas"] == 2
+        assert client.get("/notas/agregados/dias/2000-01-01").json()["notas"] == 0
+        assert client.get("/notas/agregados/dias/ayer").status_code == 422
+    
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_nota_sin_contenido_embebido(self, mock_sns, mock_s3):
+        with patch('app.NOTA_CONTENIDO_EMBEBIDO_MAX_BYTES', 10):
+            nota_id = client.post("/notas", json={
+                "cliente_id": "cliente-1",
+                "direccion_facturacion_id": "dom-1",
+                "direccion_envio_id": "dom-1",
+                "contenido": [
+                    {"producto_id": "prod-1", "cantidad": 2, "precio_unitario": 50.0}
+                ]
+            }).json()["id"]
+        
+        assert "contenido" not in self.repos.notas.obtener(nota_id)
+        nota = client.get(f"/notas/{nota_id}").json()
+        assert [c["importe"] for c in nota["contenido"]] == [100.0]
+
+    @patch('app.subir_pdf_a_s3')
+    @patch('app.publicar_notificacion_sns')
+    def test_respuesta_sin_revalidar_igual_a_validada(self, mock_sns, mock_s3):
+        nota_id = client.post("/notas", json={
+            "cliente_id": "cliente-1",
+            "direccion_facturacion_id": "dom-1",
+            "direccion_envio_id": "dom-1",
+            "contenido": [
+                {"producto_id": "prod-1", "cantidad": 2, "precio_unitario": 50.0}
+            ]
+        }).json()["id"]
+
+        rapida = client.get(f"/notas/{nota_id}").json()
+        with patch('respuestas.RESPUESTAS_VALIDAR', True):
+            validada = client.get(f"/notas/{nota_id}").json()
+        assert rapida == validada
+        assert set(rapida) == set(app_module.NotaVenta.model_fields)
+        assert rapida["contenido"][0]["cantidad"] == 2
+        assert set(rapida["contenido"][0]) == set(app_module.ContenidoNota.model_fields)
+
+
+class TestNotasBulk:
+    """Tests para POST /notas/bulk"""
+    
+    def setup_method(self):
+        # Mismos catálogos que TestBackendMemoria
+        TestBackendMemoria.setup_method(self)
+        from tests.test_pdfs import S3Memoria
+        self.s3 = S3Memoria()
+        self.sns = MagicMock()
+        self.sns.publish_batch.side_effect = lambda TopicArn, PublishBatchRequestEntries: {
+            "Successful": [{"Id": e["Id"]} for e in PublishBatchRequestEntries if e["Id"] != "3"],
+            "Failed": [{"Id": "3", "Code": "InternalError"}] if any(
+                e["Id"] == "3" for e in PublishBatchRequestEntries) else [],
+        }
+        self.extra = [
+            patch('app.get_s3_client', return_value=self.s3),
+            patch('app.get_sns_client', return_value=self.sns),
+            patch('app.SNS_TOPIC_ARN', "arn:aws:sns:us-east-1:123:notas"),
+            patch('app.NOTAS_BULK_RENDER', "hilos"),
+            patch('app.pdfs.renderizar', side_effect=lambda nota, cliente, contenido: b"%PDF " + nota["folio"].encode()),
+        ]
+        for p in self.extra:
+            p.start()
+    
+    def teardown_method(self):
+        for p in self.extra:
+            p.stop()
+        self.patcher.stop()
+    
+    def nota(self, cantidad=1, **cambios):
+        return {
+            "cliente_id": "cliente-1",
+            "direccion_facturacion_id": "dom-1",
+            "direccion_envio_id": "dom-1",
+            "contenido": [{"producto_id": "prod-1", "cantidad": cantidad, "precio_unitario": 10.0}],
+            **cambios,
+        }
+    
+    def test_resultado_por_nota(self):
+        notas = [self.nota(i + 1) for i in range(12)]
+        notas[2] = self.nota(cliente_id="no-existe")
+        notas[5] = self.nota(contenido=[{"producto_id": "prod-x", "cantidad": 1, "precio_unitario": 1.0}])
+        
+        with patch.object(self.repos.productos, 'obtener') as mock_producto, \
+             patch.object(self.repos.notas, 'guardar') as mock_guardar:
+            response = client.post("/notas/bulk", json={"notas": notas})
+            mock_producto.assert_not_called()
+            mock_guardar.assert_not_called()
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["creadas"], data["errores"]) == (10, 2)
+        errores = {r["indice"]: r["error"] for r in data["resultados"] if r["estado"] == "error"}
+        assert errores == {2: "Cliente no encontrado", 5: "Producto prod-x no encontrado"}
+        
+        creadas = [r for r in data["resultados"] if r["estado"] == "creada"]
+        assert [r["indice"] for r in creadas] == [0, 1, 3, 4, 6, 7, 8, 9, 10, 11]
+        assert creadas[4]["nota"]["total"] == 70.0
+        assert len({r["nota"]["folio"] for r in creadas}) == 10
+        for r in creadas:
+            assert client.get(f"/notas/{r['nota']['id']}").json()["total"] == r["nota"]["total"]
+            assert f"TEST123456ABC/{r['nota']['folio']}.pdf" in self.s3.objetos
+        assert len(self.repos.contenido.listar()) == 10
+        cliente = client.get("/notas/agregados/clientes/cliente-1").json()
+        assert (cliente["notas"], cliente["unidades"]) == (10, sum(r["nota"]["contenido"][0]["cantidad"] for r in creadas))
+        
+        # PublishBatch de 10 en 10; la notificación que falla se reporta
+        assert [len(c.kwargs["PublishBatchRequestEntries"]) for c in self.sns.publish_batch.call_args_list] == [10]
+        assert [r["notificada"] for r in creadas].count(False) == 1
+        assert creadas[3]["notificada"] is False
+    
+    def test_lotes_de_sns_y_limites(self):
+        data = client.post("/notas/bulk", json={"notas": [self.nota() for _ in range(23)]}).json()
+        assert data["creadas"] == 23
+        assert [len(c.kwargs["PublishBatchRequestEntries"]) for c in self.sns.publish_batch.call_args_list] == [10, 10, 3]
+        
+        assert client.post("/notas/bulk", json={"notas": []}).status_code == 422
+    
+    def test_idempotencia_guarda_resumen_dentro_del_limite(self):
+        import idempotencia
+        lineas = [{"producto_id": "prod-1", "cantidad": 1, "precio_unitario": 10.0}] * 5
+        lote = {"notas": [self.nota(contenido=lineas) for _ in range(app_module.NOTAS_BULK_MAX)]}
+        headers = {"Idempotency-Key": "lote-1"}
+        
+        primera = client.post("/notas/bulk", json=lote, headers=headers)
+        assert primera.status_code == 200
+        # Las notas completas no caben en un item; el resumen sí
+        assert len(primera.content) > idempotencia.IDEMPOTENCIA_MAX_BYTES
+        guardado = self.repos.idempotencia.obtener("notas-bulk#lote-1")
+        assert guardado["estado"] == idempotencia.COMPLETADO
+        assert len(guardado["respuesta"].encode()) < idempotencia.IDEMPOTENCIA_MAX_BYTES
+        
+        segunda = client.post("/notas/bulk", json=lote, headers=headers)
+        assert segunda.headers["idempotent-replayed"] == "true"
+        assert [(r["id"], r["folio"]) for r in segunda.json()["resultados"]] == [
+            (r["id"], r["folio"]) for r in primera.json()["resultados"]
+        ]
+        assert len(self.repos.notas.listar()) == app_module.NOTAS_BULK_MAX
+    
+    def test_respuesta_que_excede_el_limite_no_se_repite(self):
+        headers = {"Idempotency-Key": "lote-2"}
+        with patch('idempotencia.IDEMPOTENCIA_MAX_BYTES', 100):
+            assert client.post("/notas/bulk", json={"notas": [self.nota()] * 3}, headers=headers).status_code == 200
+        assert "respuesta" not in self.repos.idempotencia.obtener("notas-bulk#lote-2")
+        
+        assert client.post("/notas/bulk", json={"notas": [self.nota()] * 3}, headers=headers).status_code == 409
+        assert len(self.repos.notas.listar()) == 3
+    
+    def test_procesos_usa_el_pool_del_worker_sin_consultar_s3(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=2) as pool, \
+             patch('app.NOTAS_BULK_RENDER', "procesos"), \
+             patch('app.get_pool_pdfs', return_value=pool), \
+             patch('app.pdfs.crear_pool', side_effect=AssertionError), \
+             patch.object(self.s3, 'head_object', side_effect=AssertionError):
+            data = client.post("/notas/bulk", json={"notas": [self.nota() for _ in range(3)]}).json()
+        
+        assert data["creadas"] == 3
+        for r in data["resultados"]:
+            assert f"TEST123456ABC/{r['folio']}.pdf" in self.s3.objetos
+    
+    def test_falla_de_render_no_pierde_notas(self):
+        with patch('app.pdfs.regenerar_lote', side_effect=RuntimeError("render")):
+            data = client.post("/notas/bulk", json={"notas": [self.nota(), self.nota()]}).json()
+        assert data["creadas"] == 2
+        assert all(r["notificada"] is False for r in data["resultados"])
+        assert len(self.repos.notas.listar()) == 2
+        self.sns.publish_batch.assert_not_called()
+
+class TestConsultasNotas:
+    """Tests para GET /notas con filtros por índice"""
+    
+    def setup_method(self):
+        self.repos = repositorios.crear_repositorios(
+            "memory", dict.fromkeys(repositorios.ENTIDADES)
+        )
+        notas = []
+        for i, fecha in enumerate(["2026-08-30T10:00:00", "2026-09-02T09:00:00", "2026-09-15T18:30:00",
+                                   "2026-09-30T23:10:00", "2026-10-01T08:00:00"]):
+            notas.append({
+                "id": f"nota-{i}", "folio": f"NV-{i}", "cliente_id": "cliente-1" if i % 2 == 0 else "cliente-2",
+                "direccion_facturacion_id": "dom-1", "direccion_envio_id": "dom-1",
+                "total": 100.0, "created_at": fecha, "periodo": fecha[:7],
+                "cliente_info": {"rfc": "TEST123456ABC"},
+            })
+        self.repos.notas.cargar(notas)
+        self.patcher = patch('app.get_repositorios', return_value=self.repos)
+        self.patcher.start()
+    
+    def teardown_method(self):
+        self.patcher.stop()
+    
+    def test_por_cliente_y_rango(self):
+        response = client.get("/notas", params={"cliente_id": "cliente-1", "desde": "2026-09-01"})
+        assert [n["id"] for n in response.json()] == ["nota-2", "nota-4"]
+        assert "cliente_info" not in response.json()[0]
+        assert "x-next-cursor" not in response.headers
+    
+    def test_por_folio(self):
+        assert [n["id"] for n in client.get("/notas", params={"folio": "NV-3"}).json()] == ["nota-3"]
+    
+    def test_rango_de_fechas_paginado(self):
+        ids = []
+        params = {"desde": "2026-09-01", "hasta": "2026-09-30", "limit": 2}
+        while True:
+            response = client.get("/notas", params=params)
+            ids.extend(n["id"] for n in response.json())
+            if "x-next-cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["x-next-cursor"]
+        
+        # hasta sin hora incluye todo el 30 de septiembre
+        assert ids == ["nota-1", "nota-2", "nota-3"]
+    
+    def test_rango_entre_meses(self):
+        response = client.get("/notas", params={"desde": "2026-08-01", "hasta": "2026-10-31", "limit": 10})
+        assert len(response.json()) == 5
+    
+    def test_parametros_invalidos(self):
+        assert client.get("/notas", params={"desde": "ayer"}).status_code == 400
+        assert client.get("/notas", params={"hasta": "2026-09-30"}).status_code == 400
+        assert client.get("/notas", params={"cliente_id": "cliente-1", "cursor": "%%%"}).status_code == 400
@@ -0,0 +1,59 @@
+"""
+Tests para la fábrica compartida de clientes AWS
+"""
+import pytest
+import botocore.session
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import aws_clients
+
+
+class TestConfiguracion:
+    """Tests para la configuración de botocore"""
+
+    def test_config_usa_valores_de_ambiente(self):
+        with patch.object(aws_clients, 'AWS_MAX_POOL_CONNECTIONS', 128), \
+             patch.object(aws_clients, 'AWS_RETRY_MODE', 'adaptive'), \
+             patch.object(aws_clients, 'AWS_CONNECT_TIMEOUT', 1.5):
+            config = aws_clients.build_config()
+
+        assert config.max_pool_connections == 128
+        assert config.retries["mode"] == "adaptive"
+        assert config.connect_timeout == 1.5
+        assert config.tcp_keepalive is True
+
+    def test_sesion_y_clientes_compartidos(self):
+        aws_clients.reset()
+        with patch('boto3.session.Session') as mock_session:
+            mock_session.return_value.client.side_effect = lambda *a, **kw: MagicMock()
+            s3 = aws_clients.get_client('s3')
+            assert aws_clients.get_client('s3') is s3
+            assert aws_clients.get_client('sns') is not s3
+            assert mock_session.call_count == 1
+        aws_clients.reset()
+
+
+class TestPoolStats:
+    """Tests para las métricas de utilización del pool"""
+
+    def test_estadisticas_de_cliente_real(self):
+        client = botocore.session.get_session().create_client(
+            's3',
+            region_name='us-east-1',
+            aws_access_key_id='test',
+            aws_secret_access_key='test',
+            config=aws_clients.build_config()
+        )
+        # Forzar la creación de un pool sin hacer requests
+        manager = client._endpoint.http_session._manager
+        manager.connection_from_url('https://s3.amazonaws.com')
+
+        stats = aws_clients._estadisticas_cliente(client)
+        assert stats["pools"] == 1
+        assert stats["max_conexiones"] == aws_clients.AWS_MAX_POOL_CONNECTIONS
+        assert stats["en_uso"] == 0
@@ -0,0 +1,64 @@
+"""
+Tests para el backfill de periodo en notas
+"""
+import io
+import json
+from unittest.mock import patch
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+patch('boto3.session.Session').start()
+import backfill_periodo
+from repositorios import RepositorioMemoria
+
+
+class TestBackfillPeriodo:
+    """Tests para la asignación de periodo y la reanudación por segmento"""
+
+    def setup_method(self):
+        self.repo = RepositorioMemoria()
+        self.repo.cargar([
+            {"id": f"nota-{i}", "created_at": f"2026-0{i % 3 + 7}-15T10:00:00"} for i in range(9)
+        ] + [
+            {"id": "nueva", "created_at": "2026-10-01T10:00:00", "periodo": "2026-10"},
+            {"id": "sin-fecha"},
+        ])
+
+    def test_asigna_periodo_desde_created_at(self, tmp_path):
+        ruta = str(tmp_path / "checkpoint.json")
+        conteo = backfill_periodo.correr(self.repo, segmentos=4, checkpoint_ruta=ruta, salida=io.StringIO())
+
+        assert conteo == {"revisadas": 11, "actualizadas": 9}
+        assert self.repo.obtener("nota-1")["periodo"] == "2026-08"
+        assert "periodo" not in self.repo.obtener("sin-fecha")
+        with open(ruta) as f:
+            assert json.load(f)["terminados"] == [0, 1, 2, 3]
+
+    def test_nota_borrada_no_se_recrea(self):
+        pagina = [{"id": "borrada", "created_at": "2026-07-01T00:00:00"}]
+        assert backfill_periodo.asignar_periodos(self.repo, pagina) == 0
+        assert self.repo.obtener("borrada") is None
+
+    def test_reanuda_segmentos_pendientes(self, tmp_path):
+        ruta = str(tmp_path / "checkpoint.json")
+        recorrer = self.repo.recorrer
+
+        def falla_en_segmento_2(campos, segmento, segmentos):
+            if segmento == 2:
+                raise RuntimeError("throttled")
+            return recorrer(campos, segmento, segmentos)
+
+        with patch.object(self.repo, 'recorrer', side_effect=falla_en_segmento_2):
+            try:
+                backfill_periodo.correr(self.repo, segmentos=4, hilos=1, checkpoint_ruta=ruta, salida=io.StringIO())
+            except RuntimeError:
+                pass
+
+        with patch.object(self.repo, 'recorrer', wraps=recorrer) as mock_recorrer:
+            conteo = backfill_periodo.correr(self.repo, segmentos=4, checkpoint_ruta=ruta, salida=io.StringIO())
+            assert [c.args[1] for c in mock_recorrer.call_args_list] == [2]
+        assert conteo["actualizadas"] == 9
+        assert all(self.repo.obtener(f"nota-{i}")["periodo"] for i in range(9))
@@ -0,0 +1,56 @@
+"""
+Tests de los archivos copiados entre módulos
+
+Cada módulo se empaqueta por separado desde su src/, así que los archivos
+comunes viven copiados en cada uno y deben seguir idénticos byte por byte.
+Al cambiar uno, copiarlo a los demás módulos de su grupo. El workflow
+compartidos.yml corre estos tests en cada cambio a cualquier src/.
+"""
+import os
+import glob
+import pytest
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+TODOS = ("modulo-catalogos", "modulo-notas", "modulo-notificaciones")
+CATALOGOS_Y_NOTAS = ("modulo-catalogos", "modulo-notas")
+
+COMPARTIDOS = {
+    "aws_clients.py": TODOS,
+    "tracing.py": TODOS,
+    "dynamodb_codec.py": CATALOGOS_Y_NOTAS,
+    "idempotencia.py": CATALOGOS_Y_NOTAS,
+    "repositorios.py": CATALOGOS_Y_NOTAS,
+    "respuestas.py": CATALOGOS_Y_NOTAS,
+    "server.py": CATALOGOS_Y_NOTAS,
+}
+
+# Frase con la que cada copia se declara compartida en su docstring
+MARCA = "Este archivo es idéntico en"
+
+def leer(modulo: str, archivo: str) -> bytes:
+    with open(os.path.join(RAIZ, modulo, "src", archivo), "rb") as f:
+        return f.read()
+
+@pytest.fixture(autouse=True)
+def repositorio_completo():
+    if not all(os.path.isdir(os.path.join(RAIZ, m, "src")) for m in TODOS):
+        pytest.skip("Se necesita el repositorio completo, no solo este módulo")
+
+
+@pytest.mark.parametrize("archivo", sorted(COMPARTIDOS))
+def test_copias_identicas(archivo):
+    modulos = COMPARTIDOS[archivo]
+    original = leer(modulos[0], archivo)
+    distintos = [m for m in modulos[1:] if leer(m, archivo) != original]
+    assert not distintos, f"{archivo} de {', '.join(distintos)} difiere del de {modulos[0]}"
+
+
+def test_todas_las_copias_estan_registradas():
+    marcados = set()
+    for ruta in glob.glob(os.path.join(RAIZ, "modulo-*", "src", "*.py")):
+        with open(ruta, encoding="utf-8") as f:
+            if MARCA in f.read():
+                marcados.add((os.path.basename(os.path.dirname(os.path.dirname(ruta))), os.path.basename(ruta)))
+    registrados = {(m, archivo) for archivo, modulos in COMPARTIDOS.items() for m in modulos}
+    assert marcados == registrados
@@ -0,0 +1,137 @@
+"""
+Tests para el acceso de bajo nivel a DynamoDB
+"""
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dynamodb_codec import Codec, TablaDynamo, ESQUEMAS, deserializar_valor, serializar_valor
+
+CONTENIDO = {
+    "id": "c-1",
+    "nota_id": "n-1",
+    "producto_id": "p-1",
+    "producto_nombre": "Tornillo",
+    "cantidad": 3,
+    "precio_unitario": Decimal("12.5"),
+    "importe": Decimal("37.5"),
+}
+
+
+class TestCodec:
+    """Tests para la (de)serialización por esquema"""
+    
+    def test_deserializa_tipos_del_esquema(self):
+        raw = {k: v for k, v in TypeSerializer().serialize(CONTENIDO)["M"].items()}
+        item = Codec(ESQUEMAS["contenido"]).deserializar(raw)
+        
+        assert item["cantidad"] == 3 and isinstance(item["cantidad"], int)
+        assert item["importe"] == 37.5 and isinstance(item["importe"], float)
+        assert item["producto_nombre"] == "Tornillo"
+    
+    def test_serializa_igual_que_boto3(self):
+        codec = Codec(ESQUEMAS["contenido"])
+        assert codec.serializar(CONTENIDO) == TypeSerializer().serialize(CONTENIDO)["M"]
+    
+    def test_atributos_fuera_del_esquema_y_nulos(self):
+        codec = Codec(ESQUEMAS["producto"])
+        raw = {
+            "id": {"S": "p-1"},
+            "precio_base": {"NULL": True},
+            "extra": {"M": {"tags": {"L": [{"S": "a"}, {"N": "2"}]}}},
+        }
+        item = codec.deserializar(raw)
+        assert item == {"id": "p-1", "precio_base": None, "extra": {"tags": ["a", 2]}}
+        assert serializar_valor(item["extra"]) == raw["extra"]
+    
+    def test_numeros_genericos(self):
+        # Fuera del esquema todo número es Decimal, igual que TypeDeserializer
+        for texto in ("10", "10.25", "1E+2"):
+            valor = deserializar_valor({"N": texto})
+            assert isinstance(valor, Decimal) and valor == TypeDeserializer().deserialize({"N": texto})
+        anidado = deserializar_valor({"M": {"lineas": {"L": [{"M": {"cantidad": {"N": "3"}}}]}, "ns": {"NS": ["1.5"]}}})
+        assert anidado == {"lineas": [{"cantidad": Decimal("3")}], "ns": {Decimal("1.5")}}
+        assert isinstance(anidado["lineas"][0]["cantidad"], Decimal)
+        assert serializar_valor(0.1) == {"N": "0.1"}
+
+
+class TestTablaDynamo:
+    """Tests para la tabla sobre el cliente de bajo nivel"""
+    
+    def test_get_item(self):
+        client = MagicMock()
+        client.get_item.return_value = {"Item": {"id": {"S": "p-1"}, "precio_base": {"N": "9.99"}}}
+        tabla = TablaDynamo(client, "productos", ESQUEMAS["producto"])
+        
+        response = tabla.get_item(Key={"id": "p-1"})
+        
+        client.get_item.assert_called_once_with(TableName="productos", Key={"id": {"S": "p-1"}})
+        assert response == {"Item": {"id": "p-1", "precio_base": 9.99}}
+    
+    def test_get_item_no_encontrado(self):
+        client = MagicMock()
+        client.get_item.return_value = {}
+        tabla = TablaDynamo(client, "productos", ESQUEMAS["producto"])
+        assert tabla.get_item(Key={"id": "x"}) == {}
+    
+    def test_scan_all_sigue_paginacion(self):
+        client = MagicMock()
+        client.scan.side_effect = [
+            {"Items": [{"id": {"S": "1"}}], "LastEvaluatedKey": {"id": {"S": "1"}}},
+            {"Items": [{"id": {"S": "2"}}]},
+        ]
+        tabla = TablaDynamo(client, "clientes", ESQUEMAS["cliente"])
+        
+        ids = [item["id"] for item in tabla.scan_all(
+            FilterExpression="rfc = :rfc", ExpressionAttributeValues={":rfc": "X"}
+        )]
+        
+        assert ids == ["1", "2"]
+        segunda = client.scan.call_args_list[1].kwargs
+        assert segunda["ExclusiveStartKey"] == {"id": {"S": "1"}}
+        assert segunda["ExpressionAttributeValues"] == {":rfc": {"S": "X"}}
+    
+    def test_batch_writer_agrupa_y_reintenta(self, monkeypatch):
+        import dynamodb_codec
+        monkeypatch.setattr(dynamodb_codec.time, "sleep", lambda s: None)
+        client = MagicMock()
+        pendiente = {"DeleteRequest": {"Key": {"id": {"S": "d-0"}}}}
+        client.batch_write_item.side_effect = [
+            {"UnprocessedItems": {"domicilios": [pendiente]}},
+            {},
+        ]
+        tabla = TablaDynamo(client, "domicilios", ESQUEMAS["domicilio"])
+        
+        with tabla.batch_writer() as lote:
+            for i in range(30):
+                lote.delete_item(Key={"id": f"d-{i}"})
+        
+        lotes = [c.kwargs["RequestItems"]["domicilios"] for c in client.batch_write_item.call_args_list]
+        assert [len(l) for l in lotes] == [25, 6]
+        # El no procesado se reenvía en el siguiente lote
+        assert lotes[1][0] == pendiente
+    
+    def test_batch_writer_envia_lo_encolado_si_el_bloque_falla(self):
+        client = MagicMock()
+        client.batch_write_item.return_value = {}
+        tabla = TablaDynamo(client, "domicilios", ESQUEMAS["domicilio"])
+        
+        with pytest.raises(ValueError):
+            with tabla.batch_writer() as lote:
+                lote.delete_item(Key={"id": "d-1"})
+                raise ValueError("falla a mitad")
+        
+        client.batch_write_item.assert_called_once()
+        
+        # Un error al enviar no reemplaza al del bloque
+        client.batch_write_item.side_effect = RuntimeError("throttled")
+        with pytest.raises(ValueError):
+            with tabla.batch_writer() as lote:
+                lote.delete_item(Key={"id": "d-2"})
+                raise ValueError("falla a mitad")
@@ -0,0 +1,167 @@
+"""
+Tests para la exportación de PDFs en ZIP
+"""
+import io
+import zipfile
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from botocore.exceptions import ClientError
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+patch('boto3.session.Session').start()
+import app
+import exportacion
+import repositorios
+from tests.test_pdfs import S3Memoria, CLIENTE
+
+client = TestClient(app.app)
+
+
+class S3Exportacion(S3Memoria):
+    """S3Memoria con get_object, multipart upload y URLs prefirmadas"""
+
+    def __init__(self):
+        super().__init__()
+        self.gets = []
+        self.partes = {}
+
+    def get_object(self, Bucket, Key):
+        self.gets.append(Key)
+        if Key not in self.objetos:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": io.BytesIO(self.objetos[Key][0])}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        self.partes[Key] = []
+        return {"UploadId": "u-1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.partes[Key].append(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.objetos[Key] = (b"".join(self.partes.pop(Key)), {})
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.partes.pop(Key)
+
+    def generate_presigned_url(self, operacion, Params, ExpiresIn):
+        return f"https://s3.example/{Params['Key']}?expira={ExpiresIn}"
+
+
+def pdf(i: int) -> bytes:
+    return b"%PDF-1.4 nota " + str(i).encode() * 100
+
+
+class TestGenerarZip:
+    """Tests para el ZIP generado por bloques"""
+
+    def test_orden_bloques_y_faltantes(self):
+        s3 = S3Exportacion()
+        for i in range(5):
+            s3.objetos[f"RFC/NV-{i}.pdf"] = (pdf(i), {})
+        entradas = [(f"RFC/NV-{i}.pdf", f"RFC/NV-{i}.pdf") for i in (3, 0, 9, 1)] + [("NV-x.pdf", None)]
+
+        bloques = list(exportacion.generar_zip(s3, "bucket", entradas, hilos=2))
+
+        # Un bloque por PDF más el cierre: el ZIP no se arma completo en memoria
+        assert len(bloques) == 4
+        with zipfile.ZipFile(io.BytesIO(b"".join(bloques))) as archivo:
+            assert archivo.namelist() == ["RFC/NV-3.pdf", "RFC/NV-0.pdf", "RFC/NV-1.pdf", exportacion.FALTANTES]
+            assert archivo.read("RFC/NV-0.pdf") == pdf(0)
+            assert archivo.read(exportacion.FALTANTES) == b"RFC/NV-9.pdf\nNV-x.pdf\n"
+
+    def test_subida_multiparte(self):
+        s3 = S3Exportacion()
+        total = exportacion.SubidaMultiparte(s3, "bucket", "x.zip", parte_bytes=10).subir(
+            [b"a" * 6, b"b" * 6, b"c" * 3]
+        )
+        assert total == 15
+        assert s3.objetos["x.zip"][0] == b"a" * 6 + b"b" * 6 + b"c" * 3
+
+        def falla():
+            yield b"a" * 20
+            raise RuntimeError("s3 caído")
+
+        try:
+            exportacion.SubidaMultiparte(s3, "bucket", "y.zip", parte_bytes=10).subir(falla())
+        except RuntimeError:
+            pass
+        assert "y.zip" not in s3.partes and "y.zip" not in s3.objetos
+
+
+class TestEndpointExportacion:
+    """Tests para GET /notas/export.zip"""
+
+    def setup_method(self):
+        self.repos = repositorios.crear_repositorios("memory", dict.fromkeys(repositorios.ENTIDADES))
+        self.repos.clientes.cargar([{"id": "cli-2", "rfc": "OTRO123456ABC"}])
+        self.repos.notas.cargar([
+            {"id": f"nota-{i}", "folio": f"NV-{i}", "cliente_id": "cli-1", "cliente_info": CLIENTE,
+             "created_at": f"2026-09-0{i + 1}T10:00:00", "periodo": "2026-09", "total": 100.0}
+            for i in range(3)
+        ] + [{"id": "nota-9", "folio": "NV-9", "cliente_id": "cli-2", "created_at": "2026-09-05T10:00:00",
+              "periodo": "2026-09", "total": 100.0}])
+        self.s3 = S3Exportacion()
+        for i in range(3):
+            self.s3.objetos[f"TEST123456ABC/NV-{i}.pdf"] = (pdf(i), {"nota-descargada": "false"})
+        self.patchers = [
+            patch('app.get_repositorios', return_value=self.repos),
+            patch('app.get_s3_client', return_value=self.s3),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def teardown_method(self):
+        for p in self.patchers:
+            p.stop()
+
+    def test_zip_por_cliente_en_streaming(self):
+        response = client.get("/notas/export.zip", params={"cliente_id": "cli-1", "desde": "2026-09-02"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archivo:
+            assert archivo.namelist() == ["TEST123456ABC/NV-1.pdf", "TEST123456ABC/NV-2.pdf"]
+        # Exportar no marca los PDFs como descargados
+        assert self.s3.objetos["TEST123456ABC/NV-1.pdf"][1] == {"nota-descargada": "false"}
+
+    def test_zip_por_fechas_con_nota_sin_snapshot(self):
+        response = client.get("/notas/export.zip", params={"desde": "2026-09-01", "hasta": "2026-09-30"})
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archivo:
+            assert len(archivo.namelist()) == 4
+            # nota-9 no tiene snapshot: su RFC sale del catálogo, pero no tiene PDF
+            assert archivo.read(exportacion.FALTANTES) == b"OTRO123456ABC/NV-9.pdf\n"
+
+    def test_llave_con_rfc_del_snapshot(self):
+        # Los índices no proyectan cliente_info y el cliente cambió de RFC
+        self.repos.clientes.cargar([{"id": "cli-1", "rfc": "NUEVO123456AB"}])
+        consultar = self.repos.notas.consultar
+
+        def consultar_indice(*args, **kwargs):
+            items, cursor = consultar(*args, **kwargs)
+            return [{k: v for k, v in item.items() if k != "cliente_info"} for item in items], cursor
+
+        with patch.object(self.repos.notas, 'consultar', side_effect=consultar_indice):
+            response = client.get("/notas/export.zip", params={"cliente_id": "cli-1"})
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archivo:
+            assert archivo.namelist() == [f"TEST123456ABC/NV-{i}.pdf" for i in range(3)]
+
+    def test_entrega_por_s3(self):
+        response = client.get("/notas/export.zip", params={"cliente_id": "cli-1", "entrega": "s3"})
+
+        data = response.json()
+        assert data["notas"] == 3
+        assert data["clave"].startswith("exportaciones/") and data["url"].endswith("?expira=3600")
+        with zipfile.ZipFile(io.BytesIO(self.s3.objetos[data["clave"]][0])) as archivo:
+            assert len(archivo.namelist()) == 3
+
+    def test_parametros(self):
+        assert client.get("/notas/export.zip").status_code == 400
+        assert client.get("/notas/export.zip", params={"cliente_id": "cli-1", "entrega": "ftp"}).status_code == 422
+        with patch('app.EXPORT_MAX_NOTAS', 2):
+            assert client.get("/notas/export.zip", params={"cliente_id": "cli-1"}).status_code == 400
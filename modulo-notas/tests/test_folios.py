@@ -0,0 +1,92 @@
+"""
+Tests para la asignación de folios
+"""
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import folios
+from repositorios import RepositorioMemoria, RepositorioDynamo
+
+
+class TestAsignadorFolios:
+    """Tests para la reserva de bloques y el formato"""
+
+    def test_formato_ordenable(self):
+        asignador = folios.AsignadorFolios(lambda: RepositorioMemoria(), "NV", bloque=10)
+        generados = [asignador.siguiente() for _ in range(3)]
+        assert generados == ["NV-0000000001", "NV-0000000002", "NV-0000000003"]
+        assert folios.formatear("NV", 99) < folios.formatear("NV", 100)
+
+    def test_reserva_un_bloque_por_cada_n_folios(self):
+        repo = RepositorioMemoria()
+        asignador = folios.AsignadorFolios(lambda: repo, "NV", bloque=10)
+        for _ in range(25):
+            asignador.siguiente()
+        # 3 bloques reservados: 1-10, 11-20, 21-30
+        assert repo.obtener("FOLIO#NV")["ultimo"] == 30
+
+    def test_series_independientes(self):
+        repo = RepositorioMemoria()
+        nv = folios.AsignadorFolios(lambda: repo, "NV", bloque=5)
+        dv = folios.AsignadorFolios(lambda: repo, "DV", bloque=5)
+        assert nv.siguiente() == "NV-0000000001"
+        assert dv.siguiente() == "DV-0000000001"
+
+    def test_reiniciar_deja_hueco(self):
+        repo = RepositorioMemoria()
+        asignador = folios.AsignadorFolios(lambda: repo, "NV", bloque=10)
+        asignador.siguiente()
+        asignador.reiniciar()
+        assert asignador.siguiente() == "NV-0000000011"
+
+    def test_bloque_desde_dynamo(self):
+        tabla = MagicMock()
+        tabla.update_item.return_value = {"Attributes": {"ultimo": 100}}
+        repo = RepositorioDynamo("folios", lambda nombre: tabla)
+        asignador = folios.AsignadorFolios(lambda: repo, "NV", bloque=50)
+
+        assert asignador.siguiente() == "NV-0000000051"
+        kwargs = tabla.update_item.call_args.kwargs
+        assert kwargs["Key"] == {"id": "FOLIO#NV"}
+        assert kwargs["ReturnValues"] == "UPDATED_NEW"
+
+    def test_error_al_reservar_no_consume_numeros(self):
+        repo = MagicMock()
+        repo.incrementar.side_effect = [Exception("throttled"), {"ultimo": 10}]
+        asignador = folios.AsignadorFolios(lambda: repo, "NV", bloque=10)
+        with pytest.raises(Exception):
+            asignador.siguiente()
+        assert asignador.siguiente() == "NV-0000000001"
+
+
+class TestConcurrenciaFolios:
+    """Prueba de estrés: muchos workers y contenedores contra un contador"""
+
+    def test_sin_duplicados_entre_workers(self):
+        # 4 "contenedores" (asignadores) comparten el contador; 32 hilos piden
+        # folios a la vez con una latencia mínima en cada reserva de bloque
+        repo = RepositorioMemoria(latencia_ms=0.5)
+        contenedores = [folios.AsignadorFolios(lambda: repo, "NV", bloque=7) for _ in range(4)]
+
+        def worker(i):
+            asignador = contenedores[i % len(contenedores)]
+            return i % len(contenedores), [asignador.siguiente() for _ in range(250)]
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            resultados = list(executor.map(worker, range(32)))
+
+        todos = [folio for _, generados in resultados for folio in generados]
+        assert len(todos) == 32 * 250
+        assert len(set(todos)) == len(todos)
+        # Cada worker ve sus folios en orden creciente
+        for _, generados in resultados:
+            assert generados == sorted(generados)
+        # Los huecos solo son los restos de los bloques en memoria
+        reservados = repo.obtener("FOLIO#NV")["ultimo"]
+        assert len(todos) <= reservados < len(todos) + 4 * 7
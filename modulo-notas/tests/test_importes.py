@@ -0,0 +1,89 @@
+"""
+Tests para el cálculo de importes en centavos
+"""
+import random
+import pytest
+from decimal import Decimal, ROUND_HALF_UP
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import importes
+
+CASOS_ALEATORIOS = 2000
+
+
+def referencia(cantidad: int, precio: str, porcentaje: str) -> Decimal:
+    """Importe calculado directamente con Decimal, redondeado una sola vez"""
+    bruto = cantidad * Decimal(precio)
+    return (bruto * (100 - Decimal(porcentaje)) / 100).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+class TestCentavos:
+    """Tests para la conversión a centavos"""
+
+    @pytest.mark.parametrize("monto, esperado", [
+        (19.99, 1999), (0.1, 10), (1.005, 101), (2.675, 268), (1e-3, 0),
+        (0.005, 1), (123456789.12, 12345678912), ("10.125", 1013), (Decimal("0.045"), 5), (7, 700),
+    ])
+    def test_redondeo_mitad_hacia_arriba(self, monto, esperado):
+        assert importes.a_centavos(monto) == esperado
+
+    def test_conversiones_exactas(self):
+        assert importes.a_decimal(2050) == Decimal("20.50")
+        assert importes.a_float(2050) == 20.5
+
+
+class TestCalcular:
+    """Tests para el cálculo de una nota completa"""
+
+    def test_sin_errores_de_punto_flotante(self):
+        calculo = importes.calcular([(1, 0.1, 0)] * 10000)
+        assert calculo.total == 100000
+        assert sum(0.1 for _ in range(10000)) != 1000.0
+
+    def test_descuento_e_iva(self):
+        calculo = importes.calcular([(3, 33.33, 10), (1, 0.01, 50)], tasa_iva=Decimal("0.16"))
+        # 99.99 * 0.90 = 89.991 -> 89.99; 0.01 * 0.50 = 0.005 -> 0.01
+        assert [l.importe for l in calculo.lineas] == [8999, 1]
+        assert [l.descuento for l in calculo.lineas] == [1000, 0]
+        assert calculo.descuento == 1000
+        assert calculo.impuestos == 1440  # 90.00 * 0.16 = 14.40
+        assert calculo.total == 9000 + 1440
+
+    def test_precio_con_mas_de_dos_decimales_se_redondea_en_el_importe(self):
+        calculo = importes.calcular([(3, 0.333, 0), (1000, "1.005", 0), (2, 0.125, 10)])
+        # 0.999 -> 1.00 (no 3 * 0.33); 1005.000 (no 1000 * 1.01); 0.25 * 0.9 = 0.225 -> 0.23
+        assert [l.importe for l in calculo.lineas] == [100, 100500, 23]
+        assert [l.precio_unitario for l in calculo.lineas] == [33, 101, 13]
+        assert [l.descuento for l in calculo.lineas] == [0, 0, 2]
+
+    def test_propiedades_aleatorias(self):
+        rng = random.Random(20261019)
+        for _ in range(CASOS_ALEATORIOS):
+            lineas = []
+            for _ in range(rng.randint(1, 20)):
+                precio = f"{rng.randint(0, 99999)}.{rng.randint(0, 999):03d}"
+                porcentaje = rng.choice(["0", "5", "12.5", "33.333", "100"])
+                lineas.append((rng.randint(1, 500), precio, porcentaje))
+            tasa = rng.choice([Decimal("0"), Decimal("0.08"), Decimal("0.16")])
+
+            calculo = importes.calcular(lineas, tasa_iva=tasa)
+
+            for linea, (cantidad, precio, porcentaje) in zip(calculo.lineas, lineas):
+                assert importes.a_decimal(linea.importe) == referencia(cantidad, precio, porcentaje)
+                assert 0 <= linea.importe
+                assert linea.importe + linea.descuento == importes.a_centavos(cantidad * Decimal(precio))
+            assert calculo.subtotal == sum(l.importe for l in calculo.lineas)
+            assert calculo.descuento == sum(l.descuento for l in calculo.lineas)
+            esperado = (importes.a_decimal(calculo.subtotal) * tasa).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            assert importes.a_decimal(calculo.impuestos) == esperado
+            assert calculo.total == calculo.subtotal + calculo.impuestos
+
+    def test_floats_equivalen_a_su_texto(self):
+        rng = random.Random(7)
+        for _ in range(CASOS_ALEATORIOS):
+            precio = round(rng.uniform(0, 10000), rng.randint(0, 4))
+            assert importes.a_centavos(precio) == importes.a_centavos(repr(precio))
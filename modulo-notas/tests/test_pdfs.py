@@ -0,0 +1,115 @@
+"""
+Tests para el render de PDFs con caché por contenido
+"""
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pdfs
+
+NOTA = {"folio": "NV-0000000001", "created_at": "2026-10-19T10:00:00", "subtotal": 200.0,
+        "descuento": 0.0, "impuestos": 0.0, "total": 200.0}
+CLIENTE = {"razon_social": "Test SA", "nombre_comercial": "Test", "rfc": "TEST123456ABC",
+           "correo_electronico": "test@test.com", "telefono": "5551234567"}
+CONTENIDO = [{"cantidad": 2, "producto_nombre": "Producto", "precio_unitario": 100.0, "importe": 200.0}]
+
+
+class S3Memoria:
+    """Bucket en memoria con las operaciones que usa pdfs"""
+
+    def __init__(self):
+        self.objetos = {}
+        self.puts = 0
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objetos:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"Metadata": dict(self.objetos[Key][1])}
+
+    def put_object(self, Bucket, Key, Body, ContentType, Metadata):
+        self.puts += 1
+        self.objetos[Key] = (Body, Metadata)
+
+
+class TestHuella:
+    """Tests para la huella de las entradas del PDF"""
+
+    def test_decimal_y_float_dan_la_misma_huella(self):
+        guardada = {**NOTA, "total": Decimal("200"), "id": "otro-campo"}
+        contenido = [{**CONTENIDO[0], "importe": Decimal("200.00"), "producto_id": "p-1"}]
+        assert pdfs.huella(guardada, CLIENTE, contenido) == pdfs.huella(NOTA, CLIENTE, CONTENIDO)
+
+    def test_cambia_con_datos_y_plantilla(self, monkeypatch):
+        original = pdfs.huella(NOTA, CLIENTE, CONTENIDO)
+        assert pdfs.huella({**NOTA, "total": 201.0}, CLIENTE, CONTENIDO) != original
+        monkeypatch.setattr(pdfs, "VERSION_PLANTILLA", "2")
+        assert pdfs.huella(NOTA, CLIENTE, CONTENIDO) != original
+
+
+class TestRegenerar:
+    """Tests para la regeneración de un PDF"""
+
+    def setup_method(self):
+        self.s3 = S3Memoria()
+        self.render = MagicMock(return_value=b"%PDF-1")
+        self.trabajo = pdfs.Trabajo(NOTA, CLIENTE, CONTENIDO)
+
+    def test_renderiza_solo_huellas_nuevas(self):
+        plan = pdfs.regenerar(self.s3, "bucket", self.trabajo, render=self.render)
+        assert plan.estado == pdfs.RENDERIZADO
+        # Un solo objeto por nota, sin copia aparte por contenido
+        assert list(self.s3.objetos) == ["TEST123456ABC/NV-0000000001.pdf"]
+        assert self.s3.objetos["TEST123456ABC/NV-0000000001.pdf"][0] == b"%PDF-1"
+
+        assert pdfs.regenerar(self.s3, "bucket", self.trabajo, render=self.render).estado == pdfs.SIN_CAMBIOS
+        self.render.assert_called_once()
+
+        # Objeto de la nota perdido: se vuelve a renderizar
+        del self.s3.objetos["TEST123456ABC/NV-0000000001.pdf"]
+        assert pdfs.regenerar(self.s3, "bucket", self.trabajo, render=self.render).estado == pdfs.RENDERIZADO
+
+        assert pdfs.regenerar(self.s3, "bucket", self.trabajo, forzar=True, render=self.render).estado == pdfs.RENDERIZADO
+        assert self.render.call_count == 3
+
+    def test_conserva_metadatos_de_envio(self):
+        self.s3.objetos["TEST123456ABC/NV-0000000001.pdf"] = (
+            b"viejo", {"hora-envio": "2026-01-01", "nota-descargada": "true", "veces-enviado": "3"}
+        )
+        plan = pdfs.regenerar(self.s3, "bucket", self.trabajo, render=self.render)
+        _, metadatos = self.s3.objetos["TEST123456ABC/NV-0000000001.pdf"]
+        assert metadatos == {"hora-envio": "2026-01-01", "nota-descargada": "true",
+                             "veces-enviado": "3", "pdf-hash": plan.hash_pdf}
+
+    def test_error_de_s3_distinto_de_404(self):
+        s3 = MagicMock()
+        s3.head_object.side_effect = ClientError({"Error": {"Code": "403"}}, "HeadObject")
+        with pytest.raises(ClientError):
+            pdfs.regenerar(s3, "bucket", self.trabajo, render=self.render)
+
+
+class TestRegenerarLote:
+    """Tests para la regeneración en lote con pool de procesos"""
+
+    def test_lote_renderiza_cada_huella_una_vez(self):
+        s3 = S3Memoria()
+        nueva = pdfs.Trabajo({**NOTA, "folio": "NV-0000000002"}, CLIENTE, CONTENIDO)
+        perdida = pdfs.Trabajo({**NOTA, "folio": "NV-0000000003"}, CLIENTE, CONTENIDO)
+        vigente = pdfs.Trabajo(NOTA, CLIENTE, CONTENIDO)
+        for trabajo in (vigente, perdida):
+            pdfs.regenerar(s3, "bucket", trabajo, render=lambda *a: b"%PDF-previo")
+        del s3.objetos["TEST123456ABC/NV-0000000003.pdf"]
+        puts_previos = s3.puts
+
+        planes = pdfs.regenerar_lote(s3, "bucket", [vigente, nueva, nueva, perdida], procesos=2)
+
+        assert [p.estado for p in planes] == [pdfs.SIN_CAMBIOS, pdfs.RENDERIZADO, pdfs.RENDERIZADO, pdfs.RENDERIZADO]
+        # La nota repetida se renderiza una vez, con ReportLab en el proceso worker
+        assert s3.puts - puts_previos == 2
+        assert s3.objetos["TEST123456ABC/NV-0000000002.pdf"][0].startswith(b"%PDF")
+        assert s3.objetos["TEST123456ABC/NV-0000000003.pdf"][0] != b"%PDF-previo"
@@ -0,0 +1,96 @@
+"""
+Tests para el render masivo de PDFs
+"""
+import json
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+patch('boto3.session.Session').start()
+import app
+import render_masivo
+import repositorios
+from tests.test_pdfs import S3Memoria, CLIENTE, CONTENIDO
+
+
+def nota(i: int) -> dict:
+    return {
+        "id": f"nota-{i}", "folio": f"NV-{i:010d}", "cliente_id": "cli-1",
+        "created_at": f"2026-09-{i + 1:02d}T10:00:00", "periodo": "2026-09", "total": 200.0,
+        "cliente_info": CLIENTE, "contenido": CONTENIDO,
+    }
+
+
+class TestRenderMasivo:
+    """Tests para lotes, checkpoint y reanudación"""
+
+    def setup_method(self):
+        self.repos = repositorios.crear_repositorios("memory", dict.fromkeys(repositorios.ENTIDADES))
+        self.repos.notas.cargar([nota(i) for i in range(5)])
+        self.s3 = S3Memoria()
+        self.patchers = [
+            patch('app.get_repositorios', return_value=self.repos),
+            patch('app.get_s3_client', return_value=self.s3),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def teardown_method(self):
+        for p in self.patchers:
+            p.stop()
+
+    def test_ids_por_fechas(self):
+        assert render_masivo.ids_por_fechas("2026-09-02", "2026-09-03", pagina=1) == ["nota-1", "nota-2"]
+
+    def test_reanuda_desde_checkpoint(self, tmp_path):
+        ruta = str(tmp_path / "checkpoint.json")
+        ids = [f"nota-{i}" for i in range(5)] + ["no-existe"]
+        origen = {"ids": len(ids)}
+        original = app.regenerar_pdfs
+        lotes = []
+
+        def interrumpe_en_el_segundo(nota_ids, *args, **kwargs):
+            lotes.append(list(nota_ids))
+            if len(lotes) == 2:
+                raise KeyboardInterrupt
+            return original(nota_ids, *args, **kwargs)
+
+        with patch('app.regenerar_pdfs', side_effect=interrumpe_en_el_segundo):
+            with pytest.raises(KeyboardInterrupt):
+                render_masivo.correr(ids, origen, lote=2, procesos=1, checkpoint_ruta=ruta, salida=open(os.devnull, "w"))
+        with open(ruta) as f:
+            assert json.load(f)["procesadas"] == 2
+
+        with patch('app.regenerar_pdfs', side_effect=interrumpe_en_el_segundo):
+            conteo = render_masivo.correr(ids, origen, lote=2, procesos=1, checkpoint_ruta=ruta,
+                                          salida=open(os.devnull, "w"))
+
+        # El primer lote no se repite al reanudar
+        assert lotes[2:] == [["nota-2", "nota-3"], ["nota-4", "no-existe"]]
+        assert conteo == {"sin_cambios": 0, "renderizado": 5, "no_encontradas": 1}
+        assert all(f"TEST123456ABC/NV-{i:010d}.pdf" in self.s3.objetos for i in range(5))
+
+    def test_reanuda_si_el_rango_gana_notas(self, tmp_path):
+        ruta = str(tmp_path / "checkpoint.json")
+        origen = {"desde": "2026-09-01", "hasta": "2026-09-30"}
+        render_masivo.guardar_checkpoint(ruta, {
+            "origen": origen, "procesadas": 2, "ultimo_id": "nota-1", "conteo": {"renderizado": 2}
+        })
+        # Entre corridas el rango ganó una nota antes y otra después del checkpoint
+        ids = ["nota-nueva-1", "nota-0", "nota-1", "nota-2", "nota-nueva-2"]
+        with patch('app.regenerar_pdfs', return_value={"renderizado": 1}) as mock_regenerar:
+            render_masivo.correr(ids, origen, lote=1, procesos=1, checkpoint_ruta=ruta, salida=open(os.devnull, "w"))
+
+        assert [c.args[0] for c in mock_regenerar.call_args_list] == [["nota-2"], ["nota-nueva-2"]]
+        with open(ruta) as f:
+            assert json.load(f)["ultimo_id"] == "nota-nueva-2"
+
+    def test_checkpoint_de_otra_corrida(self, tmp_path):
+        ruta = str(tmp_path / "checkpoint.json")
+        render_masivo.guardar_checkpoint(ruta, {"origen": {"ids": 1}, "procesadas": 1, "conteo": {}})
+        with pytest.raises(SystemExit):
+            render_masivo.correr(["nota-0"], {"ids": 2}, lote=1, checkpoint_ruta=ruta)
@@ -0,0 +1,242 @@
+"""
+Tests para los repositorios de datos
+"""
+import time
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from repositorios import RepositorioDynamo, RepositorioMemoria, crear_repositorios
+
+
+class TestRepositorioMemoria:
+    """Tests para el backend en memoria"""
+    
+    def test_crud(self):
+        repo = RepositorioMemoria()
+        repo.guardar({"id": "1", "rfc": "AAA", "nombre": "Uno"})
+        repo.guardar({"id": "2", "rfc": "BBB", "nombre": "Dos"})
+        
+        assert repo.obtener("1")["nombre"] == "Uno"
+        assert [i["id"] for i in repo.buscar("rfc", "BBB")] == ["2"]
+        assert repo.actualizar("1", {"nombre": "Otro"})["nombre"] == "Otro"
+        
+        repo.eliminar("1")
+        assert repo.obtener("1") is None
+        assert len(repo.listar()) == 1
+        assert repo.listar(("id", "rfc")) == [{"id": "2", "rfc": "BBB"}]
+    
+    def test_regresa_copias(self):
+        repo = RepositorioMemoria()
+        repo.guardar({"id": "1", "nombre": "Uno"})
+        repo.obtener("1")["nombre"] = "Modificado"
+        assert repo.obtener("1")["nombre"] == "Uno"
+    
+    def test_crear_solo_si_no_existe_o_vencido(self):
+        repo = RepositorioMemoria()
+        assert repo.crear({"id": "k", "expira_en": 10}) is True
+        assert repo.crear({"id": "k", "expira_en": 20}, vencido=("expira_en", 5)) is False
+        assert repo.crear({"id": "k", "expira_en": 20}, vencido=("expira_en", 15)) is True
+        assert repo.obtener("k")["expira_en"] == 20
+    
+    def test_obtener_lote(self):
+        repo = RepositorioMemoria()
+        repo.cargar([{"id": "1"}, {"id": "2", "rfc": "AAA", "nombre": "Dos"}])
+        assert repo.obtener_lote(["2", "x", "2", "1"]) == {"2": {"id": "2", "rfc": "AAA", "nombre": "Dos"}, "1": {"id": "1"}}
+        assert repo.obtener_lote(["2"], campos=("rfc",)) == {"2": {"id": "2", "rfc": "AAA"}}
+    
+    def test_guardar_lote(self):
+        repo = RepositorioMemoria()
+        items = [{"id": str(i), "valor": i} for i in range(30)]
+        assert repo.guardar_lote(items) == 30
+        items[0]["valor"] = "cambiado"
+        assert repo.obtener("0") == {"id": "0", "valor": 0}
+        assert len(repo.listar()) == 30
+    
+    def test_latencia_artificial(self):
+        repo = RepositorioMemoria(latencia_ms=20)
+        inicio = time.perf_counter()
+        repo.obtener("x")
+        assert time.perf_counter() - inicio >= 0.02
+
+
+    def test_consultar_paginado(self):
+        repo = RepositorioMemoria()
+        repo.cargar([{"id": str(i), "cliente_id": "c-1", "created_at": f"2026-01-0{i}"} for i in range(1, 6)])
+        
+        pagina, cursor = repo.consultar("indice", "cliente_id", "c-1", ("created_at", "2026-01-02", None), limite=2)
+        assert [i["id"] for i in pagina] == ["2", "3"]
+        pagina, cursor = repo.consultar("indice", "cliente_id", "c-1", ("created_at", "2026-01-02", None),
+                                        limite=2, cursor=cursor)
+        assert [i["id"] for i in pagina] == ["4", "5"]
+        assert cursor is None
+
+
+class TestRepositorioDynamo:
+    """Tests para el backend de DynamoDB"""
+    
+    def test_buscar_sigue_paginacion(self):
+        table = MagicMock()
+        table.scan.side_effect = [
+            {"Items": [{"id": "1"}], "LastEvaluatedKey": {"id": "1"}},
+            {"Items": [{"id": "2"}]},
+        ]
+        repo = RepositorioDynamo("clientes", lambda nombre: table)
+        
+        assert [i["id"] for i in repo.buscar("cliente_id", "c-1")] == ["1", "2"]
+        assert table.scan.call_args_list[1].kwargs["ExclusiveStartKey"] == {"id": "1"}
+    
+    def test_actualizar_usa_nombres_de_atributo(self):
+        table = MagicMock()
+        table.update_item.return_value = {"Attributes": {"id": "1", "estado": "Jalisco"}}
+        repo = RepositorioDynamo("domicilios", lambda nombre: table)
+        
+        repo.actualizar("1", {"estado": "Jalisco"})
+        
+        kwargs = table.update_item.call_args.kwargs
+        assert kwargs["UpdateExpression"] == "SET #c0 = :v0"
+        assert kwargs["ExpressionAttributeNames"] == {"#c0": "estado"}
+        assert "ConditionExpression" not in kwargs
+    
+    def test_actualizar_condicional(self):
+        from botocore.exceptions import ClientError
+        table = MagicMock()
+        table.update_item.side_effect = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem"
+        )
+        repo = RepositorioDynamo("idempotencia", lambda nombre: table)
+        
+        assert repo.actualizar("1", {"estado": "COMPLETADO"}, si={"estado": "EN_CURSO"}) is None
+        kwargs = table.update_item.call_args.kwargs
+        assert kwargs["ConditionExpression"] == "#s0 = :s0"
+        assert kwargs["ExpressionAttributeValues"][":s0"] == "EN_CURSO"
+        
+        memoria = RepositorioMemoria()
+        memoria.guardar({"id": "1", "estado": "EN_CURSO"})
+        assert memoria.actualizar("1", {"estado": "COMPLETADO"}, si={"estado": "OTRO"}) is None
+        assert memoria.actualizar("2", {"estado": "COMPLETADO"}, si={"estado": "EN_CURSO"}) is None
+        assert memoria.actualizar("1", {"estado": "COMPLETADO"}, si={"estado": "EN_CURSO"})["estado"] == "COMPLETADO"
+    
+    def test_listar_con_proyeccion(self):
+        table = MagicMock()
+        table.scan.return_value = {"Items": [{"id": "1", "folio": "NV-1"}]}
+        repo = RepositorioDynamo("notas", lambda nombre: table)
+        
+        repo.listar(("id", "folio"))
+        
+        kwargs = table.scan.call_args.kwargs
+        assert kwargs["ProjectionExpression"] == "#p0, #p1"
+        assert kwargs["ExpressionAttributeNames"] == {"#p0": "id", "#p1": "folio"}
+        assert "ConsistentRead" not in kwargs
+        
+        repo.listar(consistente=True)
+        assert table.scan.call_args.kwargs == {"ConsistentRead": True}
+    
+    def test_recorrer_segmento_por_paginas(self):
+        table = MagicMock()
+        table.scan.side_effect = [
+            {"Items": [{"id": "1"}], "LastEvaluatedKey": {"id": "1"}},
+            {"Items": [{"id": "2"}]},
+        ]
+        repo = RepositorioDynamo("notas", lambda nombre: table)
+        
+        assert list(repo.recorrer(("id",), segmento=2, segmentos=4)) == [[{"id": "1"}], [{"id": "2"}]]
+        kwargs = table.scan.call_args_list[1].kwargs
+        assert (kwargs["Segment"], kwargs["TotalSegments"]) == (2, 4)
+        assert kwargs["ExclusiveStartKey"] == {"id": "1"}
+        assert kwargs["ProjectionExpression"] == "#p0"
+    
+    def test_guardar_lote_con_batch_writer(self):
+        table = MagicMock()
+        repo = RepositorioDynamo("notas", lambda nombre: table)
+        
+        assert repo.guardar_lote([{"id": "1"}, {"id": "2"}]) == 2
+        lote = table.batch_writer.return_value.__enter__.return_value
+        assert [c.kwargs["Item"]["id"] for c in lote.put_item.call_args_list] == ["1", "2"]
+        table.put_item.assert_not_called()
+    
+    def test_consultar_indice_con_rango_y_limite(self):
+        table = MagicMock()
+        table.query.side_effect = [
+            {"Items": [{"id": "1"}], "LastEvaluatedKey": {"id": "1"}},
+            {"Items": [{"id": "2"}], "LastEvaluatedKey": {"id": "2"}},
+        ]
+        repo = RepositorioDynamo("notas", lambda nombre: table)
+        
+        items, cursor = repo.consultar("cliente-fecha-index", "cliente_id", "c-1",
+                                       ("created_at", "2026-01-01", None), limite=2)
+        
+        assert [i["id"] for i in items] == ["1", "2"]
+        assert cursor == {"id": "2"}
+        primera, segunda = [c.kwargs for c in table.query.call_args_list]
+        assert primera["IndexName"] == "cliente-fecha-index"
+        assert primera["KeyConditionExpression"] == "#k = :k AND #r >= :desde"
+        assert (primera["Limit"], segunda["Limit"]) == (2, 1)
+        assert segunda["ExclusiveStartKey"] == {"id": "1"}
+
+    def test_crear_condicional(self):
+        from botocore.exceptions import ClientError
+        table = MagicMock()
+        table.put_item.side_effect = [
+            {},
+            ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem"),
+        ]
+        repo = RepositorioDynamo("idempotencia", lambda nombre: table)
+        
+        assert repo.crear({"id": "k"}, vencido=("expira_en", 100)) is True
+        assert repo.crear({"id": "k"}) is False
+        primera = table.put_item.call_args_list[0].kwargs
+        assert primera["ConditionExpression"] == "attribute_not_exists(id) OR #v < :v"
+        assert primera["ExpressionAttributeValues"] == {":v": 100}
+
+    
+    def test_obtener_lote_en_bloques_con_reintento(self, monkeypatch):
+        import repositorios
+        from dynamodb_codec import TablaDynamo, ESQUEMAS
+        monkeypatch.setattr(repositorios.time, "sleep", lambda s: None)
+        pedidas = []
+        
+        def batch_get_item(RequestItems):
+            llaves = [k["id"]["S"] for k in RequestItems["productos"]["Keys"]]
+            pedidas.append(llaves)
+            # El primer intento de cada bloque deja la última llave sin procesar
+            devueltas, sin_procesar = (llaves[:-1], llaves[-1:]) if len(llaves) > 1 else (llaves, [])
+            return {
+                "Responses": {"productos": [
+                    {"id": {"S": k}, "precio_base": {"N": "1.5"}} for k in devueltas if k != "p-7"
+                ]},
+                "UnprocessedKeys": {"productos": {"Keys": [{"id": {"S": k}} for k in sin_procesar]}},
+            }
+        
+        client = MagicMock()
+        client.batch_get_item.side_effect = batch_get_item
+        tabla = TablaDynamo(client, "productos", ESQUEMAS["producto"])
+        repo = RepositorioDynamo("productos", lambda nombre: tabla)
+        
+        ids = [f"p-{i}" for i in range(250)]
+        items = repo.obtener_lote(ids + ids[:10])
+        
+        assert len(items) == 249 and "p-7" not in items
+        assert items["p-0"]["precio_base"] == 1.5
+        assert sorted(len(l) for l in pedidas) == [1, 1, 1, 50, 100, 100]
+    
+    def test_obtener_lote_con_proyeccion(self):
+        table = MagicMock(spec=["batch_get_item"])
+        table.batch_get_item.return_value = {"Items": [{"id": "n-1", "cliente_info": {"rfc": "AAA"}}],
+                                             "UnprocessedKeys": []}
+        repo = RepositorioDynamo("notas", lambda nombre: table)
+        
+        assert repo.obtener_lote(["n-1"], campos=("cliente_info",)) == {"n-1": {"id": "n-1", "cliente_info": {"rfc": "AAA"}}}
+        kwargs = table.batch_get_item.call_args.kwargs
+        assert kwargs["ProjectionExpression"] == "#p0, #p1"
+        assert kwargs["ExpressionAttributeNames"] == {"#p0": "id", "#p1": "cliente_info"}
+
+
+
+def test_backend_no_soportado():
+    with pytest.raises(ValueError):
+        crear_repositorios("postgres", {"clientes": "clientes"})
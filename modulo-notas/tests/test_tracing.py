@@ -0,0 +1,154 @@
+"""
+Tests para las trazas por request
+"""
+import json
+import pytest
+import botocore.session
+from botocore.stub import Stubber
+from unittest.mock import patch
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tracing
+
+
+def crear_cliente_s3():
+    session = botocore.session.get_session()
+    client = session.create_client(
+        's3', region_name='us-east-1',
+        aws_access_key_id='test', aws_secret_access_key='test'
+    )
+    return tracing.instrumentar_cliente(client)
+
+
+class TestSpans:
+    """Tests del modelo de trazas"""
+
+    def test_span_sin_traza_es_vacio(self):
+        with tracing.span("pdf.render") as s:
+            assert s is None
+
+    @patch.object(tracing, 'emitir')
+    def test_desglose_y_server_timing(self, mock_emitir):
+        with tracing.traza("POST /notas") as t:
+            with tracing.span("pdf.render") as externo:
+                with tracing.span("pdf.fuentes") as interno:
+                    pass
+            with tracing.span("pdf.render"):
+                pass
+
+        assert interno.parent_id == externo.span_id
+        assert externo.parent_id == t.raiz.span_id
+        assert t.desglose()["pdf.render"]["n"] == 2
+        assert 'pdf.render;dur=' in t.server_timing()
+        assert t.server_timing().endswith(f"total;dur={t.raiz.duracion_ms:.2f}")
+        mock_emitir.assert_called_once_with(t)
+
+    @patch.object(tracing, 'emitir')
+    def test_error_se_registra(self, mock_emitir):
+        with pytest.raises(ValueError):
+            with tracing.traza("handler") as t:
+                with tracing.span("ses.SendEmail"):
+                    raise ValueError("falla")
+
+        assert t.spans[0].error == "ValueError"
+        assert t.raiz.error == "ValueError"
+
+
+    @patch.object(tracing, 'emitir')
+    def test_hilos_conservan_la_traza(self, mock_emitir):
+        from unittest.mock import MagicMock
+        from repositorios import RepositorioDynamo
+
+        def batch_get_item(Keys, **kwargs):
+            with tracing.span("dynamodb.BatchGetItem"):
+                return {"Items": [dict(k) for k in Keys], "UnprocessedKeys": []}
+
+        table = MagicMock(spec=["batch_get_item"])
+        table.batch_get_item.side_effect = batch_get_item
+        repo = RepositorioDynamo("notas", lambda nombre: table)
+
+        with tracing.traza("GET /notas/export.zip") as t:
+            with tracing.EjecutorConTraza(max_workers=4) as executor:
+                assert set(executor.map(lambda i: tracing.traza_actual(), range(3))) == {t}
+            assert len(repo.obtener_lote([f"n-{i}" for i in range(250)], hilos=4)) == 250
+
+        # Fuera de la traza los hilos no registran nada
+        with tracing.EjecutorConTraza(max_workers=2) as executor:
+            assert list(executor.map(lambda i: tracing.traza_actual(), range(2))) == [None, None]
+
+        assert t.desglose()["dynamodb.BatchGetItem"]["n"] == 3
+        assert all(s.parent_id == t.raiz.span_id for s in t.spans)
+
+
+class TestInstrumentacionBotocore:
+    """Tests de los spans generados por los hooks de botocore"""
+
+    @patch.object(tracing, 'emitir')
+    def test_llamadas_aws_generan_spans(self, mock_emitir):
+        s3 = crear_cliente_s3()
+        with Stubber(s3) as stub, tracing.traza("GET /notas/1/pdf") as t:
+            stub.add_response('put_object', {}, {'Bucket': 'b', 'Key': 'k', 'Body': b'pdf'})
+            stub.add_client_error('head_object', 'NoSuchKey', http_status_code=404)
+            s3.put_object(Bucket='b', Key='k', Body=b'pdf')
+            with pytest.raises(s3.exceptions.ClientError):
+                s3.head_object(Bucket='b', Key='k')
+
+        assert [s.nombre for s in t.spans] == ["s3.PutObject", "s3.HeadObject"]
+        assert t.spans[0].atributos["http.status_code"] == 200
+        assert t.spans[1].atributos["http.status_code"] == 404
+
+    def test_llamadas_fuera_de_traza_no_se_registran(self):
+        s3 = crear_cliente_s3()
+        with Stubber(s3) as stub:
+            stub.add_response('put_object', {}, {'Bucket': 'b', 'Key': 'k', 'Body': b'pdf'})
+            s3.put_object(Bucket='b', Key='k', Body=b'pdf')
+        assert tracing.traza_actual() is None
+
+
+class TestEmision:
+    """Tests de los formatos de salida"""
+
+    def test_emf_y_otlp(self, capsys):
+        with patch.object(tracing, 'TRACING_EXPORT', 'otlp'):
+            with tracing.traza("POST /notas"):
+                with tracing.span("dynamodb.PutItem"):
+                    pass
+
+        emf, otlp = [json.loads(linea) for linea in capsys.readouterr().out.splitlines()]
+        metricas = emf["_aws"]["CloudWatchMetrics"][0]
+        assert {"Name": "dynamodb.PutItem", "Unit": "Milliseconds"} in metricas["Metrics"]
+        assert emf["Endpoint"] == "POST /notas"
+        spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [s["name"] for s in spans] == ["POST /notas", "dynamodb.PutItem"]
+        assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+
+    def test_endpoint_con_plantilla_de_ruta(self, capsys):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        app = FastAPI()
+        app.add_middleware(tracing.ServerTimingMiddleware)
+
+        @app.get("/notas/{nota_id}")
+        def obtener(nota_id: str):
+            return {"id": nota_id}
+
+        client = TestClient(app)
+        capsys.readouterr()
+        assert "server-timing" in client.get("/notas/abc-123").headers
+        client.get("/no-existe")
+
+        emfs = [json.loads(linea) for linea in capsys.readouterr().out.splitlines()]
+        # Un valor de dimensión por ruta, no por id; el path real solo va al log
+        assert [(e["Endpoint"], e["path"]) for e in emfs] == [
+            ("GET /notas/{nota_id}", "GET /notas/abc-123"), ("unmatched", "GET /no-existe"),
+        ]
+
+    def test_deshabilitado_no_abre_traza(self):
+        with patch.object(tracing, 'TRACING_ENABLED', False):
+            with tracing.traza("POST /notas") as t:
+                assert t is None
+                assert tracing.traza_actual() is None
@@ -0,0 +1,121 @@
+"""
+Tests para el verificador de consistencia
+"""
+import json
+from unittest.mock import patch
+import sys
+import os
+
+# Agregar el path del src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+patch('boto3.session.Session').start()
+import app
+import repositorios
+import verificador
+from tests.test_pdfs import S3Memoria, CLIENTE, CONTENIDO
+
+
+class S3Listable(S3Memoria):
+    """S3Memoria con list_objects_v2 paginado de 2 en 2"""
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        claves = sorted(k for k in self.objetos if k.startswith(Prefix))
+        inicio = int(ContinuationToken or 0)
+        response = {"Contents": [{"Key": k} for k in claves[inicio:inicio + 2]], "IsTruncated": False}
+        if inicio + 2 < len(claves):
+            response.update(IsTruncated=True, NextContinuationToken=str(inicio + 2))
+        return response
+
+
+def nota(i: int, cliente_info=CLIENTE) -> dict:
+    return {"id": f"nota-{i}", "folio": f"NV-{i:010d}", "cliente_id": "cli-1", "total": 200.0,
+            "created_at": "2026-09-01T10:00:00", "cliente_info": cliente_info, "contenido": CONTENIDO}
+
+
+class TestConjuntoIds:
+    """Tests para el conjunto compacto de ids"""
+
+    def test_pertenencia(self):
+        ids = verificador.ConjuntoIds()
+        ids.agregar([f"id-{i}" for i in range(0, 2000, 2)])
+        ids.cerrar()
+        assert len(ids) == 1000
+        assert all(f"id-{i}" in ids for i in range(0, 2000, 2))
+        assert not any(f"id-{i}" in ids for i in range(1, 2000, 2))
+
+
+class TestVerificador:
+    """Tests para el plan de reparación y su aplicación"""
+
+    def setup_method(self):
+        self.repos = repositorios.crear_repositorios("memory", dict.fromkeys(repositorios.ENTIDADES))
+        self.repos.clientes.cargar([{"id": "cli-1", "rfc": "TEST123456ABC"}])
+        self.repos.domicilios.cargar([
+            {"id": "dom-1", "cliente_id": "cli-1"}, {"id": "dom-x", "cliente_id": "cli-borrado"},
+        ])
+        self.repos.notas.cargar([nota(i) for i in range(5)] + [
+            nota(5, cliente_info=None),
+            {**nota(6, cliente_info=None), "cliente_id": "cli-borrado"},
+        ])
+        self.repos.contenido.cargar([
+            {"id": f"cont-{i}", "nota_id": f"nota-{i}"} for i in range(5)
+        ] + [{"id": "cont-x", "nota_id": "nota-borrada"}])
+        self.s3 = S3Listable()
+        for i in (0, 1, 3, 4):
+            self.s3.objetos[f"TEST123456ABC/NV-{i:010d}.pdf"] = (b"%PDF", {})
+        self.s3.objetos["TEST123456ABCD/NV-0000000002.pdf"] = (b"%PDF", {})
+        self.patchers = [
+            patch('app.get_repositorios', return_value=self.repos),
+            patch('app.get_s3_client', return_value=self.s3),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def teardown_method(self):
+        for p in self.patchers:
+            p.stop()
+
+    def test_plan_de_reparacion(self):
+        acciones = list(verificador.verificar(self.repos, self.s3, "bucket", segmentos=3))
+
+        assert sorted((a["accion"], a["entidad"], a["id"]) for a in acciones) == [
+            ("eliminar", "contenido", "cont-x"),
+            ("eliminar", "domicilios", "dom-x"),
+            # nota-5 no tiene snapshot: su RFC sale del catálogo
+            ("regenerar_pdf", "notas", "nota-2"),
+            ("regenerar_pdf", "notas", "nota-5"),
+            ("revisar", "notas", "nota-6"),
+        ]
+
+    def test_padre_creado_despues_del_scan_no_es_huerfano(self):
+        ids_de = verificador.ids_de
+
+        def sin_nota_0(repo, segmentos):
+            if repo is not self.repos.notas:
+                return ids_de(repo, segmentos)
+            # Simula que nota-0 se guardó después de escanear las notas
+            ids = verificador.ConjuntoIds()
+            ids.agregar([n["id"] for n in repo.listar() if n["id"] != "nota-0"])
+            ids.cerrar()
+            return ids
+
+        with patch('verificador.ids_de', side_effect=sin_nota_0):
+            acciones = list(verificador.verificar(self.repos))
+        assert [a["id"] for a in acciones if a["entidad"] == "contenido"] == ["cont-x"]
+
+    def test_escribir_y_aplicar_plan(self, tmp_path):
+        ruta = str(tmp_path / "plan.jsonl")
+        conteo = verificador.escribir_plan(verificador.verificar(self.repos, self.s3, "bucket"), ruta)
+        assert conteo == {"eliminar:contenido": 1, "eliminar:domicilios": 1,
+                          "regenerar_pdf:notas": 2, "revisar:notas": 1}
+        with open(ruta) as f:
+            assert all(json.loads(linea)["accion"] for linea in f)
+
+        with patch('app.regenerar_pdfs') as regenerar:
+            verificador.aplicar(ruta, self.repos)
+        assert self.repos.contenido.obtener("cont-x") is None
+        assert self.repos.domicilios.obtener("dom-x") is None
+        assert self.repos.domicilios.obtener("dom-1") is not None
+        assert sorted(regenerar.call_args.args[0]) == ["nota-2", "nota-5"]
+        assert list(verificador.verificar(self.repos)) == []
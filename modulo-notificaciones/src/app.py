@@ -5,9 +5,10 @@ Implementa métricas de CloudWatch para monitoreo
 import os
 import json
 import time
-import boto3
 from datetime import datetime
 from functools import wraps
+import aws_clients
+import tracing
 
 # Configuración de ambiente
 ENVIRONMENT = os.getenv("ENVIRONMENT", "local")
@@ -15,9 +16,14 @@ AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 SES_SOURCE_EMAIL = os.getenv("SES_SOURCE_EMAIL", "noreply@example.com")
 SES_CONFIGURATION_SET = os.getenv("SES_CONFIGURATION_SET", "")
 
-# Inicializar clientes AWS
-ses_client = boto3.client('ses', region_name=AWS_REGION)
-cloudwatch = boto3.client('cloudwatch', region_name=AWS_REGION)
+tracing.configurar("notificaciones", "NotasVenta/Notificaciones")
+
+# Clientes AWS: se crean en el primer uso desde la fábrica compartida
+def get_ses_client():
+    return aws_clients.get_client('ses')
+
+def get_cloudwatch():
+    return aws_clients.get_client('cloudwatch')
 
 # ==================== MÉTRICAS ====================
 
@@ -32,7 +38,7 @@ def put_metric(metric_name: str, value: float, unit: str = "Count", dimensions:
             for key, val in dimensions.items():
                 metric_dimensions.append({"Name": key, "Value": str(val)})
         
-        cloudwatch.put_metric_data(
+        get_cloudwatch().put_metric_data(
             Namespace="NotasVenta/Notificaciones",
             MetricData=[{
                 "MetricName": metric_name,
@@ -182,6 +188,7 @@ def generar_texto_correo(cliente_nombre: str, folio: str, total: float, download
 @track_execution_time
 def enviar_correo_ses(destinatario: str, asunto: str, html_body: str, text_body: str) -> dict:
     """Envía un correo usando Amazon SES"""
+    ses_client = get_ses_client()
     try:
         email_params = {
             'Source': SES_SOURCE_EMAIL,
@@ -264,6 +271,7 @@ def procesar_mensaje_nota_venta(mensaje: dict) -> dict:
 
 # ==================== HANDLER DE LAMBDA ====================
 
+@tracing.trazado("sns.handler")
 def handler(event, context):
     """
     Handler principal para procesar eventos de SNS
@@ -312,6 +320,7 @@ def handler(event, context):
         execution_time = (time.time() - start_time) * 1000
         put_metric("TotalExecutionTime", execution_time, "Milliseconds")
         put_metric("MensajesProcesados", len(results))
+        aws_clients.put_pool_metrics(put_metric)
         
         response = {
             "statusCode": 200,
@@ -347,6 +356,7 @@ def health_handler(event, context):
             "status": "healthy",
             "service": "notificaciones",
             "environment": ENVIRONMENT,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow().isoformat(),
+            "aws_pool": aws_clients.pool_stats()
         })
     }
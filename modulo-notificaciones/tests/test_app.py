@@ -10,14 +10,15 @@ import os
 # Agregar el path del src
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-# Mock de boto3 antes de importar
-with patch('boto3.client'):
-    from app import (
-        handler,
-        generar_html_correo,
-        generar_texto_correo,
-        procesar_mensaje_nota_venta
-    )
+# Mock de boto3 antes de importar; los clientes AWS se crean de forma
+# perezosa, por lo que el mock se mantiene durante toda la sesión
+patch('boto3.session.Session').start()
+from app import (
+    handler,
+    generar_html_correo,
+    generar_texto_correo,
+    procesar_mensaje_nota_venta
+)
 
 
 class TestGeneracionCorreo: